@@ -0,0 +1,66 @@
+"""
+Micro-benchmark of user data codecs.
+
+Encodes and decodes a rooms file of users with 1, 50 and 500 rooms with
+every available codec and prints the time per operation and the file size.
+
+Usage:
+    python benchmarks/bench_codecs.py [--repeat 200]
+"""
+import argparse
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data.codecs import CODECS, get_codec
+from data.rooms import Room
+
+ROOM_COUNTS = (1, 50, 500)
+
+def make_rooms(count: int) -> list:
+    """Create serialized rooms as they are stored in files."""
+    return [
+        Room(
+            name=f"Помещение {index}",
+            length=4.0 + index % 7,
+            width=3.0 + index % 5,
+            height=2.7,
+            area=49.8,
+            floor_area=12.0,
+            created_at=datetime.now()
+        ).to_dict()
+        for index in range(count)
+    ]
+
+def available_codecs() -> list:
+    """Get codecs whose dependencies are installed."""
+    codecs = []
+    for name in CODECS:
+        try:
+            codecs.append(get_codec(name))
+        except ImportError:
+            print(f"{name}: не установлен, пропускаем")
+    return codecs
+
+def main(repeat: int) -> None:
+    codecs = available_codecs()
+    print(f"{'rooms':>6} {'codec':<10} {'encode, us':>12} {'decode, us':>12} {'size, bytes':>12}")
+
+    for count in ROOM_COUNTS:
+        rooms = make_rooms(count)
+        for codec in codecs:
+            raw = codec.encode(rooms)
+            assert codec.decode(raw) == rooms
+
+            encode = min(timeit.repeat(lambda: codec.encode(rooms), number=repeat, repeat=3)) / repeat
+            decode = min(timeit.repeat(lambda: codec.decode(raw), number=repeat, repeat=3)) / repeat
+            print(f"{count:>6} {codec.name:<10} {encode * 1e6:>12.1f} {decode * 1e6:>12.1f} {len(raw):>12}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200, help="operations per measurement")
+    args = parser.parse_args()
+    main(args.repeat)
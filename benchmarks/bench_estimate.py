@@ -0,0 +1,97 @@
+"""
+Benchmark of the whole apartment estimate.
+
+Compares the vectorized batch estimate with a Python loop over every
+room x material pair, computed the way the material calculation dialog
+does it, for several numbers of rooms and materials.
+
+Usage:
+    python benchmarks/bench_estimate.py [--repeat 20]
+"""
+import argparse
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data.estimate import (
+    NO_SURFACE, UNIT_AREA, UNIT_VOLUME, estimate_apartment,
+    material_surface, material_unit_kind
+)
+from data.materials import Material
+from data.rooms import Room
+
+SIZES = ((10, 10), (200, 50), (2000, 100))
+CATEGORIES = ("Пол", "Стены", "Потолок", "Двери", "Окна")
+UNITS = ("м²", "м²", "м³", "шт", "л")
+
+def make_rooms(count: int) -> list:
+    """Create rooms of different sizes."""
+    return [
+        Room(
+            name=f"Помещение {index}",
+            length=3.0 + index % 7,
+            width=2.5 + index % 5,
+            height=2.5 + index % 3 * 0.2,
+            area=0.0,
+            floor_area=0.0,
+            created_at=datetime.now()
+        )
+        for index in range(count)
+    ]
+
+def make_materials(count: int) -> list:
+    """Create materials of all categories and units."""
+    return [
+        Material(
+            name=f"Материал {index}",
+            category=CATEGORIES[index % len(CATEGORIES)],
+            unit=UNITS[index % len(UNITS)],
+            price=100.0 + index * 10
+        )
+        for index in range(count)
+    ]
+
+def estimate_loop(rooms: list, materials: list) -> np.ndarray:
+    """Compute costs one room x material pair at a time."""
+    costs = np.empty((len(rooms), len(materials)))
+    for i, room in enumerate(rooms):
+        surfaces = (
+            room.length * room.width,
+            2 * (room.length + room.width) * room.height,
+            room.length * room.width
+        )
+        for j, material in enumerate(materials):
+            surface = material_surface(material)
+            kind = material_unit_kind(material)
+            area = surfaces[surface] if surface != NO_SURFACE else 0.0
+            if kind == UNIT_AREA:
+                quantity = area
+            elif kind == UNIT_VOLUME:
+                quantity = area * room.height
+            else:
+                quantity = 1
+            costs[i, j] = quantity * material.price
+    return costs
+
+def main(repeat: int) -> None:
+    print(f"{'rooms':>6} {'materials':>10} {'loop, ms':>10} {'batch, ms':>10} {'speedup':>8}")
+
+    for room_count, material_count in SIZES:
+        rooms = make_rooms(room_count)
+        materials = make_materials(material_count)
+        assert np.allclose(estimate_loop(rooms, materials), estimate_apartment(rooms, materials).costs)
+
+        loop = min(timeit.repeat(lambda: estimate_loop(rooms, materials), number=repeat, repeat=3)) / repeat
+        batch = min(timeit.repeat(lambda: estimate_apartment(rooms, materials), number=repeat, repeat=3)) / repeat
+        print(f"{room_count:>6} {material_count:>10} {loop * 1e3:>10.3f} {batch * 1e3:>10.3f} {loop / batch:>7.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="estimates per measurement")
+    args = parser.parse_args()
+    main(args.repeat)
@@ -0,0 +1,91 @@
+"""
+Benchmark of vector index types for knowledge base semantic search.
+
+Generates a synthetic corpus of clustered unit vectors (like sentence
+embeddings of related chunks) and measures build time, per-query latency
+and recall@k of the HNSW and IVF indexes at several search settings against
+exact search over the flat index.
+
+Usage:
+    python benchmarks/bench_kb_ann.py [--sizes 10000 100000] [--dimension 384]
+        [--queries 200] [--k 10] [--ef-search 16 32 64 128] [--nprobe 1 4 16 64]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from knowledge_base import ann
+
+def make_centers(size: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """Get random topic centers, one per 50 corpus items."""
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((max(1, size // 50), dimension)).astype("float32")
+
+def sample(centers: np.ndarray, count: int, seed: int) -> np.ndarray:
+    """Get count normalized vectors scattered around random topic centers."""
+    rng = np.random.default_rng(seed)
+    vectors = centers[rng.integers(len(centers), size=count)]
+    vectors += rng.standard_normal(vectors.shape).astype("float32")
+    return ann.normalize(vectors)
+
+def search_each(index, queries: np.ndarray, k: int) -> tuple:
+    """Search one query at a time, as the bot does; get ids and mean latency."""
+    found = np.empty((len(queries), k), dtype="int64")
+    started = time.perf_counter()
+    for i in range(len(queries)):
+        found[i] = index.search(queries[i:i + 1], k)[1][0]
+    return found, (time.perf_counter() - started) / len(queries)
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    """Share of the true k nearest neighbours that were found."""
+    hits = sum(len(set(row) & set(true_row)) for row, true_row in zip(found.tolist(), truth.tolist()))
+    return hits / truth.size
+
+def main(sizes: list, dimension: int, queries_count: int, k: int, ef_search: list, nprobe: list) -> None:
+    print(f"{'docs':>7} {'index':<6} {'setting':<12} {'build, s':>9} {'query, us':>10} {'recall@' + str(k):>10}")
+
+    for size in sizes:
+        # Queries are not corpus items, but come from the same topics
+        centers = make_centers(size, dimension)
+        corpus = sample(centers, size, seed=1)
+        queries = sample(centers, queries_count, seed=2)
+        ids = np.arange(size, dtype="int64")
+
+        for index_type, settings in (("flat", [None]), ("hnsw", ef_search), ("ivf", nprobe)):
+            if ann.choose_index_type(size, index_type) != index_type:
+                continue
+            started = time.perf_counter()
+            index = ann.create_index(corpus, ids, index_type)
+            build_time = time.perf_counter() - started
+
+            for setting in settings:
+                if index_type == "hnsw":
+                    ann.configure_search(index, ef_search=setting)
+                    label = f"ef={setting}"
+                elif index_type == "ivf":
+                    ann.configure_search(index, nprobe=setting)
+                    label = f"nprobe={setting}"
+                else:
+                    label = "exact"
+                found, latency = search_each(index, queries, k)
+                if index_type == "flat":
+                    truth = found
+                print(f"{size:>7} {index_type:<6} {label:<12} {build_time:>9.2f} {latency * 1e6:>10.1f} {recall(found, truth):>10.3f}")
+
+        print(f"{'':>7} auto choice for {size} items: {ann.choose_index_type(size, 'auto')}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="corpus sizes")
+    parser.add_argument("--dimension", type=int, default=384, help="vector dimension (MiniLM: 384)")
+    parser.add_argument("--queries", type=int, default=200, help="queries per measurement")
+    parser.add_argument("--k", type=int, default=10, help="neighbours per query")
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128], help="HNSW efSearch values")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64], help="IVF nprobe values")
+    args = parser.parse_args()
+    main(args.sizes, args.dimension, args.queries, args.k, args.ef_search, args.nprobe)
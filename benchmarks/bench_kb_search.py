@@ -0,0 +1,84 @@
+"""
+Benchmark of knowledge base search on a synthetic corpus.
+
+Generates a corpus of the given sizes in a temporary directory and compares
+the BM25 index lookup of simple_search with a substring scan over all
+documents, which is how search worked before the index.
+
+Usage:
+    python benchmarks/bench_kb_search.py [--sizes 100 1000 5000] [--repeat 200]
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from knowledge_base.search import KnowledgeSearch
+from knowledge_base.store import KnowledgeStore
+
+WORDS = (
+    "цемент бетон фундамент кирпич кладка штукатурка гидроизоляция утеплитель "
+    "арматура раствор плитка ламинат краска грунтовка стяжка кровля перекрытие "
+    "свая блок газобетон пеноблок смесь прочность марка стоимость монтаж демонтаж"
+).split()
+QUERIES = ("цементы", "ленточный фундамент", "стоимость кладки кирпича", "гидроизоляции кровли")
+
+def make_vocabulary(rng: random.Random, size: int = 5000) -> tuple:
+    """Get words and Zipf-like weights; domain words are spread over the ranks."""
+    syllables = "ба ве ги до жу за ки ло ми но пу ра се ти фу ха це чи шу".split()
+    words = ["".join(rng.choices(syllables, k=4)) for _ in range(size)]
+    for word in WORDS:
+        words[rng.randrange(size)] = word
+    weights = [1 / (rank + 1) for rank in range(size)]
+    return words, weights
+
+def make_corpus(path: Path, size: int, seed: int = 0) -> None:
+    """Write size random documents into three categories."""
+    rng = random.Random(seed)
+    words, weights = make_vocabulary(rng)
+
+    def text(length: int) -> str:
+        return " ".join(rng.choices(words, weights, k=length))
+
+    for index in range(size):
+        category = path / f"category_{index % 3}"
+        category.mkdir(exist_ok=True)
+        document = {
+            "title": text(3),
+            "description": text(60),
+            "items": [{"name": text(4), "unit": "м²"} for _ in range(5)]
+        }
+        with open(category / f"doc_{index}.json", "w", encoding="utf-8") as f:
+            json.dump(document, f, ensure_ascii=False)
+
+def scan(store: KnowledgeStore, query: str) -> list:
+    """Substring scan over every document, as before the index."""
+    query = query.lower()
+    return [d.to_result() for d in store.documents() if query in d.search_text]
+
+def main(sizes: list, repeat: int) -> None:
+    print(f"{'docs':>6} {'query':<28} {'scan, us':>10} {'bm25, us':>10} {'hits':>6}")
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            make_corpus(Path(directory), size)
+            store = KnowledgeStore(Path(directory), reload_interval=3600)
+            search = KnowledgeSearch(directory, store=store)
+
+            for query in QUERIES:
+                scan_time = min(timeit.repeat(lambda: scan(store, query), number=repeat, repeat=3)) / repeat
+                index_time = min(timeit.repeat(lambda: search.simple_search(query), number=repeat, repeat=3)) / repeat
+                hits = len(search.simple_search(query))
+                print(f"{size:>6} {query:<28} {scan_time * 1e6:>10.1f} {index_time * 1e6:>10.1f} {hits:>6}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000], help="corpus sizes")
+    parser.add_argument("--repeat", type=int, default=200, help="queries per measurement")
+    args = parser.parse_args()
+    main(args.sizes, args.repeat)
@@ -0,0 +1,133 @@
+"""
+Benchmark of update latency with concurrent writers.
+
+Simulates many users sending updates at the same time. Each update reads the
+user's rooms and saves a new one, like handle_room_height does. The script
+compares calling the storage functions directly on the event loop with the
+async repository and prints p50/p99 update latency for both.
+
+Usage:
+    python benchmarks/bench_repository.py --users 50 --updates 20 --rooms 100 --interval 100
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data.rooms import Room, get_user_rooms, save_room
+from data.repository import Repository
+
+def make_room(index: int) -> Room:
+    """Create a room with some dimensions."""
+    return Room(
+        name=f"Помещение {index}",
+        length=4.0,
+        width=3.0,
+        height=2.7,
+        area=49.8,
+        floor_area=12.0,
+        created_at=datetime.now()
+    )
+
+def populate(users: int, rooms: int) -> None:
+    """Create room files so every write rewrites a realistic amount of data."""
+    for user_id in range(users):
+        for index in range(rooms):
+            save_room(user_id, make_room(index))
+
+def percentile(values, percent: float) -> float:
+    """Get percentile of values."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def sync_update(user_id: int, index: int) -> None:
+    """Update that does file I/O directly on the event loop."""
+    get_user_rooms(user_id)
+    save_room(user_id, make_room(index))
+
+async def repo_update(repo: Repository, user_id: int, index: int) -> None:
+    """Update that goes through the async repository."""
+    await repo.get_rooms(user_id)
+    await repo.save_room(user_id, make_room(index))
+
+async def run_writers(update, users: int, updates: int, interval: float) -> list:
+    """
+    Run updates for all users concurrently and collect latencies in ms.
+
+    Updates arrive on a fixed schedule, and latency is measured from the
+    scheduled arrival, so time spent waiting for a blocked event loop is
+    included just like for a real Telegram update.
+    """
+    latencies = []
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    async def writer(user_id: int) -> None:
+        # Spread users over the interval so arrivals do not come in bursts
+        offset = interval * user_id / users
+        for index in range(updates):
+            arrival = start + offset + index * interval
+            await asyncio.sleep(max(0.0, arrival - loop.time()))
+            await update(user_id, index)
+            latencies.append((loop.time() - arrival) * 1000)
+
+    await asyncio.gather(*(writer(user_id) for user_id in range(users)))
+    return latencies
+
+def report(name: str, latencies: list, elapsed: float) -> None:
+    """Print latency statistics."""
+    print(
+        f"{name:<12} updates={len(latencies):<6} "
+        f"p50={statistics.median(latencies):8.2f} ms  "
+        f"p99={percentile(latencies, 99):8.2f} ms  "
+        f"max={max(latencies):8.2f} ms  "
+        f"total={elapsed:6.2f} s"
+    )
+
+async def main(args) -> None:
+    populate(args.users, args.rooms)
+
+    started = time.perf_counter()
+    interval = args.interval / 1000
+    latencies = await run_writers(sync_update, args.users, args.updates, interval)
+    report("sync", latencies, time.perf_counter() - started)
+
+    # Restore the initial amount of rooms so both runs write the same data
+    for file_path in Path("data/users").rglob("*.json"):
+        file_path.unlink()
+    populate(args.users, args.rooms)
+
+    repo = Repository(max_workers=args.workers)
+    started = time.perf_counter()
+    latencies = await run_writers(
+        lambda user_id, index: repo_update(repo, user_id, index),
+        args.users,
+        args.updates,
+        interval
+    )
+    report("repository", latencies, time.perf_counter() - started)
+    await repo.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50, help="number of concurrent users")
+    parser.add_argument("--updates", type=int, default=20, help="updates per user")
+    parser.add_argument("--rooms", type=int, default=100, help="rooms stored per user before the run")
+    parser.add_argument("--interval", type=float, default=100, help="ms between updates of one user")
+    parser.add_argument("--workers", type=int, default=4, help="repository executor size")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Storage uses paths relative to the working directory
+        os.chdir(tmp_dir)
+        asyncio.run(main(args))
@@ -5,7 +5,6 @@ import os
 import json
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.utils.token import validate_token
 from aiogram.client.default import DefaultBotProperties
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
@@ -14,8 +13,12 @@ from aiohttp.web import AppRunner, TCPSite, middleware
 
 from config.settings import BOT_TOKEN, WEBHOOK_URL, WEBHOOK_PATH
 from handlers.base import router as base_router
+from handlers.rooms_io import router as rooms_io_router
 from handlers.estimate import router as estimate_router
-from handlers.knowledge import router as knowledge_router
+from handlers.knowledge import router as knowledge_router, kb
+from data.repository import repo
+from data.fsm_storage import create_fsm_storage
+from data.cache import cache_stats
 
 # Configure logging
 logging.basicConfig(
@@ -31,8 +34,24 @@ logging.basicConfig(
 IS_RAILWAY = os.environ.get('RAILWAY_ENVIRONMENT') is not None
 
 async def health_check(request):
-    """Health check endpoint for Railway."""
-    return web.Response(text='OK', status=200)
+    """Health check endpoint for Railway.
+
+    The bot is healthy while semantic search warms up, searches fall back
+    to keyword search meanwhile.
+    """
+    return web.json_response({
+        'status': 'ok',
+        'semantic_search': kb.warm_up_status()
+    })
+
+async def metrics(request):
+    """Counters of the caches, the dialog state storage and the knowledge base search."""
+    return web.json_response({
+        'cache': cache_stats(),
+        'fsm': request.app['fsm_storage'].stats(),
+        'knowledge_base': kb.search.index_stats(),
+        'semantic_search': kb.semantic_stats()
+    })
 
 # Middleware для обработки ошибок JSON в запросах
 @middleware
@@ -50,6 +69,8 @@ async def error_middleware(request, handler):
 async def on_startup(bot: Bot):
     """Actions to perform on bot startup."""
     logging.info("Bot is starting up...")
+    # Load the embedding model and vector index without blocking updates
+    kb.start_warm_up()
     if IS_RAILWAY and WEBHOOK_URL:
         logging.info("Running on Railway environment with webhook")
         logging.info(f"Setting webhook to: {WEBHOOK_URL}")
@@ -85,6 +106,8 @@ async def on_shutdown(bot: Bot):
             logging.info("Webhook deleted")
         except Exception as e:
             logging.error(f"Error deleting webhook: {e}")
+    await repo.shutdown()
+    kb.close()
 
 # Кастомный обработчик запросов вебхука с обработкой ошибок
 class SafeRequestHandler(SimpleRequestHandler):
@@ -117,12 +140,14 @@ async def main():
         token=BOT_TOKEN,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
-    dp = Dispatcher(storage=MemoryStorage())
+    dp = Dispatcher(storage=create_fsm_storage())
 
-    # Register routers
+    # Register routers; rooms_io and knowledge go before base, whose fallback
+    # handler would otherwise answer their commands
+    dp.include_router(rooms_io_router)
+    dp.include_router(knowledge_router)
     dp.include_router(base_router)
     dp.include_router(estimate_router)
-    dp.include_router(knowledge_router)
 
     # Register startup and shutdown handlers
     dp.startup.register(on_startup)
@@ -134,6 +159,8 @@ async def main():
 
         # Add health check endpoint
         app.router.add_get('/health', health_check)
+        app.router.add_get('/metrics', metrics)
+        app['fsm_storage'] = dp.fsm.storage
 
         # Используем кастомный обработчик webhook с обработкой ошибок
         webhook_requests_handler = SafeRequestHandler(
@@ -47,4 +47,97 @@ WORK_TYPES = {
     "preparation": "Подготовка",
     "installation": "Монтаж",
     "finishing": "Отделка"
-} 
\ No newline at end of file
+} 
+# Storage settings
+# Size of the thread pool that performs user data file I/O
+STORAGE_WORKERS = int(os.getenv("STORAGE_WORKERS", "4"))
+# Maximum number of storage operations queued at once
+STORAGE_MAX_PENDING = int(os.getenv("STORAGE_MAX_PENDING", "64"))
+# Room storage mode: "snapshot" rewrites the whole rooms file on every change,
+# "journal" appends changes to a log that is compacted in the background
+ROOMS_STORAGE_MODE = os.getenv("ROOMS_STORAGE_MODE", "snapshot")
+# Journal size in bytes after which it is folded into the snapshot
+ROOMS_JOURNAL_COMPACT_SIZE = int(os.getenv("ROOMS_JOURNAL_COMPACT_SIZE", "65536"))
+# Storage backend for rooms and materials: "files" or "sqlite"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "files")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "data/storage.db")
+# In-process cache of users' rooms and materials
+CACHE_MAX_USERS = int(os.getenv("CACHE_MAX_USERS", "1024"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))
+# Changes of one user arriving within this window (seconds) are written together
+STORAGE_COALESCE_WINDOW = float(os.getenv("STORAGE_COALESCE_WINDOW", "0.02"))
+# Format of user data files: "json" (pretty-printed), "compact" or "msgpack"
+DATA_CODEC = os.getenv("DATA_CODEC", "compact")
+# Layout of data/users: "sharded" puts files into two levels of hash-prefix
+# directories, "flat" keeps all files in one directory
+USERS_DIR_LAYOUT = os.getenv("USERS_DIR_LAYOUT", "sharded")
+# Bulk import of rooms from CSV/XLSX files
+# Rows validated at a time while the file is being read
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+IMPORT_MAX_ROOMS = int(os.getenv("IMPORT_MAX_ROOMS", "2000"))
+IMPORT_MAX_FILE_SIZE = int(os.getenv("IMPORT_MAX_FILE_SIZE", str(5 * 1024 * 1024)))
+# FSM (dialog state) storage: "sqlite" keeps dialogs across restarts, "memory" doesn't
+FSM_STORAGE = os.getenv("FSM_STORAGE", "sqlite")
+FSM_SQLITE_PATH = os.getenv("FSM_SQLITE_PATH", "data/fsm.db")
+# Dialog state changes within this window (seconds) are written in one transaction
+FSM_FLUSH_INTERVAL = float(os.getenv("FSM_FLUSH_INTERVAL", "0.05"))
+# Dialogs idle for this many seconds are forgotten
+FSM_STATE_TTL = float(os.getenv("FSM_STATE_TTL", "86400"))
+# Maximum number of dialogs kept at once, the least recently used are dropped
+FSM_MAX_STATES = int(os.getenv("FSM_MAX_STATES", "10000"))
+# Knowledge base files are checked for changes at most once per this many seconds
+KB_RELOAD_INTERVAL = float(os.getenv("KB_RELOAD_INTERVAL", "5"))
+# Maximum number of knowledge base search results
+KB_SEARCH_TOP_K = int(os.getenv("KB_SEARCH_TOP_K", "10"))
+# Nested knowledge base fields with equality indexes, besides all top-level fields
+KB_FIELD_INDEX_PATHS = [
+    path for path in os.getenv("KB_FIELD_INDEX_PATHS", "price_ranges[].category,price_ranges[].items[].unit").split(",")
+    if path
+]
+# Regular expression search in the knowledge base: seconds one pattern may run
+# before its worker process is killed, number of worker processes and number
+# of compiled patterns kept
+KB_REGEX_TIMEOUT = float(os.getenv("KB_REGEX_TIMEOUT", "1"))
+KB_REGEX_WORKERS = int(os.getenv("KB_REGEX_WORKERS", "2"))
+KB_REGEX_CACHE_SIZE = int(os.getenv("KB_REGEX_CACHE_SIZE", "256"))
+# Directory where the knowledge base vector index is saved between runs;
+# empty to rebuild it on every start
+KB_VECTOR_INDEX_PATH = os.getenv("KB_VECTOR_INDEX_PATH", "data/kb_index")
+# Semantic knowledge base search; the model and index are loaded in the
+# background on startup and keyword search is used until they are ready
+KB_SEMANTIC_SEARCH = os.getenv("KB_SEMANTIC_SEARCH", "1").lower() in ("1", "true", "yes")
+# Semantic search caches: query embeddings and results (per index version)
+KB_QUERY_CACHE_SIZE = int(os.getenv("KB_QUERY_CACHE_SIZE", "1024"))
+KB_RESULT_CACHE_SIZE = int(os.getenv("KB_RESULT_CACHE_SIZE", "1024"))
+# Query embedding batches: maximum size and how long (seconds) to wait for
+# more queries after the first one
+KB_EMBED_BATCH_SIZE = int(os.getenv("KB_EMBED_BATCH_SIZE", "32"))
+KB_EMBED_BATCH_WAIT = float(os.getenv("KB_EMBED_BATCH_WAIT", "0.005"))
+# Where semantic search runs: "local" in the bot process, "process" in a pool
+# of KB_VECTOR_WORKERS worker processes that hold the model and the index
+KB_VECTOR_BACKEND = os.getenv("KB_VECTOR_BACKEND", "local")
+KB_VECTOR_WORKERS = int(os.getenv("KB_VECTOR_WORKERS", "1"))
+# Seconds a vector worker process may take to answer one command before it is
+# killed and started again
+KB_VECTOR_TIMEOUT = float(os.getenv("KB_VECTOR_TIMEOUT", "30"))
+# Semantic search is used only when the best keyword search (BM25) score per
+# query word is below this value or nothing is found
+KB_LEXICAL_MIN_SCORE = float(os.getenv("KB_LEXICAL_MIN_SCORE", "1.0"))
+# Nested knowledge base items that are searched and returned on their own
+# instead of as part of the whole document
+KB_CHUNK_PATHS = [
+    path for path in os.getenv("KB_CHUNK_PATHS", "price_ranges[].items[]").split(",")
+    if path
+]
+# Vector index type: "flat" (exact search), "hnsw", "ivf" or "auto" to choose
+# by the number of indexed items (see the thresholds below)
+KB_ANN_INDEX = os.getenv("KB_ANN_INDEX", "auto").lower()
+KB_ANN_HNSW_MIN_SIZE = int(os.getenv("KB_ANN_HNSW_MIN_SIZE", "20000"))
+KB_ANN_IVF_MIN_SIZE = int(os.getenv("KB_ANN_IVF_MIN_SIZE", "500000"))
+# HNSW graph degree and candidate list sizes when building and searching
+KB_HNSW_M = int(os.getenv("KB_HNSW_M", "32"))
+KB_HNSW_EF_CONSTRUCTION = int(os.getenv("KB_HNSW_EF_CONSTRUCTION", "80"))
+KB_HNSW_EF_SEARCH = int(os.getenv("KB_HNSW_EF_SEARCH", "64"))
+# IVF cluster count (0 - about 4 * sqrt(items)) and clusters scanned per query
+KB_IVF_NLIST = int(os.getenv("KB_IVF_NLIST", "0"))
+KB_IVF_NPROBE = int(os.getenv("KB_IVF_NPROBE", "16"))
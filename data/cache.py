@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+from config.settings import CACHE_MAX_USERS, CACHE_TTL
+
+class UserCache:
+    """Bounded LRU cache with expiration, safe to use from several threads.
+
+    A value loaded by ``get_or_load`` is not stored if the key was changed
+    by ``update`` or ``invalidate`` while the load was running, so a slow
+    read can't put stale data back after a write.
+    """
+
+    def __init__(self, max_size: int = CACHE_MAX_USERS, ttl: float = CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Change counter and the value it had when each key last changed;
+        # only needed while loads are running
+        self._clock = 0
+        self._changed: Dict[Hashable, int] = {}
+        self._loads_in_flight = 0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Get a cached value or load it and put it into the cache."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if time.monotonic() - entry[0] < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+            self.misses += 1
+            self._loads_in_flight += 1
+            token = self._clock
+
+        value = None
+        loaded = False
+        try:
+            value = loader()
+            loaded = True
+        finally:
+            with self._lock:
+                self._loads_in_flight -= 1
+                if loaded and self._changed.get(key, 0) <= token:
+                    self._store(key, value)
+                if not self._loads_in_flight:
+                    self._changed.clear()
+        return value
+
+    def read(self, key: Hashable, loader: Callable[[], Any], func: Callable[[Any], Any]) -> Any:
+        """Get a cached value, loading it on a miss, and return func(value).
+
+        func runs under the cache lock, so it sees a value that ``update``
+        isn't changing at the same time. Use it to read values changed in place.
+        """
+        value = self.get_or_load(key, loader)
+        with self._lock:
+            return func(value)
+
+    def get(self, key: Hashable) -> Any:
+        """Get a cached value, or None if it isn't cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if time.monotonic() - entry[0] < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Put a value into the cache."""
+        with self._lock:
+            self._mark_changed(key)
+            self._store(key, value)
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        """Put a value into the cache, evicting the least recently used ones."""
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _mark_changed(self, key: Hashable) -> None:
+        if self._loads_in_flight:
+            self._clock += 1
+            self._changed[key] = self._clock
+
+    def update(self, key: Hashable, func: Callable[[Any], None]) -> None:
+        """Modify the cached value in place, if the key is cached."""
+        with self._lock:
+            self._mark_changed(key)
+            entry = self._entries.get(key)
+            if entry is not None:
+                func(entry[1])
+
+    def invalidate(self, key: Hashable) -> None:
+        """Remove a key from the cache."""
+        with self._lock:
+            self._mark_changed(key)
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all keys from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+rooms_cache = UserCache()
+materials_cache = UserCache()
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Get counters of the user data caches."""
+    return {
+        'rooms': rooms_cache.stats(),
+        'materials': materials_cache.stats()
+    }
@@ -0,0 +1,97 @@
+from abc import ABC, abstractmethod
+import json
+import logging
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+class Codec(ABC):
+    """Serialization format of user data files."""
+    name = ''
+
+    @abstractmethod
+    def encode(self, data: Any) -> bytes:
+        """Serialize data to bytes."""
+
+    @abstractmethod
+    def decode(self, raw: bytes) -> Any:
+        """Deserialize bytes written by encode."""
+
+class JsonCodec(Codec):
+    """Pretty-printed JSON, the format the files were always written in."""
+    name = 'json'
+
+    def encode(self, data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+    def decode(self, raw: bytes) -> Any:
+        return json.loads(raw)
+
+class CompactJsonCodec(Codec):
+    """JSON without whitespace, encoded with orjson when it is installed."""
+    name = 'compact'
+
+    def encode(self, data: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(data)
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, raw: bytes) -> Any:
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw)
+
+class MsgpackCodec(Codec):
+    """Binary MessagePack, requires the msgpack package."""
+    name = 'msgpack'
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError(
+                "The msgpack codec (DATA_CODEC=msgpack, or reading a MessagePack file) "
+                "requires the msgpack package: pip install msgpack"
+            )
+
+    def encode(self, data: Any) -> bytes:
+        return msgpack.packb(data, use_bin_type=True)
+
+    def decode(self, raw: bytes) -> Any:
+        return msgpack.unpackb(raw, raw=False)
+
+CODECS = {
+    JsonCodec.name: JsonCodec,
+    CompactJsonCodec.name: CompactJsonCodec,
+    MsgpackCodec.name: MsgpackCodec
+}
+
+_instances: Dict[str, Codec] = {}
+
+def get_codec(name: str) -> Codec:
+    """Get a codec by name."""
+    codec = _instances.get(name)
+    if codec is None:
+        if name not in CODECS:
+            raise ValueError(f"Unknown data codec: {name}")
+        codec = _instances[name] = CODECS[name]()
+    return codec
+
+def decode_any(raw: bytes) -> Any:
+    """Decode file content written by any codec.
+
+    JSON documents stored here always start with ``[`` or ``{``; anything
+    else is MessagePack.
+    """
+    head = raw.lstrip()[:1]
+    if not head or head in b'[{':
+        return get_codec(CompactJsonCodec.name).decode(raw)
+    return get_codec(MsgpackCodec.name).decode(raw)
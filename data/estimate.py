@@ -0,0 +1,157 @@
+"""
+Estimate of materials for all rooms of a user at once.
+
+Rooms and materials are turned into NumPy arrays and surface areas,
+quantities and costs of every room x material pair are computed with array
+operations instead of a Python loop per pair.
+"""
+import html
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+
+from data.materials import Material
+from data.rooms import Room
+
+# Surfaces in the order of the columns of BatchEstimate.surface_areas
+SURFACES = ('floor', 'walls', 'ceiling')
+# Material category -> surface it covers; other categories (doors, windows)
+# are counted in pieces
+CATEGORY_SURFACES = {
+    'Пол': 'floor',
+    'Стены': 'walls',
+    'Потолок': 'ceiling',
+    'floor': 'floor',
+    'walls': 'walls',
+    'wall': 'walls',
+    'ceiling': 'ceiling'
+}
+
+# How the quantity of a material is derived from the surface area
+UNIT_AREA = 0
+UNIT_VOLUME = 1
+UNIT_PIECE = 2
+UNIT_KINDS = {'м²': UNIT_AREA, 'м³': UNIT_VOLUME}
+
+NO_SURFACE = -1
+
+@dataclass
+class BatchEstimate:
+    """Areas, quantities and costs of all rooms x materials.
+
+    Rows of the 2D arrays are rooms, columns of ``quantities`` and ``costs``
+    are materials.
+    """
+    rooms: List[Room]
+    materials: List[Material]
+    surface_areas: np.ndarray
+    quantities: np.ndarray
+    costs: np.ndarray
+
+    @property
+    def room_totals(self) -> np.ndarray:
+        return self.costs.sum(axis=1)
+
+    @property
+    def material_quantities(self) -> np.ndarray:
+        return self.quantities.sum(axis=0)
+
+    @property
+    def material_totals(self) -> np.ndarray:
+        return self.costs.sum(axis=0)
+
+    @property
+    def total(self) -> float:
+        return float(self.costs.sum())
+
+def material_surface(material: Material) -> int:
+    """Get the surface column a material covers, or NO_SURFACE."""
+    surface = CATEGORY_SURFACES.get(material.category)
+    return SURFACES.index(surface) if surface else NO_SURFACE
+
+def material_unit_kind(material: Material) -> int:
+    """Get how the quantity of a material is calculated from its unit."""
+    if material_surface(material) == NO_SURFACE:
+        return UNIT_PIECE
+    return UNIT_KINDS.get(material.unit, UNIT_PIECE)
+
+def room_arrays(rooms: Sequence[Room]) -> np.ndarray:
+    """Get a (rooms, 3) array of length, width and height."""
+    return np.array([(r.length, r.width, r.height) for r in rooms], dtype=np.float64).reshape(-1, 3)
+
+def material_arrays(materials: Sequence[Material]):
+    """Get arrays of price, surface column and unit kind of materials."""
+    prices = np.array([m.price for m in materials], dtype=np.float64)
+    surfaces = np.array([material_surface(m) for m in materials], dtype=np.intp)
+    kinds = np.array([material_unit_kind(m) for m in materials], dtype=np.int8)
+    return prices, surfaces, kinds
+
+def surface_areas(dimensions: np.ndarray) -> np.ndarray:
+    """Get a (rooms, 3) array of floor, wall and ceiling areas."""
+    length, width, height = dimensions.T
+    floor = length * width
+    walls = 2 * (length + width) * height
+    return np.stack([floor, walls, floor], axis=1)
+
+def calculate_batch(
+    dimensions: np.ndarray,
+    prices: np.ndarray,
+    surfaces: np.ndarray,
+    kinds: np.ndarray
+):
+    """Compute surface areas, quantities and costs of all rooms x materials.
+
+    Quantities follow the material calculation dialog: area for м²,
+    area times height for м³ and one piece per room otherwise.
+    """
+    areas = surface_areas(dimensions)
+    # Area of the surface each material covers in each room, (rooms, materials)
+    covered = areas[:, np.maximum(surfaces, 0)]
+    heights = dimensions[:, 2:3]
+    quantities = np.where(
+        kinds == UNIT_AREA,
+        covered,
+        np.where(kinds == UNIT_VOLUME, covered * heights, 1.0)
+    )
+    costs = quantities * prices
+    return areas, quantities, costs
+
+def estimate_apartment(rooms: Sequence[Room], materials: Sequence[Material]) -> BatchEstimate:
+    """Estimate every material of the user for every room."""
+    dimensions = room_arrays(rooms)
+    prices, surfaces, kinds = material_arrays(materials)
+    areas, quantities, costs = calculate_batch(dimensions, prices, surfaces, kinds)
+    return BatchEstimate(list(rooms), list(materials), areas, quantities, costs)
+
+def format_apartment_estimate(estimate: BatchEstimate, max_rows: int = 30) -> str:
+    """Format a whole apartment estimate for display."""
+    areas = estimate.surface_areas.sum(axis=0)
+    lines = [
+        "🏢 <b>Смета по квартире</b>\n",
+        f"🏠 Помещений: {len(estimate.rooms)}",
+        f"⬜ Площадь пола: {areas[0]:.2f} м²",
+        f"🧱 Площадь стен: {areas[1]:.2f} м²",
+        f"🪟 Площадь потолка: {areas[2]:.2f} м²",
+        "\n<b>Материалы:</b>"
+    ]
+
+    quantities = estimate.material_quantities
+    material_totals = estimate.material_totals
+    for index, material in enumerate(estimate.materials[:max_rows]):
+        lines.append(
+            f"- {html.escape(material.name)}: {quantities[index]:.2f} {material.unit}, "
+            f"{material_totals[index]:.2f} ₽"
+        )
+    if len(estimate.materials) > max_rows:
+        lines.append(f"... и еще {len(estimate.materials) - max_rows}")
+
+    lines.append("\n<b>По помещениям:</b>")
+    room_totals = estimate.room_totals
+    for index, room in enumerate(estimate.rooms[:max_rows]):
+        lines.append(f"- {html.escape(room.name)}: {room_totals[index]:.2f} ₽")
+    if len(estimate.rooms) > max_rows:
+        lines.append(f"... и еще {len(estimate.rooms) - max_rows}")
+
+    lines.append(f"\n<b>Всего: {estimate.total:.2f} ₽</b>")
+    return "\n".join(lines)
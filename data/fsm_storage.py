@@ -0,0 +1,348 @@
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from config.settings import FSM_STORAGE, FSM_SQLITE_PATH, FSM_FLUSH_INTERVAL, FSM_STATE_TTL, FSM_MAX_STATES
+from data.materials import Material
+from data.room import Room as EstimateRoom
+from data.rooms import Room
+
+logger = logging.getLogger(__name__)
+
+# Classes that handlers keep in FSM data; only these are restored on load
+STATE_TYPES: Dict[str, type] = {}
+
+def register_state_type(cls: type) -> type:
+    """Allow instances of a dataclass to be stored in FSM data."""
+    STATE_TYPES[f"{cls.__module__}.{cls.__qualname__}"] = cls
+    return cls
+
+for _cls in (Room, Material, EstimateRoom):
+    register_state_type(_cls)
+
+# Key of tagged values; a tagged value has exactly the keys TAG_KEYS, so user
+# dicts with other keys are never taken for one
+TAG = '__fsm__'
+TAG_KEYS = {TAG, 'v'}
+
+def _encode_value(value: Any) -> Any:
+    """Turn values json can't serialize into tagged dicts."""
+    if isinstance(value, datetime):
+        return {TAG: 'datetime', 'v': value.isoformat()}
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        name = f"{type(value).__module__}.{type(value).__qualname__}"
+        if name not in STATE_TYPES:
+            raise TypeError(f"{name} is not registered with register_state_type")
+        fields = {f.name: getattr(value, f.name) for f in dataclasses.fields(value)}
+        return {TAG: name, 'v': fields}
+    raise TypeError(f"Object of type {type(value).__name__} can't be stored in FSM data")
+
+def _decode_value(obj: Dict) -> Any:
+    if obj.keys() == TAG_KEYS:
+        tag = obj[TAG]
+        if tag == 'datetime':
+            return datetime.fromisoformat(obj['v'])
+        if tag in STATE_TYPES:
+            return STATE_TYPES[tag](**obj['v'])
+    # Tags written by earlier versions
+    elif obj.keys() == {'__datetime__'}:
+        return datetime.fromisoformat(obj['__datetime__'])
+    elif obj.keys() == {'__dataclass__', 'fields'} and obj['__dataclass__'] in STATE_TYPES:
+        return STATE_TYPES[obj['__dataclass__']](**obj['fields'])
+    return obj
+
+def encode_data(data: Mapping[str, Any]) -> Optional[str]:
+    """Serialize FSM data; empty data is stored as NULL."""
+    if not data:
+        return None
+    return json.dumps(dict(data), default=_encode_value, ensure_ascii=False, separators=(',', ':'))
+
+def decode_data(raw: Optional[str]) -> Dict[str, Any]:
+    """Deserialize FSM data written by encode_data."""
+    if not raw:
+        return {}
+    return json.loads(raw, object_hook=_decode_value)
+
+_UNCHANGED = object()
+
+class SQLiteStorage(BaseStorage):
+    """FSM storage in a SQLite database that survives restarts.
+
+    All database access happens on one worker thread. Changes are kept in
+    memory for ``flush_interval`` seconds and then written in a single
+    transaction; until then reads are answered from the pending changes.
+    Rows of finished dialogs (no state and no data) are deleted, and rows
+    not changed for ``ttl`` seconds are deleted when the storage is opened.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS fsm (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT,
+            updated_at REAL NOT NULL
+        );
+    """
+
+    def __init__(
+        self,
+        path: str = FSM_SQLITE_PATH,
+        flush_interval: float = FSM_FLUSH_INTERVAL,
+        ttl: Optional[float] = None
+    ):
+        self.path = path
+        self.ttl = ttl
+        self._flush_interval = flush_interval
+        self._key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm")
+        self._conn: Optional[sqlite3.Connection] = None
+        # key -> [state, encoded data], _UNCHANGED where the column isn't changed
+        self._pending: Dict[str, list] = {}
+        # Batch being written, still visible to reads until the commit
+        self._flushing: Dict[str, list] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._closed = False
+        self._executor.submit(self._open).result()
+
+    def _open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        if self.ttl:
+            with self._conn:
+                deleted = self._conn.execute(
+                    "DELETE FROM fsm WHERE updated_at < ?", (time.time() - self.ttl,)
+                ).rowcount
+            if deleted:
+                logger.info(f"Deleted {deleted} idle FSM states")
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args))
+
+    def _lookup(self, key: str, column: int) -> Any:
+        """Get a pending value of a column, or _UNCHANGED."""
+        for changes in (self._pending, self._flushing):
+            change = changes.get(key)
+            if change is not None and change[column] is not _UNCHANGED:
+                return change[column]
+        return _UNCHANGED
+
+    def _select(self, key: str, column: str) -> Optional[str]:
+        row = self._conn.execute(f"SELECT {column} FROM fsm WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _change(self, key: str, column: int, value: Any) -> None:
+        """Queue a column change and schedule a flush."""
+        change = self._pending.setdefault(key, [_UNCHANGED, _UNCHANGED])
+        change[column] = value
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self._flush_interval)
+        await self._flush()
+
+    async def _flush(self) -> None:
+        """Write all pending changes in one transaction."""
+        self._flush_task = None
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            self._flushing, self._pending = self._pending, {}
+            try:
+                await self._run(self._write, self._flushing)
+            except Exception as e:
+                logger.error(f"Error saving FSM state of {len(self._flushing)} chats: {e}")
+                # Keep the changes for the next flush, newer ones win
+                for key, change in self._flushing.items():
+                    newer = self._pending.setdefault(key, [_UNCHANGED, _UNCHANGED])
+                    for column in (0, 1):
+                        if newer[column] is _UNCHANGED:
+                            newer[column] = change[column]
+                if self._flush_task is None and not self._closed:
+                    self._flush_task = asyncio.create_task(self._flush_later())
+            finally:
+                self._flushing = {}
+
+    def _write(self, changes: Dict[str, list]) -> None:
+        now = time.time()
+        states = [(key, c[0], now) for key, c in changes.items() if c[0] is not _UNCHANGED]
+        datas = [(key, c[1], now) for key, c in changes.items() if c[1] is not _UNCHANGED]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO fsm (key, state, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                states
+            )
+            self._conn.executemany(
+                "INSERT INTO fsm (key, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                datas
+            )
+            self._conn.executemany(
+                "DELETE FROM fsm WHERE key = ? AND state IS NULL AND data IS NULL",
+                [(key,) for key in changes]
+            )
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        self._change(self._key_builder.build(key), 0, state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        db_key = self._key_builder.build(key)
+        state = self._lookup(db_key, 0)
+        if state is _UNCHANGED:
+            state = await self._run(self._select, db_key, 'state')
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        # Encoding right away reports unsupported values to the handler
+        self._change(self._key_builder.build(key), 1, encode_data(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        db_key = self._key_builder.build(key)
+        raw = self._lookup(db_key, 1)
+        if raw is _UNCHANGED:
+            raw = await self._run(self._select, db_key, 'data')
+        return decode_data(raw)
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._flush_task is not None:
+            # Still waiting for the flush interval; the changes are written below
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self._flush()
+        await self._run(self._conn.close)
+        self._executor.shutdown(wait=True)
+        logger.info("FSM storage closed")
+
+class ExpiringStorage(BaseStorage):
+    """FSM storage wrapper that forgets abandoned dialogs.
+
+    Keys that have a state or data are tracked in access order. A key not
+    used for ``ttl`` seconds is cleared, and when more than ``max_states``
+    keys are tracked the least recently used ones are cleared too. Eviction
+    happens on access to the storage, so no background task is needed.
+    """
+
+    def __init__(self, storage: BaseStorage, ttl: float = FSM_STATE_TTL, max_states: int = FSM_MAX_STATES):
+        self.storage = storage
+        self.ttl = ttl
+        self.max_states = max_states
+        self.expired = 0
+        self.evicted = 0
+        self._last_access: "OrderedDict[StorageKey, float]" = OrderedDict()
+        # Memory storage can't have data the wrapper hasn't seen, so reads of
+        # untracked keys don't need to touch it (and create records there)
+        self._volatile = isinstance(storage, MemoryStorage)
+
+    def _touch(self, key: StorageKey) -> None:
+        self._last_access[key] = time.monotonic()
+        self._last_access.move_to_end(key)
+
+    def _forget(self, key: StorageKey) -> None:
+        """Stop tracking a key whose dialog is finished."""
+        self._last_access.pop(key, None)
+        if self._volatile:
+            self.storage.storage.pop(key, None)
+
+    async def _drop(self, key: StorageKey) -> None:
+        """Clear the dialog of a key."""
+        if not self._volatile:
+            await self.storage.set_state(key, None)
+            await self.storage.set_data(key, {})
+        self._forget(key)
+
+    async def _evict(self) -> None:
+        """Clear idle keys and keys over the limit, oldest first."""
+        deadline = time.monotonic() - self.ttl
+        while self._last_access:
+            key, accessed = next(iter(self._last_access.items()))
+            if accessed < deadline:
+                self.expired += 1
+            elif len(self._last_access) > self.max_states:
+                self.evicted += 1
+            else:
+                break
+            await self._drop(key)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self.storage.set_state(key, state)
+        if state is not None:
+            self._touch(key)
+        elif key not in self._last_access or not await self.storage.get_data(key):
+            self._forget(key)
+        await self._evict()
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        await self._evict()
+        if key in self._last_access:
+            self._touch(key)
+        elif self._volatile:
+            return None
+        state = await self.storage.get_state(key)
+        if state is not None:
+            # Dialog saved before a restart
+            self._touch(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self.storage.set_data(key, data)
+        if data:
+            self._touch(key)
+        elif key not in self._last_access or await self.storage.get_state(key) is None:
+            self._forget(key)
+        await self._evict()
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        await self._evict()
+        if key in self._last_access:
+            self._touch(key)
+        elif self._volatile:
+            return {}
+        data = await self.storage.get_data(key)
+        if data:
+            self._touch(key)
+        return data
+
+    def stats(self) -> Dict[str, int]:
+        """Get the number of tracked dialogs and eviction counters."""
+        return {
+            'size': len(self._last_access),
+            'expired': self.expired,
+            'evicted': self.evicted
+        }
+
+    async def close(self) -> None:
+        await self.storage.close()
+
+def create_fsm_storage(kind: str = FSM_STORAGE) -> ExpiringStorage:
+    """Create the FSM storage selected in the settings."""
+    if kind == "sqlite":
+        storage = SQLiteStorage(ttl=FSM_STATE_TTL)
+    elif kind == "memory":
+        storage = MemoryStorage()
+    else:
+        raise ValueError(f"Unknown FSM storage: {kind}")
+    return ExpiringStorage(storage)
@@ -0,0 +1,201 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+from data.codecs import Codec, CompactJsonCodec, decode_any, get_codec
+
+logger = logging.getLogger(__name__)
+
+Record = Dict
+Operation = Dict
+
+def read_file(path: str) -> Any:
+    """Read a data file written by any codec."""
+    with open(path, 'rb') as f:
+        return decode_any(f.read())
+
+def write_atomic(path: str, data: Any, codec: Codec) -> None:
+    """Write data to a temp file and rename it over the target.
+
+    Readers see either the old or the new content, never a half-written file.
+    """
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(codec.encode(data))
+    os.replace(tmp_path, path)
+
+class JournalStorage:
+    """Per-user snapshot file with an append-only journal of operations.
+
+    Every journal line is a compact JSON record ``{"seq": n, "op": {...}}``,
+    the snapshot is written with the given codec.
+    Reads replay the journal over the snapshot; once the journal grows past
+    ``compact_size`` bytes it is folded into a new snapshot in a background
+    thread. The snapshot remembers the last folded ``seq``, so records that
+    are already part of it are skipped if the process dies mid-compaction.
+    """
+
+    def __init__(
+        self,
+        paths: Callable[[int], Tuple[str, str]],
+        apply: Callable[[List[Record], Operation], List[Record]],
+        prepare: Callable[[List[Record]], None],
+        compact_size: int,
+        codec: Codec
+    ):
+        """
+        Args:
+            paths: Returns (snapshot path, journal path) for a user.
+            apply: Applies one operation to the list of records.
+            prepare: Upgrades records read from a snapshot in place
+                before the journal is replayed over them.
+            compact_size: Journal size in bytes that triggers compaction.
+            codec: Format of snapshot files.
+        """
+        self._paths = paths
+        self._apply = apply
+        self._prepare = prepare
+        self._compact_size = compact_size
+        self._codec = codec
+        # Journal lines must not contain newlines, so they are always compact JSON
+        self._line_codec = get_codec(CompactJsonCodec.name)
+        self._locks: Dict[int, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        # Last written seq per user, so appends don't have to re-read the journal
+        self._seq: Dict[int, int] = {}
+        self._compacting = set()
+        self._compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal-compactor")
+
+    def _lock(self, user_id: int) -> threading.Lock:
+        """Get the lock guarding the user's files."""
+        with self._locks_guard:
+            return self._locks.setdefault(user_id, threading.Lock())
+
+    def _read(self, user_id: int) -> Tuple[int, List[Record]]:
+        """Read the snapshot and replay the journal over it."""
+        snapshot_path, journal_path = self._paths(user_id)
+        seq, records = 0, []
+
+        if os.path.exists(snapshot_path):
+            data = read_file(snapshot_path)
+            # Plain list is the snapshot format used before journaling
+            if isinstance(data, dict):
+                seq, records = data['seq'], data['items']
+            else:
+                records = data
+            self._prepare(records)
+
+        snapshot_seq = seq
+        if os.path.exists(journal_path):
+            with open(journal_path, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = self._line_codec.decode(line)
+                    except ValueError:
+                        # Only the last line can be torn by a crash during append
+                        logger.warning(f"Skipping damaged journal record for user {user_id}")
+                        continue
+                    if entry['seq'] <= snapshot_seq:
+                        continue
+                    records = self._apply(records, entry['op'])
+                    seq = entry['seq']
+
+        return seq, records
+
+    def _write_snapshot(self, user_id: int, seq: int, records: List[Record]) -> None:
+        """Write the snapshot file."""
+        snapshot_path, _ = self._paths(user_id)
+        data = records if seq == 0 else {'seq': seq, 'items': records}
+        write_atomic(snapshot_path, data, self._codec)
+
+    @staticmethod
+    def _has_torn_tail(journal_path: str) -> bool:
+        """Check whether the journal ends in the middle of a line."""
+        if not os.path.exists(journal_path) or os.path.getsize(journal_path) == 0:
+            return False
+        with open(journal_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b'\n'
+
+    def load(self, user_id: int) -> List[Record]:
+        """Get the current records for a user."""
+        # Compaction replaces the snapshot and then removes the journal; an
+        # unlocked read could see the old snapshot and no journal
+        with self._lock(user_id):
+            return self._read(user_id)[1]
+
+    def append(self, user_id: int, ops: List[Operation]) -> None:
+        """Append operations to the user's journal in one write."""
+        _, journal_path = self._paths(user_id)
+
+        with self._lock(user_id):
+            seq = self._seq.get(user_id)
+            prefix = b''
+            if seq is None:
+                # First append since start: a crash may have left a torn last line
+                seq = self._read(user_id)[0]
+                if self._has_torn_tail(journal_path):
+                    prefix = b'\n'
+            lines = []
+            for op in ops:
+                seq += 1
+                lines.append(self._line_codec.encode({'seq': seq, 'op': op}) + b'\n')
+
+            with open(journal_path, 'ab') as f:
+                f.write(prefix + b''.join(lines))
+                size = f.tell()
+            self._seq[user_id] = seq
+
+        if size >= self._compact_size:
+            self._schedule_compaction(user_id)
+
+    def rewrite(self, user_id: int, ops: List[Operation]) -> None:
+        """Apply operations by rewriting the whole snapshot once."""
+        _, journal_path = self._paths(user_id)
+
+        with self._lock(user_id):
+            seq, records = self._read(user_id)
+            for op in ops:
+                records = self._apply(records, op)
+            self._write_snapshot(user_id, seq, records)
+            if os.path.exists(journal_path):
+                os.remove(journal_path)
+            self._seq[user_id] = seq
+
+    def compact(self, user_id: int) -> None:
+        """Fold the user's journal into a new snapshot."""
+        _, journal_path = self._paths(user_id)
+
+        with self._lock(user_id):
+            if not os.path.exists(journal_path):
+                return
+            seq, records = self._read(user_id)
+            self._write_snapshot(user_id, seq, records)
+            os.remove(journal_path)
+            self._seq[user_id] = seq
+        logger.info(f"Journal compacted for user {user_id} at seq {seq}")
+
+    def _schedule_compaction(self, user_id: int) -> None:
+        """Run compaction in the background unless it is already queued."""
+        with self._locks_guard:
+            if user_id in self._compacting:
+                return
+            self._compacting.add(user_id)
+        self._compactor.submit(self._compact_task, user_id)
+
+    def _compact_task(self, user_id: int) -> None:
+        try:
+            self.compact(user_id)
+        except Exception as e:
+            logger.error(f"Error compacting journal for user {user_id}: {e}")
+        finally:
+            with self._locks_guard:
+                self._compacting.discard(user_id)
+
+    def shutdown(self) -> None:
+        """Wait for queued compactions to finish."""
+        self._compactor.shutdown(wait=True)
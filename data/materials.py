@@ -1,8 +1,10 @@
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 from datetime import datetime
-import json
-import os
+import copy
+
+from data.storage import get_storage
+from data.cache import materials_cache
 
 @dataclass
 class Material:
@@ -109,29 +111,26 @@ def get_material(category: str, material_id: str) -> Material:
     """Get specific material by category and ID."""
     return ALL_MATERIALS.get(category, {}).get(material_id) 
 
-def get_material_file_path(user_id: int) -> str:
-    """Get path to user's materials file."""
-    return f"data/users/{user_id}_materials.json"
-
 def save_material(user_id: int, material: Material) -> None:
     """Save material to user's file."""
-    file_path = get_material_file_path(user_id)
-    materials = get_user_materials(user_id)
-    materials.append(material)
-    
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump([m.to_dict() for m in materials], f, ensure_ascii=False, indent=2)
+    save_materials(user_id, [material])
+
+def save_materials(user_id: int, materials: List[Material]) -> None:
+    """Save several materials to user's file in one write."""
+    get_storage().add_materials(user_id, [m.to_dict() for m in materials])
+    cached = [copy.copy(m) for m in materials]
+    materials_cache.update(user_id, lambda stored: stored.extend(cached))
 
 def get_user_materials(user_id: int) -> List[Material]:
     """Get all materials for user."""
-    file_path = get_material_file_path(user_id)
-    if not os.path.exists(file_path):
-        return []
-    
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-        return [Material.from_dict(m) for m in data]
+    # The cached list is extended in place by save_materials, so it is copied
+    # under the cache lock; callers may modify materials, so never hand out
+    # the cached objects
+    return materials_cache.read(
+        user_id,
+        lambda: [Material.from_dict(m) for m in get_storage().load_materials(user_id)],
+        lambda materials: [copy.copy(m) for m in materials]
+    )
 
 def format_material_info(material: Material) -> str:
     """Format material information for display."""
@@ -0,0 +1,40 @@
+"""
+Batch migration of data/users from the flat to the sharded layout.
+
+The bot also moves files lazily on first access, this command moves all of
+them at once, e.g. before a backup. Already moved files are skipped, so it
+can be run repeatedly and while the bot is running.
+
+Usage:
+    python -m data.migrate_shards
+"""
+import logging
+from pathlib import Path
+
+from config.settings import USERS_DIR_LAYOUT
+from data.paths import USERS_DIR, USER_FILE_PATTERN, get_user_file
+
+logger = logging.getLogger(__name__)
+
+def migrate() -> int:
+    """Move all files from the flat layout and return how many were moved."""
+    moved = 0
+    for file_path in Path(USERS_DIR).iterdir():
+        match = USER_FILE_PATTERN.match(file_path.name)
+        if not match or not file_path.is_file():
+            continue
+        try:
+            get_user_file(int(match.group(1)), file_path.name)
+            if not file_path.exists():
+                moved += 1
+        except Exception as e:
+            logger.error(f"Error moving {file_path}: {e}")
+    return moved
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if USERS_DIR_LAYOUT != 'sharded':
+        logger.error("USERS_DIR_LAYOUT is not \"sharded\", nothing to migrate")
+    else:
+        count = migrate()
+        logger.info(f"Migration finished, files moved: {count}")
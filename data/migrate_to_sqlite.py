@@ -0,0 +1,54 @@
+"""
+One-shot migration of per-user JSON files into the SQLite storage.
+
+Rooms (including not yet compacted journals) and materials of every user
+found in data/users are copied into the database. Running it again replaces
+the migrated users' rows, so it is safe to repeat before switching
+STORAGE_BACKEND to "sqlite".
+
+Usage:
+    python -m data.migrate_to_sqlite [--db data/storage.db]
+"""
+import argparse
+import logging
+
+from config.settings import SQLITE_PATH
+from data.paths import iter_user_files
+from data.storage import FileBackend, SQLiteBackend
+
+logger = logging.getLogger(__name__)
+
+def find_user_ids() -> list:
+    """Get ids of all users that have data files."""
+    return sorted({user_id for user_id, _ in iter_user_files()})
+
+def migrate(db_path: str = SQLITE_PATH) -> int:
+    """Copy all users' data into the database and return the number of users."""
+    files = FileBackend()
+    database = SQLiteBackend(db_path)
+    migrated = 0
+
+    try:
+        for user_id in find_user_ids():
+            try:
+                rooms = files.load_rooms(user_id)
+                materials = files.load_materials(user_id)
+                database.replace_user_data(user_id, rooms, materials)
+                migrated += 1
+                logger.info(f"Migrated user {user_id}: {len(rooms)} rooms, {len(materials)} materials")
+            except Exception as e:
+                logger.error(f"Error migrating user {user_id}: {e}")
+    finally:
+        files.close()
+        database.close()
+
+    return migrated
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=SQLITE_PATH, help="path to the SQLite database")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    count = migrate(args.db)
+    logger.info(f"Migration finished, users migrated: {count}")
@@ -0,0 +1,76 @@
+import hashlib
+import os
+import logging
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, Tuple
+
+from config.settings import USERS_DIR_LAYOUT
+
+logger = logging.getLogger(__name__)
+
+USERS_DIR = 'data/users'
+USER_FILE_PATTERN = re.compile(r'^(\d+)_(rooms|materials)\.(json|journal)$')
+
+def get_user_dir(user_id: int) -> str:
+    """Get the directory with the user's files.
+
+    In the sharded layout it is two levels of hex prefixes of the user id
+    hash, e.g. data/users/3f/a2, so no directory holds too many files.
+    """
+    if USERS_DIR_LAYOUT != 'sharded':
+        return USERS_DIR
+    digest = hashlib.sha1(str(user_id).encode()).hexdigest()
+    return f'{USERS_DIR}/{digest[:2]}/{digest[2:4]}'
+
+def get_user_file(user_id: int, file_name: str) -> str:
+    """Get the path to a user's file, moving it from the flat layout if needed."""
+    user_dir = get_user_dir(user_id)
+    path = f'{user_dir}/{file_name}'
+    if user_dir != USERS_DIR:
+        _migrate_legacy_file(path, f'{USERS_DIR}/{file_name}')
+    return path
+
+@lru_cache(maxsize=65536)
+def _migrate_legacy_file(path: str, legacy_path: str) -> None:
+    """Move a file from the flat layout to its shard on first access.
+
+    Cached, so each file is checked once while it stays in the cache.
+    """
+    if os.path.exists(path) or not os.path.exists(legacy_path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        # Unlike os.replace, a hard link fails if another process has created
+        # the sharded file in the meantime, so a newer file is never overwritten
+        os.link(legacy_path, path)
+    except (FileExistsError, FileNotFoundError):
+        # The sharded file already exists, or another thread has just moved it
+        return
+    os.unlink(legacy_path)
+    logger.info(f"Moved {legacy_path} to {path}")
+
+def get_rooms_file(user_id: int) -> str:
+    """Get the path to the user's rooms file."""
+    try:
+        os.makedirs(get_user_dir(user_id), exist_ok=True)
+        return get_user_file(user_id, f'{user_id}_rooms.json')
+    except Exception as e:
+        logger.error(f"Error getting rooms file: {e}")
+        raise
+
+def get_rooms_journal_file(user_id: int) -> str:
+    """Get the path to the user's rooms journal."""
+    return get_user_file(user_id, f'{user_id}_rooms.journal')
+
+def get_material_file_path(user_id: int) -> str:
+    """Get path to user's materials file."""
+    return get_user_file(user_id, f"{user_id}_materials.json")
+
+def iter_user_files(users_dir: str = USERS_DIR) -> Iterator[Tuple[int, Path]]:
+    """Iterate over (user id, path) of all user data files in any layout."""
+    for file_path in Path(users_dir).rglob('*'):
+        match = USER_FILE_PATTERN.match(file_path.name)
+        if match and file_path.is_file():
+            yield int(match.group(1)), file_path
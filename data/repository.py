@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, Optional, Sequence, Set, TypeVar
+
+from config.settings import STORAGE_WORKERS, STORAGE_MAX_PENDING, STORAGE_COALESCE_WINDOW
+from data import rooms as rooms_storage
+from data import materials as materials_storage
+from data import room_io
+from data.rooms import Room
+from data.materials import Material
+from data.room_io import ImportResult
+from data.storage import close_storage
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class _PendingWrites:
+    """Changes of one user waiting to be written together."""
+
+    def __init__(self):
+        self.room_ops: List[Dict] = []
+        self.materials: List[Material] = []
+        self.futures: List[asyncio.Future] = []
+
+class Repository:
+    """Async facade over the room and material storage.
+
+    Storage functions do blocking file I/O, so every call is executed in a
+    bounded thread pool instead of the event loop.
+
+    Changes of the same user are serialized: they are collected for
+    ``coalesce_window`` seconds and written by a single storage call, and the
+    next batch of that user is written only after the previous one finished.
+    Different users are written in parallel.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = STORAGE_WORKERS,
+        max_pending: int = STORAGE_MAX_PENDING,
+        coalesce_window: float = STORAGE_COALESCE_WINDOW
+    ):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="storage"
+        )
+        # Limits how many operations may wait for a worker at the same time
+        self._semaphore = asyncio.Semaphore(max_pending)
+        self._coalesce_window = coalesce_window
+        self._pending: Dict[int, _PendingWrites] = {}
+        self._user_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._flush_tasks: Set[asyncio.Task] = set()
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        """Run a blocking storage function in the executor."""
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(func, *args))
+
+    def _user_lock(self, user_id: int) -> asyncio.Lock:
+        """Get the lock that serializes writes of a user."""
+        lock = self._user_locks.get(user_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._user_locks[user_id] = lock
+        return lock
+
+    async def _submit(self, user_id: int, room_ops: Sequence[Dict] = (), materials: Sequence[Material] = ()) -> None:
+        """Queue changes and wait until they are written."""
+        batch = self._pending.get(user_id)
+        if batch is None:
+            batch = self._pending[user_id] = _PendingWrites()
+            task = asyncio.create_task(self._flush(user_id))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+        batch.room_ops.extend(room_ops)
+        batch.materials.extend(materials)
+        future = asyncio.get_running_loop().create_future()
+        batch.futures.append(future)
+        await future
+
+    async def _flush(self, user_id: int) -> None:
+        """Write the user's queued changes after the coalescing window."""
+        await asyncio.sleep(self._coalesce_window)
+        async with self._user_lock(user_id):
+            # Changes keep joining the batch until the previous write is done
+            batch = self._pending.pop(user_id)
+            try:
+                await self._run(self._write, user_id, batch)
+                logger.info(f"Saved {len(batch.futures)} changes for user {user_id}")
+            except Exception as e:
+                logger.error(f"Error saving changes for user {user_id}: {e}")
+                for future in batch.futures:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for future in batch.futures:
+                    if not future.done():
+                        future.set_result(None)
+
+    @staticmethod
+    def _write(user_id: int, batch: _PendingWrites) -> None:
+        """Write a batch of changes with one storage call per data kind."""
+        if batch.room_ops:
+            rooms_storage.apply_room_changes(user_id, batch.room_ops)
+        if batch.materials:
+            materials_storage.save_materials(user_id, batch.materials)
+
+    async def get_rooms(self, user_id: int) -> List[Room]:
+        """Get all rooms for a user."""
+        return await self._run(rooms_storage.get_user_rooms, user_id)
+
+    async def save_room(self, user_id: int, room: Room) -> None:
+        """Save a room for a user."""
+        await self._submit(user_id, room_ops=[rooms_storage.add_room_op(room)])
+
+    async def save_rooms(self, user_id: int, rooms: Sequence[Room]) -> None:
+        """Save many rooms for a user with a single storage write."""
+        await self._submit(user_id, room_ops=[rooms_storage.add_room_op(room) for room in rooms])
+
+    async def import_rooms(self, user_id: int, path: str, file_format: str) -> ImportResult:
+        """Read rooms from a CSV/XLSX file and save them if the file is valid.
+
+        Nothing is saved when any row is invalid, so a corrected file can be
+        uploaded again without duplicating rooms.
+        """
+        result = await self._run(room_io.read_rooms_file, path, file_format)
+        if result.rooms and not result.errors:
+            await self.save_rooms(user_id, result.rooms)
+        return result
+
+    async def export_rooms(self, user_id: int, path: str, file_format: str) -> int:
+        """Write the user's rooms to a CSV/XLSX file and return their number."""
+        rooms = await self.get_rooms(user_id)
+        if rooms:
+            await self._run(room_io.write_rooms_file, rooms, path, file_format)
+        return len(rooms)
+
+    async def get_room(self, user_id: int, room_id: str) -> Optional[Room]:
+        """Get a room by id."""
+        return await self._run(rooms_storage.get_room, user_id, room_id)
+
+    async def update_room(self, user_id: int, room_id: str, **fields) -> None:
+        """Update fields (name, length, width, height) of a room."""
+        await self._submit(user_id, room_ops=[rooms_storage.update_room_op(room_id, **fields)])
+
+    async def delete_room(self, user_id: int, room_id: str) -> None:
+        """Delete a room."""
+        await self._submit(user_id, room_ops=[rooms_storage.delete_room_op(room_id)])
+
+    async def get_materials(self, user_id: int) -> List[Material]:
+        """Get all materials for a user."""
+        return await self._run(materials_storage.get_user_materials, user_id)
+
+    async def save_material(self, user_id: int, material: Material) -> None:
+        """Save a material for a user."""
+        await self._submit(user_id, materials=[material])
+
+    async def shutdown(self) -> None:
+        """Write queued changes and stop the executor."""
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+        close_storage()
+        logger.info("Storage executor stopped")
+
+repo = Repository()
@@ -0,0 +1,198 @@
+"""
+Import and export of rooms as CSV or XLSX files.
+
+Files are read in chunks of IMPORT_CHUNK_SIZE rows and every chunk is
+validated with vectorized pandas operations, so large uploads never have to
+be held in memory as a whole.
+"""
+import codecs
+import csv
+import logging
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+from typing import Iterator, List, Optional, Sequence
+
+import openpyxl
+from openpyxl.utils.exceptions import InvalidFileException
+import pandas as pd
+
+from config.settings import IMPORT_CHUNK_SIZE, IMPORT_MAX_ROOMS
+from data.rooms import Room
+from data.storage import ROOM_FIELDS, room_dimensions
+
+logger = logging.getLogger(__name__)
+
+FILE_FORMATS = ('csv', 'xlsx')
+IMPORT_COLUMNS = ('name', 'length', 'width', 'height')
+COLUMN_ALIASES = {
+    'название': 'name',
+    'помещение': 'name',
+    'длина': 'length',
+    'ширина': 'width',
+    'высота': 'height'
+}
+# Same limits as in the room dialog
+MAX_NAME_LENGTH = 50
+DIMENSION_LIMITS = {'length': 100, 'width': 100, 'height': 10}
+DIMENSION_LABELS = {'length': 'длина', 'width': 'ширина', 'height': 'высота'}
+MAX_REPORTED_ERRORS = 10
+
+@dataclass
+class ImportResult:
+    """Rooms read from a file and problems found in it."""
+    rooms: List[Room] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    # Number of problems, including the ones not kept in errors
+    error_count: int = 0
+
+    def add_error(self, error: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(error)
+
+def get_file_format(filename: Optional[str]) -> Optional[str]:
+    """Get the file format from a file name, or None if it isn't supported."""
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    return extension if extension in FILE_FORMATS else None
+
+def _detect_encoding(path: str) -> str:
+    """Tell UTF-8 files from the cp1251 ones Excel writes on Russian systems."""
+    with open(path, 'rb') as f:
+        head = f.read(65536)
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        return 'cp1251'
+
+def _iter_csv(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    # The separator is sniffed because Excel writes ";" in Russian locales
+    yield from pd.read_csv(
+        path,
+        sep=None,
+        engine='python',
+        dtype=str,
+        keep_default_na=False,
+        encoding=_detect_encoding(path),
+        chunksize=chunk_size
+    )
+
+def _iter_xlsx(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = ['' if value is None else str(value) for value in header]
+        start = 0
+        while True:
+            batch = list(islice(rows, chunk_size))
+            if not batch:
+                break
+            index = pd.RangeIndex(start, start + len(batch))
+            yield pd.DataFrame(batch, columns=columns, index=index, dtype=object)
+            start += len(batch)
+    finally:
+        workbook.close()
+
+def iter_chunks(path: str, file_format: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Read a rooms file as data frames of at most chunk_size rows.
+
+    Frame index is the number of the data row, starting from 0.
+    """
+    if file_format == 'csv':
+        return _iter_csv(path, chunk_size)
+    if file_format == 'xlsx':
+        return _iter_xlsx(path, chunk_size)
+    raise ValueError(f"Unsupported file format: {file_format}")
+
+def _normalize_columns(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Rename known column headers (English or Russian) to room fields."""
+    names = {}
+    for column in chunk.columns:
+        key = str(column).strip().lower()
+        names[column] = COLUMN_ALIASES.get(key, key)
+    return chunk.rename(columns=names)
+
+def _validate_chunk(chunk: pd.DataFrame, result: ImportResult, created_at: datetime) -> None:
+    """Convert valid rows of a chunk to rooms and record errors of the others."""
+    text = chunk[list(IMPORT_COLUMNS)].fillna('').astype(str).apply(lambda column: column.str.strip())
+    # Trailing empty rows are common in spreadsheets
+    text = text[(text != '').any(axis=1)]
+    if text.empty:
+        return
+
+    names = text['name']
+    valid = (names != '') & (names.str.len() <= MAX_NAME_LENGTH)
+    values = {}
+    for column, limit in DIMENSION_LIMITS.items():
+        values[column] = pd.to_numeric(text[column].str.replace(',', '.', regex=False), errors='coerce')
+        valid &= (values[column] > 0) & (values[column] <= limit)
+
+    # Line numbers as the user sees them, the header being line 1
+    for row in text.index[~valid]:
+        if not names[row]:
+            problem = "не указано название"
+        elif len(names[row]) > MAX_NAME_LENGTH:
+            problem = f"название длиннее {MAX_NAME_LENGTH} символов"
+        else:
+            problem = ", ".join(
+                f"{DIMENSION_LABELS[column]} должна быть числом от 0 до {limit}"
+                for column, limit in DIMENSION_LIMITS.items()
+                if not 0 < values[column][row] <= limit
+            )
+        result.add_error(f"Строка {row + 2}: {problem}")
+
+    rows = zip(names[valid], values['length'][valid], values['width'][valid], values['height'][valid])
+    for name, length, width, height in rows:
+        dimensions = room_dimensions(float(length), float(width), float(height))
+        result.rooms.append(Room(name=name, created_at=created_at, **dimensions))
+
+def read_rooms_file(path: str, file_format: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> ImportResult:
+    """Read and validate rooms from a CSV or XLSX file.
+
+    The file needs the columns name, length, width and height (or their
+    Russian names); other columns are ignored.
+    """
+    result = ImportResult()
+    created_at = datetime.now()
+
+    try:
+        for chunk in iter_chunks(path, file_format, chunk_size):
+            chunk = _normalize_columns(chunk)
+            missing = [column for column in IMPORT_COLUMNS if column not in chunk.columns]
+            if missing:
+                result.add_error(f"В файле нет столбцов: {', '.join(missing)}")
+                return result
+            # E.g. both "name" and "название"
+            repeated = [column for column in IMPORT_COLUMNS if list(chunk.columns).count(column) > 1]
+            if repeated:
+                result.add_error(f"Столбцы указаны несколько раз: {', '.join(repeated)}")
+                return result
+
+            _validate_chunk(chunk, result, created_at)
+            if len(result.rooms) + result.error_count > IMPORT_MAX_ROOMS:
+                result.add_error(f"В файле больше {IMPORT_MAX_ROOMS} помещений")
+                return result
+    except (ValueError, csv.Error, pd.errors.ParserError, zipfile.BadZipFile, InvalidFileException, OSError) as e:
+        logger.error(f"Error reading rooms file {path}: {e}")
+        result.add_error("Не удалось прочитать файл, проверьте его формат")
+        return result
+
+    if not result.rooms and not result.error_count:
+        result.add_error("В файле нет помещений")
+    return result
+
+def write_rooms_file(rooms: Sequence[Room], path: str, file_format: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> None:
+    """Write rooms to a CSV or XLSX file that read_rooms_file can import."""
+    frame = pd.DataFrame([room.to_dict() for room in rooms], columns=list(ROOM_FIELDS))
+    if file_format == 'csv':
+        # BOM lets Excel recognize UTF-8
+        frame.to_csv(path, index=False, encoding='utf-8-sig', chunksize=chunk_size)
+    elif file_format == 'xlsx':
+        frame.to_excel(path, index=False, sheet_name='Помещения', engine='openpyxl')
+    else:
+        raise ValueError(f"Unsupported file format: {file_format}")
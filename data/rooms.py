@@ -1,9 +1,13 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
+import copy
 import json
-import os
 import logging
-from typing import List, Dict
+import uuid
+from typing import Any, Callable, List, Dict, Iterable, Optional
+
+from data.storage import DIMENSION_FIELDS, ROOM_EDITABLE_FIELDS, get_storage, room_dimensions, with_room_defaults
+from data.cache import rooms_cache
 
 logger = logging.getLogger(__name__)
 
@@ -17,9 +21,11 @@ class Room:
     area: float
     floor_area: float
     created_at: datetime
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
 
     def to_dict(self) -> Dict:
         return {
+            'id': self.id,
             'name': self.name,
             'length': self.length,
             'width': self.width,
@@ -32,46 +38,121 @@ class Room:
     @classmethod
     def from_dict(cls, data: Dict) -> 'Room':
         try:
-            # If floor_area is not present, use the same value as area
-            floor_area = data.get('floor_area', data['area'])
-            # If height is not present, default to 2.5 meters (standard ceiling height)
-            height = data.get('height', 2.5)
+            # Rooms saved earlier may have no id, height or floor_area
+            data = with_room_defaults(data)
             return cls(
                 name=data['name'],
                 length=data['length'],
                 width=data['width'],
-                height=height,
+                height=data['height'],
                 area=data['area'],
-                floor_area=floor_area,
-                created_at=datetime.fromisoformat(data['created_at'])
+                floor_area=data['floor_area'],
+                created_at=datetime.fromisoformat(data['created_at']),
+                id=data['id']
             )
         except Exception as e:
             logger.error(f"Error creating Room from dict: {e}")
             raise
 
-def get_rooms_file(user_id: int) -> str:
-    """Get the path to the user's rooms file."""
-    try:
-        os.makedirs('data/users', exist_ok=True)
-        return f'data/users/{user_id}_rooms.json'
-    except Exception as e:
-        logger.error(f"Error getting rooms file: {e}")
-        raise
+def add_room_op(room: Room) -> Dict:
+    """Build the operation that adds a room."""
+    return {'op': 'add', 'room': room.to_dict()}
+
+def update_room_op(room_id: str, **fields) -> Dict:
+    """Build the operation that changes fields of a room."""
+    unknown = set(fields) - set(ROOM_EDITABLE_FIELDS)
+    if unknown:
+        raise ValueError(f"Room fields can't be updated: {', '.join(sorted(unknown))}")
+    return {'op': 'update', 'id': room_id, 'fields': fields}
+
+def delete_room_op(room_id: str) -> Dict:
+    """Build the operation that deletes a room."""
+    return {'op': 'delete', 'id': room_id}
+
+class RoomIndex:
+    """Rooms of one user indexed by id and by name.
+
+    Rooms keep their order in ``by_id``. Several rooms may share a name,
+    ``by_name`` lists their ids in order.
+    """
+
+    def __init__(self, rooms: Iterable[Room]):
+        self.by_id: Dict[str, Room] = {}
+        self.by_name: Dict[str, List[str]] = {}
+        for room in rooms:
+            self._add(room)
+
+    def _add(self, room: Room) -> None:
+        self.by_id[room.id] = room
+        self.by_name.setdefault(room.name, []).append(room.id)
+
+    def _forget_name(self, room: Room) -> None:
+        ids = self.by_name.get(room.name, [])
+        if room.id in ids:
+            ids.remove(room.id)
+        if not ids:
+            self.by_name.pop(room.name, None)
+
+    def find_id(self, name: str) -> Optional[str]:
+        """Get the id of the first room with the name."""
+        ids = self.by_name.get(name)
+        return ids[0] if ids else None
+
+    def apply(self, op: Dict) -> None:
+        """Apply a change operation touching only the affected room."""
+        kind = op['op']
+        if kind == 'add':
+            self._add(Room.from_dict(op['room']))
+        elif kind == 'update':
+            room = self.by_id.get(op['id'])
+            if room is None:
+                return
+            fields = op['fields']
+            if 'name' in fields:
+                self._forget_name(room)
+                room.name = fields['name']
+                self.by_name.setdefault(room.name, []).append(room.id)
+            if any(f in fields for f in DIMENSION_FIELDS):
+                dimensions = room_dimensions(
+                    fields.get('length', room.length),
+                    fields.get('width', room.width),
+                    fields.get('height', room.height)
+                )
+                for f, value in dimensions.items():
+                    setattr(room, f, value)
+        elif kind == 'delete':
+            room = self.by_id.pop(op['id'], None)
+            if room is not None:
+                self._forget_name(room)
+        else:
+            raise ValueError(f"Unknown room operation: {kind}")
+
+def _read_index(user_id: int, func: Callable[[RoomIndex], Any]) -> Any:
+    """Call func on the cached room index of a user, loading it on a miss.
+
+    The index is changed in place by writes on other threads, so it is only
+    read inside func, under the cache lock.
+    """
+    return rooms_cache.read(
+        user_id,
+        lambda: RoomIndex(Room.from_dict(r) for r in get_storage().load_rooms(user_id)),
+        func
+    )
+
+def apply_room_changes(user_id: int, ops: List[Dict]) -> None:
+    """Persist room change operations in the configured storage as one write."""
+    get_storage().apply_room_ops(user_id, ops)
+
+    def apply(index: RoomIndex) -> None:
+        for op in ops:
+            index.apply(op)
+
+    rooms_cache.update(user_id, apply)
 
 def save_room(user_id: int, room: Room) -> None:
     """Save a room to the user's rooms file."""
     try:
-        filename = get_rooms_file(user_id)
-        rooms = get_user_rooms(user_id)
-        rooms.append(room)
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(
-                [r.to_dict() for r in rooms],
-                f,
-                ensure_ascii=False,
-                indent=2
-            )
+        apply_room_changes(user_id, [add_room_op(room)])
         logger.info(f"Room saved successfully for user {user_id}")
     except Exception as e:
         logger.error(f"Error saving room: {e}")
@@ -80,17 +161,12 @@ def save_room(user_id: int, room: Room) -> None:
 def get_user_rooms(user_id: int) -> List[Room]:
     """Get all rooms for a user."""
     try:
-        filename = get_rooms_file(user_id)
-        if not os.path.exists(filename):
+        try:
+            # Callers may modify rooms, so never hand out the cached objects
+            return _read_index(user_id, lambda index: [copy.copy(r) for r in index.by_id.values()])
+        except json.JSONDecodeError as e:
+            logger.error(f"Error decoding JSON for user {user_id}: {e}")
             return []
-        
-        with open(filename, 'r', encoding='utf-8') as f:
-            try:
-                rooms_data = json.load(f)
-                return [Room.from_dict(r) for r in rooms_data]
-            except json.JSONDecodeError as e:
-                logger.error(f"Error decoding JSON for user {user_id}: {e}")
-                return []
     except Exception as e:
         logger.error(f"Error getting user rooms: {e}")
         return []
@@ -111,83 +187,39 @@ def format_room_info(room: Room) -> str:
         logger.error(f"Error formatting room info: {e}")
         return "Ошибка при форматировании информации о помещении"
 
-def update_room_name(user_id: int, room: Room, new_name: str) -> None:
-    """Update the name of a room."""
+def get_room(user_id: int, room_id: str) -> Optional[Room]:
+    """Get a room by id."""
+    def find(index: RoomIndex) -> Optional[Room]:
+        room = index.by_id.get(room_id)
+        return copy.copy(room) if room is not None else None
+
+    return _read_index(user_id, find)
+
+def update_room(user_id: int, room_id: str, **fields) -> None:
+    """Update fields (name, length, width, height) of a room.
+
+    Areas are recalculated when dimensions change.
+    """
     try:
-        filename = get_rooms_file(user_id)
-        rooms = get_user_rooms(user_id)
-        
-        # Find the room with the same name and update it
-        for i, r in enumerate(rooms):
-            if r.name == room.name:
-                rooms[i].name = new_name
-                break
-        
-        # Save updated rooms list
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(
-                [r.to_dict() for r in rooms],
-                f,
-                ensure_ascii=False,
-                indent=2
-            )
-        logger.info(f"Room name updated for user {user_id}: {room.name} -> {new_name}")
+        apply_room_changes(user_id, [update_room_op(room_id, **fields)])
+        logger.info(f"Room {room_id} updated for user {user_id}: {', '.join(fields)}")
     except Exception as e:
-        logger.error(f"Error updating room name: {e}")
+        logger.error(f"Error updating room: {e}")
         raise
 
+def update_room_name(user_id: int, room: Room, new_name: str) -> None:
+    """Update the name of a room."""
+    update_room(user_id, room.id, name=new_name)
+
 def update_room_dimensions(user_id: int, room: Room, length: float, width: float, height: float) -> None:
     """Update the dimensions of a room."""
-    try:
-        filename = get_rooms_file(user_id)
-        rooms = get_user_rooms(user_id)
-        
-        # Find the room with the same name and update its dimensions
-        for i, r in enumerate(rooms):
-            if r.name == room.name:
-                # Calculate new areas
-                total_area = 2 * (length + width) * height + 2 * (length * width)
-                floor_area = length * width
-                
-                # Update room properties
-                rooms[i].length = length
-                rooms[i].width = width
-                rooms[i].height = height
-                rooms[i].area = total_area
-                rooms[i].floor_area = floor_area
-                break
-        
-        # Save updated rooms list
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(
-                [r.to_dict() for r in rooms],
-                f,
-                ensure_ascii=False,
-                indent=2
-            )
-        logger.info(f"Room dimensions updated for user {user_id}, room: {room.name}")
-    except Exception as e:
-        logger.error(f"Error updating room dimensions: {e}")
-        raise
+    update_room(user_id, room.id, length=length, width=width, height=height)
 
-def delete_room(user_id: int, room: Room) -> None:
+def delete_room(user_id: int, room_id: str) -> None:
     """Delete a room from user's rooms list."""
     try:
-        filename = get_rooms_file(user_id)
-        rooms = get_user_rooms(user_id)
-        
-        # Remove room with the same name
-        rooms = [r for r in rooms if r.name != room.name]
-        
-        # Save updated rooms list
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(
-                [r.to_dict() for r in rooms],
-                f,
-                ensure_ascii=False,
-                indent=2
-            )
-        logger.info(f"Room deleted for user {user_id}: {room.name}")
+        apply_room_changes(user_id, [delete_room_op(room_id)])
+        logger.info(f"Room {room_id} deleted for user {user_id}")
     except Exception as e:
         logger.error(f"Error deleting room: {e}")
-        raise 
\ No newline at end of file
+        raise
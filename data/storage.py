@@ -0,0 +1,379 @@
+from abc import ABC, abstractmethod
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Dict, List, Optional
+
+from config.settings import (
+    STORAGE_BACKEND,
+    SQLITE_PATH,
+    ROOMS_STORAGE_MODE,
+    ROOMS_JOURNAL_COMPACT_SIZE,
+    DATA_CODEC
+)
+from data.codecs import get_codec
+from data.journal import JournalStorage, read_file, write_atomic
+from data.paths import get_rooms_file, get_rooms_journal_file, get_material_file_path
+
+logger = logging.getLogger(__name__)
+
+ROOM_FIELDS = ('id', 'name', 'length', 'width', 'height', 'area', 'floor_area', 'created_at')
+MATERIAL_FIELDS = ('name', 'category', 'unit', 'price', 'created_at')
+# Fields of a room that can be changed by an update operation
+ROOM_EDITABLE_FIELDS = ('name', 'length', 'width', 'height')
+DIMENSION_FIELDS = ('length', 'width', 'height')
+# Standard ceiling height, used for rooms saved before rooms had a height
+DEFAULT_ROOM_HEIGHT = 2.5
+
+def legacy_room_id(room: Dict) -> str:
+    """Get a stable id for a room saved before rooms had ids."""
+    return uuid.uuid5(uuid.NAMESPACE_OID, f"{room['name']}|{room['created_at']}").hex
+
+def with_room_defaults(room: Dict) -> Dict:
+    """Get a copy of a serialized room with fields that old rooms lack filled in."""
+    room = dict(room)
+    room.setdefault('height', DEFAULT_ROOM_HEIGHT)
+    room.setdefault('floor_area', room['area'])
+    if not room.get('id'):
+        room['id'] = legacy_room_id(room)
+    return room
+
+def ensure_room_ids(rooms: List[Dict]) -> None:
+    """Assign ids to rooms saved before rooms had ids."""
+    for r in rooms:
+        if not r.get('id'):
+            r['id'] = legacy_room_id(r)
+
+def apply_room_op(rooms: List[Dict], op: Dict) -> List[Dict]:
+    """Apply a single change operation to a list of serialized rooms."""
+    kind = op['op']
+    if kind == 'add':
+        ensure_room_ids([op['room']])
+        rooms.append(op['room'])
+    elif kind == 'update':
+        for r in rooms:
+            if r['id'] == op['id']:
+                update_room_record(r, op['fields'])
+                break
+    elif kind == 'delete' and 'id' in op:
+        rooms = [r for r in rooms if r['id'] != op['id']]
+    # Operations below address rooms by name; they are only replayed from
+    # journals written before rooms had ids
+    elif kind == 'rename':
+        for r in rooms:
+            if r['name'] == op['name']:
+                r['name'] = op['new_name']
+                break
+    elif kind == 'resize':
+        for r in rooms:
+            if r['name'] == op['name']:
+                r.update(room_dimensions(op['length'], op['width'], op['height']))
+                break
+    elif kind == 'delete':
+        rooms = [r for r in rooms if r['name'] != op['name']]
+    else:
+        raise ValueError(f"Unknown room operation: {kind}")
+    return rooms
+
+def update_room_record(room: Dict, fields: Dict) -> None:
+    """Change fields of a serialized room, recalculating areas if dimensions changed."""
+    room.update(fields)
+    if any(field in fields for field in DIMENSION_FIELDS):
+        room.update(room_dimensions(room['length'], room['width'], room['height']))
+
+def room_dimensions(length: float, width: float, height: float) -> Dict:
+    """Get dimension fields of a resized room, including recalculated areas."""
+    return {
+        'length': length,
+        'width': width,
+        'height': height,
+        'area': 2 * (length + width) * height + 2 * (length * width),
+        'floor_area': length * width
+    }
+
+class StorageBackend(ABC):
+    """Interface of the rooms and materials storage.
+
+    Rooms and materials are passed around as dicts produced by
+    ``Room.to_dict``/``Material.to_dict``; room changes are operations
+    understood by ``apply_room_op``.
+    """
+
+    @abstractmethod
+    def load_rooms(self, user_id: int) -> List[Dict]:
+        """Get all serialized rooms for a user."""
+
+    @abstractmethod
+    def apply_room_ops(self, user_id: int, ops: List[Dict]) -> None:
+        """Persist room change operations, in order, as one write."""
+
+    @abstractmethod
+    def load_materials(self, user_id: int) -> List[Dict]:
+        """Get all serialized materials for a user."""
+
+    @abstractmethod
+    def add_materials(self, user_id: int, materials: List[Dict]) -> None:
+        """Persist new materials as one write."""
+
+    def close(self) -> None:
+        """Release resources held by the backend."""
+
+class FileBackend(StorageBackend):
+    """Stores each user's rooms and materials in files under data/users.
+
+    Files are written with the configured codec and read in any of them, so
+    switching DATA_CODEC doesn't require converting existing files.
+    """
+
+    def __init__(
+        self,
+        rooms_mode: str = ROOMS_STORAGE_MODE,
+        compact_size: int = ROOMS_JOURNAL_COMPACT_SIZE,
+        codec: str = DATA_CODEC
+    ):
+        self.rooms_mode = rooms_mode
+        self.codec = get_codec(codec)
+        self._rooms = JournalStorage(
+            paths=lambda user_id: (get_rooms_file(user_id), get_rooms_journal_file(user_id)),
+            apply=apply_room_op,
+            prepare=ensure_room_ids,
+            compact_size=compact_size,
+            codec=self.codec
+        )
+
+    def load_rooms(self, user_id: int) -> List[Dict]:
+        return self._rooms.load(user_id)
+
+    def apply_room_ops(self, user_id: int, ops: List[Dict]) -> None:
+        if self.rooms_mode == 'journal':
+            self._rooms.append(user_id, ops)
+        else:
+            self._rooms.rewrite(user_id, ops)
+
+    def load_materials(self, user_id: int) -> List[Dict]:
+        file_path = get_material_file_path(user_id)
+        if not os.path.exists(file_path):
+            return []
+
+        return read_file(file_path)
+
+    def add_materials(self, user_id: int, materials: List[Dict]) -> None:
+        file_path = get_material_file_path(user_id)
+        stored = self.load_materials(user_id)
+        stored.extend(materials)
+
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        write_atomic(file_path, stored, self.codec)
+
+    def close(self) -> None:
+        self._rooms.shutdown()
+
+class SQLiteBackend(StorageBackend):
+    """Stores rooms and materials of all users in one SQLite database.
+
+    The database runs in WAL mode so readers don't block the writer, and
+    every room change touches only the affected row. Room ids are kept in
+    the room_id column, the integer id only defines the order of rooms.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS rooms (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            length REAL NOT NULL,
+            width REAL NOT NULL,
+            height REAL NOT NULL,
+            area REAL NOT NULL,
+            floor_area REAL NOT NULL,
+            created_at TEXT NOT NULL,
+            room_id TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_rooms_user_name ON rooms (user_id, name);
+        CREATE TABLE IF NOT EXISTS materials (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            unit TEXT NOT NULL,
+            price REAL NOT NULL,
+            created_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_materials_user_name ON materials (user_id, name);
+    """
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(self.SCHEMA)
+            self._migrate_room_ids(conn)
+
+    @staticmethod
+    def _migrate_room_ids(conn: sqlite3.Connection) -> None:
+        """Add room ids to databases created before rooms had ids."""
+        columns = [row['name'] for row in conn.execute("PRAGMA table_info(rooms)")]
+        if 'room_id' not in columns:
+            conn.execute("ALTER TABLE rooms ADD COLUMN room_id TEXT")
+        rows = conn.execute("SELECT id, name, created_at FROM rooms WHERE room_id IS NULL").fetchall()
+        conn.executemany(
+            "UPDATE rooms SET room_id = ? WHERE id = ?",
+            [(legacy_room_id(dict(row)), row['id']) for row in rows]
+        )
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_rooms_user_room ON rooms (user_id, room_id)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the connection of the current thread."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def load_rooms(self, user_id: int) -> List[Dict]:
+        rows = self._connection().execute(
+            f"SELECT room_id AS id, {', '.join(ROOM_FIELDS[1:])} FROM rooms WHERE user_id = ? ORDER BY rooms.id",
+            (user_id,)
+        )
+        return [dict(row) for row in rows]
+
+    def apply_room_ops(self, user_id: int, ops: List[Dict]) -> None:
+        with self._connection() as conn:
+            for op in ops:
+                self._apply_room_op(conn, user_id, op)
+
+    def _apply_room_op(self, conn: sqlite3.Connection, user_id: int, op: Dict) -> None:
+        kind = op['op']
+        if kind == 'add':
+            ensure_room_ids([op['room']])
+            self._insert_room(conn, user_id, op['room'])
+        elif kind == 'update':
+            fields = op['fields']
+            if not set(fields) <= set(ROOM_EDITABLE_FIELDS):
+                raise ValueError(f"Room fields can't be updated: {', '.join(fields)}")
+            assignments = ', '.join(f"{field} = ?" for field in fields)
+            conn.execute(
+                f"UPDATE rooms SET {assignments} WHERE user_id = ? AND room_id = ?",
+                (*fields.values(), user_id, op['id'])
+            )
+            if any(field in fields for field in DIMENSION_FIELDS):
+                conn.execute(
+                    "UPDATE rooms SET area = 2 * (length + width) * height + 2 * (length * width), "
+                    "floor_area = length * width WHERE user_id = ? AND room_id = ?",
+                    (user_id, op['id'])
+                )
+        elif kind == 'delete' and 'id' in op:
+            conn.execute(
+                "DELETE FROM rooms WHERE user_id = ? AND room_id = ?",
+                (user_id, op['id'])
+            )
+        elif kind == 'rename':
+            conn.execute(
+                "UPDATE rooms SET name = ? WHERE id = "
+                "(SELECT id FROM rooms WHERE user_id = ? AND name = ? ORDER BY id LIMIT 1)",
+                (op['new_name'], user_id, op['name'])
+            )
+        elif kind == 'resize':
+            fields = room_dimensions(op['length'], op['width'], op['height'])
+            assignments = ', '.join(f"{field} = ?" for field in fields)
+            conn.execute(
+                f"UPDATE rooms SET {assignments} WHERE id = "
+                "(SELECT id FROM rooms WHERE user_id = ? AND name = ? ORDER BY id LIMIT 1)",
+                (*fields.values(), user_id, op['name'])
+            )
+        elif kind == 'delete':
+            conn.execute(
+                "DELETE FROM rooms WHERE user_id = ? AND name = ?",
+                (user_id, op['name'])
+            )
+        else:
+            raise ValueError(f"Unknown room operation: {kind}")
+
+    @staticmethod
+    def _insert_room(conn: sqlite3.Connection, user_id: int, room: Dict) -> None:
+        # Rooms migrated from files may predate the height and floor_area fields
+        room = with_room_defaults(room)
+        conn.execute(
+            f"INSERT INTO rooms (user_id, room_id, {', '.join(ROOM_FIELDS[1:])}) "
+            f"VALUES (?, {', '.join('?' for _ in ROOM_FIELDS)})",
+            (user_id, *(room[field] for field in ROOM_FIELDS))
+        )
+
+    def load_materials(self, user_id: int) -> List[Dict]:
+        rows = self._connection().execute(
+            f"SELECT {', '.join(MATERIAL_FIELDS)} FROM materials WHERE user_id = ? ORDER BY id",
+            (user_id,)
+        )
+        return [dict(row) for row in rows]
+
+    def add_materials(self, user_id: int, materials: List[Dict]) -> None:
+        with self._connection() as conn:
+            for material in materials:
+                self._insert_material(conn, user_id, material)
+
+    @staticmethod
+    def _insert_material(conn: sqlite3.Connection, user_id: int, material: Dict) -> None:
+        conn.execute(
+            f"INSERT INTO materials (user_id, {', '.join(MATERIAL_FIELDS)}) "
+            f"VALUES (?, {', '.join('?' for _ in MATERIAL_FIELDS)})",
+            (user_id, *(material[field] for field in MATERIAL_FIELDS))
+        )
+
+    def replace_user_data(self, user_id: int, rooms: List[Dict], materials: List[Dict]) -> None:
+        """Replace all rooms and materials of a user in one transaction."""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM rooms WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM materials WHERE user_id = ?", (user_id,))
+            for room in rooms:
+                self._insert_room(conn, user_id, room)
+            for material in materials:
+                self._insert_material(conn, user_id, material)
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+_storage: Optional[StorageBackend] = None
+_storage_lock = threading.Lock()
+
+def create_storage(backend: str = STORAGE_BACKEND) -> StorageBackend:
+    """Create a storage backend by name."""
+    if backend == 'files':
+        return FileBackend()
+    if backend == 'sqlite':
+        return SQLiteBackend()
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+def get_storage() -> StorageBackend:
+    """Get the configured storage backend."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage()
+                logger.info(f"Using {type(_storage).__name__} for user data")
+    return _storage
+
+def close_storage() -> None:
+    """Close the storage backend if it was used."""
+    global _storage
+    with _storage_lock:
+        if _storage is not None:
+            _storage.close()
+            _storage = None
@@ -4,10 +4,14 @@ from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 import logging
+from datetime import datetime
 
 from keyboards.main import get_main_keyboard, get_estimate_keyboard
 from keyboards.materials import get_material_keyboard, get_material_categories, get_material_units
-from data.materials import save_material, get_user_materials, format_material_info
+from data.materials import Material, format_material_info
+from data.rooms import Room, format_room_info
+from data.estimate import estimate_apartment, format_apartment_estimate
+from data.repository import repo
 from states import MaterialState
 
 logger = logging.getLogger(__name__)
@@ -29,6 +33,18 @@ class MaterialCalculationState(StatesGroup):
     waiting_for_surface = State()
     waiting_for_quantity = State()
 
+def build_room_choices(rooms, label) -> dict:
+    """Map button texts to room ids, making texts of same-named rooms unique."""
+    choices = {}
+    for room in rooms:
+        text = label(room)
+        number = 2
+        while text in choices:
+            text = f"{label(room)} #{number}"
+            number += 1
+        choices[text] = room.id
+    return choices
+
 @router.message(CommandStart())
 @router.message(Command("start"))
 async def handle_start(message: Message):
@@ -55,6 +71,8 @@ async def cmd_help(message: Message):
             "4. Укажите ширину помещения\n"
             "5. Получите результат расчета\n\n"
             "Все сохраненные помещения будут доступны в разделе 'Мои помещения'.\n"
+            "Много помещений можно загрузить из файла: /import_rooms, "
+            "выгрузить в файл: /export_rooms\n"
             "Используйте кнопки меню для навигации.",
             reply_markup=get_main_keyboard()
         )
@@ -86,9 +104,7 @@ async def handle_calculate_area(message: Message, state: FSMContext):
 async def handle_my_rooms(message: Message):
     """Handle my rooms request."""
     try:
-        from data.rooms import get_user_rooms, format_room_info
-        
-        rooms = get_user_rooms(message.from_user.id)
+        rooms = await repo.get_rooms(message.from_user.id)
         if not rooms:
             await message.answer(
                 "У вас пока нет сохраненных помещений.\n"
@@ -164,14 +180,15 @@ async def handle_material_price(message: Message, state: FSMContext):
         return
     
     data = await state.get_data()
-    material = {
-        "category": data["category"],
-        "name": data["name"],
-        "unit": data["unit"],
-        "price": price
-    }
-    
-    save_material(message.from_user.id, material)
+    material = Material(
+        category=data["category"],
+        name=data["name"],
+        unit=data["unit"],
+        price=price,
+        created_at=datetime.now()
+    )
+    
+    await repo.save_material(message.from_user.id, material)
     await message.answer(
         f"Материал успешно добавлен!\n{format_material_info(material)}",
         reply_markup=get_material_keyboard()
@@ -180,7 +197,7 @@ async def handle_material_price(message: Message, state: FSMContext):
 
 @router.message(F.text == "📊 Показать материалы")
 async def handle_show_materials(message: Message):
-    materials = get_user_materials(message.from_user.id)
+    materials = await repo.get_materials(message.from_user.id)
     if not materials:
         await message.answer("У вас пока нет сохраненных материалов")
         return
@@ -293,9 +310,6 @@ async def handle_room_height(message: Message, state: FSMContext):
         total_area = 2 * (data['length'] + data['width']) * height + floor_area
         
         # Create and save room
-        from data.rooms import Room, save_room
-        from datetime import datetime
-        
         room = Room(
             name=data['name'],
             length=data['length'],
@@ -306,7 +320,7 @@ async def handle_room_height(message: Message, state: FSMContext):
             created_at=datetime.now()
         )
         
-        save_room(message.from_user.id, room)
+        await repo.save_room(message.from_user.id, room)
         
         await message.answer(
             f"Помещение успешно добавлено!\n\n"
@@ -329,9 +343,7 @@ async def handle_room_height(message: Message, state: FSMContext):
 @router.message(F.text == "🧮 Расчет материалов")
 async def handle_material_calculation(message: Message, state: FSMContext):
     """Handle material calculation request."""
-    from data.rooms import get_user_rooms, format_room_info
-    
-    rooms = get_user_rooms(message.from_user.id)
+    rooms = await repo.get_rooms(message.from_user.id)
     if not rooms:
         await message.answer(
             "❌ У вас пока нет сохраненных помещений.\n\n"
@@ -344,13 +356,12 @@ async def handle_material_calculation(message: Message, state: FSMContext):
         return
     
     # Create keyboard with room names and their areas
-    keyboard = []
+    rooms = [room for room in rooms if room.area > 0]  # Only show rooms with calculated area
     rooms_info = "📋 Ваши помещения с расчетом площади:\n\n"
-    
     for room in rooms:
-        if room.area > 0:  # Only show rooms with calculated area
-            rooms_info += format_room_info(room) + "\n"
-            keyboard.append([KeyboardButton(text=f"{room.name} ({room.area:.1f} м²)")])
+        rooms_info += format_room_info(room) + "\n"
+    choices = build_room_choices(rooms, lambda room: f"{room.name} ({room.area:.1f} м²)")
+    keyboard = [[KeyboardButton(text=text)] for text in choices]
     
     if not keyboard:  # If no rooms have area calculations
         await message.answer(
@@ -365,6 +376,7 @@ async def handle_material_calculation(message: Message, state: FSMContext):
     
     keyboard.append([KeyboardButton(text="🏠 Главное меню")])
     
+    await state.update_data(room_choices=choices)
     await state.set_state(MaterialCalculationState.waiting_for_room)
     await message.answer(
         rooms_info + "\n"
@@ -386,17 +398,9 @@ async def handle_calculation_room(message: Message, state: FSMContext):
         )
         return
     
-    from data.rooms import get_user_rooms
-    from data.materials import get_user_materials
-    
-    rooms = get_user_rooms(message.from_user.id)
-    materials = get_user_materials(message.from_user.id)
-    
-    # Extract room name from the button text (remove area info)
-    room_name = message.text.split(" (")[0]
-    
-    # Find selected room
-    selected_room = next((room for room in rooms if room.name == room_name), None)
+    data = await state.get_data()
+    room_id = data.get('room_choices', {}).get(message.text)
+    selected_room = await repo.get_room(message.from_user.id, room_id) if room_id else None
     if not selected_room:
         await message.answer(
             "❌ Пожалуйста, выберите помещение из списка выше.",
@@ -404,6 +408,7 @@ async def handle_calculation_room(message: Message, state: FSMContext):
         )
         return
     
+    materials = await repo.get_materials(message.from_user.id)
     if not materials:
         await message.answer(
             "❌ У вас пока нет сохраненных материалов.\n\n"
@@ -446,9 +451,7 @@ async def handle_calculation_material(message: Message, state: FSMContext):
         )
         return
     
-    from data.materials import get_user_materials
-    
-    materials = get_user_materials(message.from_user.id)
+    materials = await repo.get_materials(message.from_user.id)
     
     # Extract material name from the button text (remove unit info)
     material_name = message.text.split(" (")[0]
@@ -524,15 +527,34 @@ async def handle_calculation_surface(message: Message, state: FSMContext):
     )
     await state.clear()
 
+@router.message(F.text == "🏢 Смета по квартире")
+@router.message(Command("estimate_all"))
+async def handle_apartment_estimate(message: Message):
+    """Estimate all saved materials for all rooms of the user."""
+    try:
+        rooms = await repo.get_rooms(message.from_user.id)
+        materials = await repo.get_materials(message.from_user.id)
+        if not rooms or not materials:
+            await message.answer(
+                "❌ Для сметы по квартире нужны сохраненные помещения и материалы.\n\n"
+                "Добавьте их через '🔲 Рассчитать площадь' и '📦 Материалы'.",
+                reply_markup=get_main_keyboard()
+            )
+            return
+
+        estimate = estimate_apartment(rooms, materials)
+        await message.answer(format_apartment_estimate(estimate), reply_markup=get_main_keyboard())
+    except Exception as e:
+        logger.error(f"Error in handle_apartment_estimate: {e}")
+        await message.answer("Произошла ошибка при расчете сметы. Пожалуйста, попробуйте позже.")
+
 @router.message(F.text == "✏️ Редактировать помещение")
 async def handle_edit_room(message: Message, state: FSMContext):
     """Handle edit room request."""
     logger.info(f"User {message.from_user.id} requested to edit a room.")
     try:
-        from data.rooms import get_user_rooms, format_room_info
-        
         logger.info(f"Getting rooms for user {message.from_user.id}")
-        rooms = get_user_rooms(message.from_user.id)
+        rooms = await repo.get_rooms(message.from_user.id)
         logger.info(f"Found {len(rooms)} rooms for user {message.from_user.id}")
         
         if not rooms:
@@ -544,10 +566,12 @@ async def handle_edit_room(message: Message, state: FSMContext):
             return
         
         # Create keyboard with room names
-        keyboard = [[KeyboardButton(text=room.name)] for room in rooms]
+        choices = build_room_choices(rooms, lambda room: room.name)
+        keyboard = [[KeyboardButton(text=text)] for text in choices]
         keyboard.append([KeyboardButton(text="🏠 Главное меню")])
         
         logger.info(f"Setting state to waiting_for_room_to_edit for user {message.from_user.id}")
+        await state.update_data(room_choices=choices)
         await state.set_state(RoomState.waiting_for_room_to_edit)
         logger.info(f"User {message.from_user.id} set state to waiting_for_room_to_edit.")
         await message.answer(
@@ -578,16 +602,12 @@ async def handle_room_to_edit(message: Message, state: FSMContext):
             )
             return
             
-        from data.rooms import get_user_rooms
-        
-        rooms = get_user_rooms(message.from_user.id)
-        logger.info(f"Found {len(rooms)} rooms for user {message.from_user.id}")
-        
-        room_name = message.text
-        selected_room = next((room for room in rooms if room.name == room_name), None)
+        data = await state.get_data()
+        room_id = data.get('room_choices', {}).get(message.text)
+        selected_room = await repo.get_room(message.from_user.id, room_id) if room_id else None
         
         if not selected_room:
-            logger.warning(f"Room '{room_name}' not found for user {message.from_user.id}")
+            logger.warning(f"Room '{message.text}' not found for user {message.from_user.id}")
             await message.answer(
                 "Пожалуйста, выберите помещение из списка.",
                 reply_markup=get_main_keyboard()
@@ -637,8 +657,7 @@ async def handle_editing_room(message: Message, state: FSMContext):
         logger.info(f"User {message.from_user.id} chose to edit room dimensions.")
         await message.answer("Введите новые размеры помещения (длина, ширина, высота) через запятую:")
     elif message.text == "Удалить помещение":
-        from data.rooms import delete_room
-        delete_room(message.from_user.id, room)
+        await repo.delete_room(message.from_user.id, room.id)
         await state.clear()
         logger.info(f"User {message.from_user.id} deleted room {room.name}.")
         await message.answer(
@@ -667,8 +686,7 @@ async def handle_editing_room_name(message: Message, state: FSMContext):
         await message.answer("Название помещения не должно превышать 50 символов. Пожалуйста, введите более короткое название.")
         return
     
-    from data.rooms import update_room_name
-    update_room_name(message.from_user.id, room, new_name)
+    await repo.update_room(message.from_user.id, room.id, name=new_name)
     await state.clear()
     logger.info(f"User {message.from_user.id} updated room name to {new_name}.")
     await message.answer(
@@ -691,8 +709,7 @@ async def handle_editing_room_dimensions(message: Message, state: FSMContext):
         await message.answer("Пожалуйста, введите корректные размеры (длина, ширина, высота) через запятую.")
         return
     
-    from data.rooms import update_room_dimensions
-    update_room_dimensions(message.from_user.id, room, length, width, height)
+    await repo.update_room(message.from_user.id, room.id, length=length, width=width, height=height)
     await state.clear()
     logger.info(f"User {message.from_user.id} updated room dimensions to {length}x{width}x{height}.")
     await message.answer(
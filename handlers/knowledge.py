@@ -9,6 +9,7 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
+from config.settings import ADMIN_IDS
 from knowledge_base.interface import KnowledgeBase
 from keyboards.knowledge_keyboards import (
     create_categories_keyboard,
@@ -79,6 +80,24 @@ async def cmd_knowledge_help(message: Message):
         logger.error(f"Ошибка при получении справки: {e}")
         await message.answer("Произошла ошибка при получении справочной информации.")
 
+@router.message(Command("kb_reload"))
+async def cmd_knowledge_reload(message: Message):
+    """
+    Обработчик команды для перезагрузки базы знаний с диска (только для администраторов).
+    
+    Args:
+        message: Сообщение пользователя.
+    """
+    if message.from_user.id not in ADMIN_IDS:
+        return
+    
+    try:
+        kb.reload()
+        await message.answer(f"База знаний перезагружена, документов: {len(list(kb.store.documents()))}.")
+    except Exception as e:
+        logger.error(f"Ошибка при перезагрузке базы знаний: {e}")
+        await message.answer("Произошла ошибка при перезагрузке базы знаний.")
+
 @router.message(Command("search"))
 async def cmd_search(message: Message, state: FSMContext):
     """
@@ -145,7 +164,7 @@ async def perform_search(message: Message, query: str):
         logger.info(f"Поиск по запросу: {query}")
         
         # Выполняем поиск
-        results = kb.search_knowledge(query)
+        results = await kb.search_knowledge_async(query)
         
         if not results:
             await message.answer(
@@ -298,6 +317,36 @@ async def on_item_selected(callback: CallbackQuery):
         await callback.message.answer("Произошла ошибка при загрузке элемента.")
         await callback.answer()
 
+@router.callback_query(F.data.startswith("kb_chunk:"))
+async def on_chunk_selected(callback: CallbackQuery):
+    """
+    Обработчик выбора фрагмента элемента, найденного поиском.
+    
+    Args:
+        callback: Данные колбэка.
+    """
+    try:
+        # Формат: kb_chunk:category:item_id:path
+        _, category, item_id, path = callback.data.split(":", 3)
+        
+        fragment = kb.get_fragment(category, item_id, path)
+        
+        if not fragment:
+            await callback.message.answer(f"Элемент не найден.")
+            await callback.answer()
+            return
+        
+        await callback.message.answer(
+            kb.format_result(fragment),
+            reply_markup=create_back_to_categories_keyboard()
+        )
+        
+        await callback.answer()
+    except Exception as e:
+        logger.error(f"Ошибка при обработке выбора фрагмента: {e}")
+        await callback.message.answer("Произошла ошибка при загрузке элемента.")
+        await callback.answer()
+
 @router.callback_query(F.data == "kb_back_to_categories")
 async def on_back_to_categories(callback: CallbackQuery):
     """
@@ -0,0 +1,112 @@
+from aiogram import Router, F
+from aiogram.filters import Command, CommandObject, StateFilter
+from aiogram.types import Message, FSInputFile
+import logging
+import os
+import tempfile
+
+from config.settings import IMPORT_MAX_FILE_SIZE, IMPORT_MAX_ROOMS
+from keyboards.main import get_main_keyboard
+from data.repository import repo
+from data.room_io import FILE_FORMATS, get_file_format
+
+logger = logging.getLogger(__name__)
+router = Router()
+
+def make_temp_path(file_format: str) -> str:
+    """Create an empty temporary file and return its path."""
+    fd, path = tempfile.mkstemp(suffix=f".{file_format}")
+    os.close(fd)
+    return path
+
+@router.message(Command("import_rooms"))
+async def cmd_import_rooms(message: Message):
+    """Explain how to import rooms from a file."""
+    await message.answer(
+        "📥 <b>Импорт помещений</b>\n\n"
+        "Отправьте файл CSV или XLSX. Первая строка - заголовки столбцов:\n"
+        "<code>name, length, width, height</code>\n"
+        "(или <code>название, длина, ширина, высота</code>).\n\n"
+        "Размеры указываются в метрах. Остальные столбцы игнорируются.\n"
+        f"В одном файле может быть до {IMPORT_MAX_ROOMS} помещений.",
+        reply_markup=get_main_keyboard()
+    )
+
+# Only outside dialogs, so a file sent in the middle of one isn't imported
+@router.message(StateFilter(None), F.document)
+async def handle_rooms_file(message: Message):
+    """Import rooms from an uploaded CSV/XLSX file."""
+    document = message.document
+    file_format = get_file_format(document.file_name)
+    if file_format is None:
+        await message.answer(
+            "Поддерживаются только файлы CSV и XLSX. "
+            "Подробнее: /import_rooms",
+            reply_markup=get_main_keyboard()
+        )
+        return
+
+    if document.file_size and document.file_size > IMPORT_MAX_FILE_SIZE:
+        await message.answer(
+            f"Файл слишком большой. Максимальный размер - {IMPORT_MAX_FILE_SIZE // (1024 * 1024)} МБ.",
+            reply_markup=get_main_keyboard()
+        )
+        return
+
+    path = make_temp_path(file_format)
+    try:
+        await message.answer("⏳ Загружаю помещения из файла...")
+        await message.bot.download(document, destination=path)
+        result = await repo.import_rooms(message.from_user.id, path, file_format)
+
+        if result.errors:
+            text = "❌ Помещения не импортированы, исправьте ошибки в файле:\n\n" + "\n".join(result.errors)
+            hidden = result.error_count - len(result.errors)
+            if hidden > 0:
+                text += f"\n... и еще {hidden}"
+            await message.answer(text, reply_markup=get_main_keyboard())
+            return
+
+        logger.info(f"User {message.from_user.id} imported {len(result.rooms)} rooms from {file_format}")
+        await message.answer(
+            f"✅ Импортировано помещений: {len(result.rooms)}.\n"
+            "Они доступны в разделе '🏠 Мои помещения'.",
+            reply_markup=get_main_keyboard()
+        )
+    except Exception as e:
+        logger.error(f"Error in handle_rooms_file: {e}")
+        await message.answer("Произошла ошибка при импорте помещений. Пожалуйста, попробуйте позже.")
+    finally:
+        os.remove(path)
+
+@router.message(Command("export_rooms"))
+async def cmd_export_rooms(message: Message, command: CommandObject):
+    """Send the user's rooms as a CSV or XLSX file."""
+    file_format = (command.args or 'csv').strip().lower()
+    if file_format not in FILE_FORMATS:
+        await message.answer(
+            "Укажите формат: /export_rooms csv или /export_rooms xlsx",
+            reply_markup=get_main_keyboard()
+        )
+        return
+
+    path = make_temp_path(file_format)
+    try:
+        count = await repo.export_rooms(message.from_user.id, path, file_format)
+        if not count:
+            await message.answer(
+                "У вас пока нет сохраненных помещений.",
+                reply_markup=get_main_keyboard()
+            )
+            return
+
+        # The file is sent from disk in chunks
+        await message.answer_document(
+            FSInputFile(path, filename=f"rooms.{file_format}"),
+            caption=f"🏠 Помещений: {count}"
+        )
+    except Exception as e:
+        logger.error(f"Error in cmd_export_rooms: {e}")
+        await message.answer("Произошла ошибка при выгрузке помещений. Пожалуйста, попробуйте позже.")
+    finally:
+        os.remove(path)
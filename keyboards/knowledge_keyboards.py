@@ -58,10 +58,18 @@ def create_search_results_keyboard(results: List[Dict[str, Any]], query: str) ->
         if len(title) > 30:
             title = title[:27] + "..."
         
+        # Фрагмент открывается сам по себе, если путь к нему помещается
+        # в callback_data (не больше 64 байт), иначе открывается весь документ
+        callback_data = f"kb_item:{category}:{item_id}"
+        if '_path' in result:
+            chunk_data = f"kb_chunk:{category}:{item_id}:{result['_path']}"
+            if len(chunk_data.encode('utf-8')) <= 64:
+                callback_data = chunk_data
+        
         keyboard.append([
             InlineKeyboardButton(
                 text=title,
-                callback_data=f"kb_item:{category}:{item_id}"
+                callback_data=callback_data
             )
         ])
     
@@ -16,6 +16,7 @@ def get_main_keyboard() -> ReplyKeyboardMarkup:
                 KeyboardButton(text="🏠 Главное меню")
             ],
             [
+                KeyboardButton(text="🏢 Смета по квартире"),
                 KeyboardButton(text="❓ Помощь")
             ]
         ],
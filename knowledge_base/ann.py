@@ -0,0 +1,214 @@
+"""
+Индексы FAISS для поиска ближайших векторов.
+
+Векторы нормируются, и близость измеряется скалярным произведением, то есть
+косинусом угла между векторами. Тип индекса выбирается по числу элементов:
+точный перебор (flat) для небольших корпусов, граф HNSW для средних и
+кластеризация IVF для очень больших. Все индексы обернуты в IndexIDMap2,
+поэтому элементы адресуются собственными идентификаторами.
+"""
+import logging
+import math
+from typing import Iterable, Optional
+
+import numpy as np
+
+from config.settings import (
+    KB_ANN_HNSW_MIN_SIZE,
+    KB_ANN_INDEX,
+    KB_ANN_IVF_MIN_SIZE,
+    KB_HNSW_EF_CONSTRUCTION,
+    KB_HNSW_EF_SEARCH,
+    KB_HNSW_M,
+    KB_IVF_NLIST,
+    KB_IVF_NPROBE
+)
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ('flat', 'hnsw', 'ivf')
+
+# Сколько векторов на кластер IVF нужно для обучения
+IVF_TRAIN_POINTS = 39
+
+def choose_index_type(size: int, index_type: str = KB_ANN_INDEX) -> str:
+    """
+    Выбор типа индекса.
+
+    Args:
+        size: Количество индексируемых векторов.
+        index_type: Тип из настроек: flat, hnsw, ivf или auto.
+
+    Returns:
+        Тип индекса. Для auto - по KB_ANN_HNSW_MIN_SIZE и KB_ANN_IVF_MIN_SIZE;
+        IVF не используется, если векторов меньше, чем нужно для обучения.
+
+    Raises:
+        ValueError: Если тип неизвестен.
+    """
+    if index_type == 'auto':
+        if size >= KB_ANN_IVF_MIN_SIZE:
+            index_type = 'ivf'
+        elif size >= KB_ANN_HNSW_MIN_SIZE:
+            index_type = 'hnsw'
+        else:
+            index_type = 'flat'
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Неизвестный тип индекса: {index_type}")
+    if index_type == 'ivf' and size < IVF_TRAIN_POINTS:
+        return 'flat'
+    return index_type
+
+def ivf_nlist(size: int) -> int:
+    """Количество кластеров IVF: KB_IVF_NLIST или около 4 * sqrt(size)."""
+    nlist = KB_IVF_NLIST or int(4 * math.sqrt(size))
+    return max(1, min(nlist, size // IVF_TRAIN_POINTS))
+
+def normalize(vectors) -> np.ndarray:
+    """
+    Нормированная копия векторов.
+
+    Args:
+        vectors: Массив векторов формы (количество, размерность).
+
+    Returns:
+        Массив float32 с векторами единичной длины.
+    """
+    import faiss
+
+    vectors = np.array(vectors, dtype='float32', order='C', copy=True)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+def create_index(
+    vectors: np.ndarray,
+    ids: np.ndarray,
+    index_type: str,
+    hnsw_m: int = KB_HNSW_M,
+    ef_construction: int = KB_HNSW_EF_CONSTRUCTION,
+    nlist: Optional[int] = None
+):
+    """
+    Построение индекса.
+
+    Args:
+        vectors: Нормированные векторы.
+        ids: Идентификаторы векторов (int64).
+        index_type: Тип индекса (см. choose_index_type).
+        hnsw_m: Количество связей вершины графа HNSW.
+        ef_construction: Размер списка кандидатов при построении HNSW.
+        nlist: Количество кластеров IVF. По умолчанию ivf_nlist.
+
+    Returns:
+        Индекс IndexIDMap2 с добавленными векторами.
+    """
+    import faiss
+
+    dimension = vectors.shape[1]
+    if index_type == 'hnsw':
+        inner = faiss.IndexHNSWFlat(dimension, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        inner.hnsw.efConstruction = ef_construction
+    elif index_type == 'ivf':
+        quantizer = faiss.IndexFlatIP(dimension)
+        inner = faiss.IndexIVFFlat(quantizer, dimension, nlist or ivf_nlist(len(vectors)), faiss.METRIC_INNER_PRODUCT)
+        inner.train(vectors)
+    else:
+        inner = faiss.IndexFlatIP(dimension)
+    index = faiss.IndexIDMap2(inner)
+    index.add_with_ids(vectors, ids)
+    configure_search(index)
+    return index
+
+def index_type_of(index) -> str:
+    """Тип индекса, обернутого в IndexIDMap2."""
+    import faiss
+
+    inner = faiss.downcast_index(index.index)
+    if isinstance(inner, faiss.IndexHNSW):
+        return 'hnsw'
+    if isinstance(inner, faiss.IndexIVF):
+        return 'ivf'
+    return 'flat'
+
+def configure_search(
+    index,
+    ef_search: int = KB_HNSW_EF_SEARCH,
+    nprobe: int = KB_IVF_NPROBE
+) -> None:
+    """
+    Настройка точности поиска по индексу.
+
+    Args:
+        index: Индекс IndexIDMap2.
+        ef_search: Размер списка кандидатов при поиске по HNSW.
+        nprobe: Количество просматриваемых кластеров IVF.
+    """
+    import faiss
+
+    inner = faiss.downcast_index(index.index)
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = ef_search
+    elif isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = nprobe
+
+def supports_removal(index) -> bool:
+    """
+    Можно ли удалять векторы из индекса.
+
+    Удалять можно только из точного индекса: граф HNSW удаления не
+    поддерживает, а IVF после удаления не перенумеровывает свои векторы, и
+    IndexIDMap2 перестает сопоставлять их с идентификаторами.
+    """
+    return index_type_of(index) == 'flat'
+
+def excluding_params(index, excluded_ids: Iterable[int]):
+    """
+    Параметры поиска, при которых векторы с заданными идентификаторами пропускаются.
+
+    Args:
+        index: Индекс IndexIDMap2.
+        excluded_ids: Идентификаторы пропускаемых векторов.
+
+    Returns:
+        Параметры для index.search. Для HNSW и IVF в них переносятся
+        efSearch и nprobe индекса, иначе использовались бы значения по умолчанию.
+    """
+    import faiss
+
+    selector = faiss.IDSelectorNot(faiss.IDSelectorBatch(np.array(list(excluded_ids), dtype='int64')))
+    inner = faiss.downcast_index(index.index)
+    if isinstance(inner, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=inner.hnsw.efSearch)
+    if isinstance(inner, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=inner.nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+def stored_ids(index) -> np.ndarray:
+    """Идентификаторы всех векторов индекса."""
+    import faiss
+
+    return faiss.vector_to_array(index.id_map)
+
+def rebuild(index, keep_ids: np.ndarray):
+    """
+    Построение индекса того же типа только из векторов с заданными идентификаторами.
+
+    Args:
+        index: Индекс IndexIDMap2.
+        keep_ids: Идентификаторы векторов, которые нужно оставить.
+
+    Returns:
+        Новый индекс.
+    """
+    import faiss
+
+    inner = faiss.downcast_index(index.index)
+    ids = stored_ids(index)
+    mask = np.isin(ids, keep_ids)
+    vectors = inner.reconstruct_n(0, inner.ntotal)[mask]
+    index_type = index_type_of(index)
+    if index_type == 'hnsw':
+        # На верхних уровнях графа у вершины M связей
+        return create_index(vectors, ids[mask], 'hnsw', inner.hnsw.nb_neighbors(1), inner.hnsw.efConstruction)
+    return create_index(vectors, ids[mask], choose_index_type(len(vectors), index_type))
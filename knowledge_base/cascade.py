@@ -0,0 +1,204 @@
+"""
+Поиск в базе знаний в два этапа: по ключевым словам и семантический.
+
+Сначала выполняется дешевый поиск по ключевым словам (BM25). Семантический
+поиск с векторизацией запроса выполняется, только если по ключевым словам
+ничего не найдено или найденное слабо совпадает с запросом; результаты
+обоих этапов объединяются.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from config.settings import KB_LEXICAL_MIN_SCORE, KB_SEARCH_TOP_K
+from .search import KnowledgeSearch
+from .text import tokenize
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Сглаживающая константа Reciprocal Rank Fusion
+RRF_K = 60
+
+def fuse_results(ranked_lists: Sequence[List[Dict[str, Any]]], top_k: int = KB_SEARCH_TOP_K) -> List[Dict[str, Any]]:
+    """
+    Объединение ранжированных списков результатов методом Reciprocal Rank Fusion.
+
+    Оценки разных этапов несравнимы между собой (BM25 и близость векторов),
+    поэтому учитываются только места элементов: элемент получает сумму
+    1 / (RRF_K + место) по всем спискам, в которых он есть.
+
+    Args:
+        ranked_lists: Списки результатов, каждый по убыванию релевантности.
+        top_k: Количество результатов.
+
+    Returns:
+        Объединенный список по убыванию суммарной оценки (поле _score).
+    """
+    scores: Dict[tuple, float] = {}
+    results: Dict[tuple, Dict[str, Any]] = {}
+    for ranked in ranked_lists:
+        for rank, result in enumerate(ranked, start=1):
+            key = (result.get('_category'), result.get('_id'), result.get('_path'))
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank)
+            results.setdefault(key, result)
+    # sorted устойчива: при равных оценках выше элемент из более раннего списка
+    keys = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [dict(results[key], _score=scores[key]) for key in keys]
+
+class SearchCascade:
+    """Двухэтапный поиск со счетчиками времени этапов и доли эскалаций."""
+
+    STAGES = ('lexical', 'semantic')
+
+    def __init__(
+        self,
+        search: KnowledgeSearch,
+        vectorizer=None,
+        min_score: float = KB_LEXICAL_MIN_SCORE,
+        top_k: int = KB_SEARCH_TOP_K
+    ):
+        """
+        Инициализация поиска.
+
+        Args:
+            search: Поиск по ключевым словам.
+            vectorizer: Векторизатор для семантического поиска или None.
+            min_score: Минимальная оценка BM25 лучшего результата в расчете
+                       на одно слово запроса, при которой семантический
+                       поиск не нужен.
+            top_k: Количество результатов.
+        """
+        self.search = search
+        self.vectorizer = vectorizer
+        self.min_score = min_score
+        self.top_k = top_k
+        self.queries = 0
+        self.escalations = 0
+        self.semantic_errors = 0
+        self._stage_counts = {stage: 0 for stage in self.STAGES}
+        self._stage_seconds = {stage: 0.0 for stage in self.STAGES}
+        self._lock = threading.Lock()
+
+    def _record(self, stage: str, started: float) -> None:
+        with self._lock:
+            self._stage_counts[stage] += 1
+            self._stage_seconds[stage] += time.perf_counter() - started
+
+    def _lexical(self, query: str, categories: Optional[List[str]]) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        results = self.search.simple_search(query, categories, self.top_k)
+        self._record('lexical', started)
+        with self._lock:
+            self.queries += 1
+        return results
+
+    def is_confident(self, query: str, results: List[Dict[str, Any]]) -> bool:
+        """
+        Достаточно ли хороши результаты поиска по ключевым словам.
+
+        Args:
+            query: Поисковый запрос.
+            results: Результаты поиска по ключевым словам.
+
+        Returns:
+            False, если результатов нет, они найдены только поиском по
+            подстроке или оценка лучшего из них ниже порога.
+        """
+        if not results or '_score' not in results[0]:
+            return False
+        terms = len(set(tokenize(query))) or 1
+        return results[0]['_score'] / terms >= self.min_score
+
+    def _should_escalate(self, query: str, results: List[Dict[str, Any]]) -> bool:
+        if self.vectorizer is None or not self.vectorizer.ready.is_set():
+            return False
+        if self.is_confident(query, results):
+            return False
+        with self._lock:
+            self.escalations += 1
+        return True
+
+    def _fuse(self, lexical: List[Dict[str, Any]], semantic: List[Dict[str, Any]], categories: Optional[List[str]]) -> List[Dict[str, Any]]:
+        if categories:
+            semantic = [result for result in semantic if result.get('_category') in categories]
+        return fuse_results([lexical, semantic], self.top_k)
+
+    def _semantic_failed(self, e: Exception) -> None:
+        logger.error(f"Ошибка семантического поиска: {e}")
+        with self._lock:
+            self.semantic_errors += 1
+
+    def run(self, query: str, categories: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        Поиск по запросу.
+
+        Args:
+            query: Поисковый запрос.
+            categories: Список категорий для поиска. Если None, поиск по всем категориям.
+
+        Returns:
+            Список найденных элементов по убыванию релевантности.
+        """
+        lexical = self._lexical(query, categories)
+        if not self._should_escalate(query, lexical):
+            return lexical
+        started = time.perf_counter()
+        try:
+            semantic = self.vectorizer.search(query, self.top_k)
+        except Exception as e:
+            self._semantic_failed(e)
+            return lexical
+        self._record('semantic', started)
+        return self._fuse(lexical, semantic, categories)
+
+    async def run_async(self, query: str, categories: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        Поиск по запросу из асинхронного обработчика.
+
+        То же, что run, но запрос векторизуется без блокировки цикла событий.
+
+        Args:
+            query: Поисковый запрос.
+            categories: Список категорий для поиска. Если None, поиск по всем категориям.
+
+        Returns:
+            Список найденных элементов по убыванию релевантности.
+        """
+        lexical = self._lexical(query, categories)
+        if not self._should_escalate(query, lexical):
+            return lexical
+        started = time.perf_counter()
+        try:
+            semantic = await self.vectorizer.search_async(query, self.top_k)
+        except Exception as e:
+            self._semantic_failed(e)
+            return lexical
+        self._record('semantic', started)
+        return self._fuse(lexical, semantic, categories)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Счетчики поиска.
+
+        Returns:
+            Словарь с числом запросов, эскалаций к семантическому поиску и
+            их долей, ошибок семантического поиска и, для каждого этапа,
+            числом выполнений и средним временем в миллисекундах.
+        """
+        with self._lock:
+            return {
+                'queries': self.queries,
+                'escalations': self.escalations,
+                'escalation_rate': self.escalations / self.queries if self.queries else 0.0,
+                'semantic_errors': self.semantic_errors,
+                'stages': {
+                    stage: {
+                        'count': self._stage_counts[stage],
+                        'average_ms': 1000 * self._stage_seconds[stage] / self._stage_counts[stage]
+                        if self._stage_counts[stage] else 0.0
+                    }
+                    for stage in self.STAGES
+                }
+            }
@@ -0,0 +1,131 @@
+"""
+Разбиение документов базы знаний на фрагменты для поиска.
+
+Вложенные элементы, заданные путями вида ``price_ranges[].items[]``,
+индексируются по отдельности и адресуются идентификатором документа и
+путем к элементу, например ``price_ranges[0].items[2]``. Остальные поля
+документа индексируются как его основная часть.
+"""
+import json
+import re
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from config.settings import KB_CHUNK_PATHS
+from .index import parse_path
+from .store import Document
+
+# Часть пути к элементу: имя поля и, для элемента списка, номер
+PATH_PART_RE = re.compile(r'([^.\[\]]+)(?:\[(\d+)\])?')
+
+def _strings(data: dict) -> Tuple[str, ...]:
+    """Строковые поля элемента, которые описывают вложенные в него элементы."""
+    return tuple(value for value in data.values() if isinstance(value, str))
+
+def _root_context(document: Document) -> Tuple[str, ...]:
+    title = document.data.get('title')
+    return (title,) if isinstance(title, str) else ()
+
+def _iter_fragments(
+    data: Any,
+    path: List[Tuple[str, bool]],
+    prefix: str,
+    context: Tuple[str, ...]
+) -> Iterator[Tuple[str, Any, Tuple[str, ...]]]:
+    """Перебор (путь к элементу, элемент, контекст) по разобранному пути."""
+    if not path:
+        yield prefix, data, context
+        return
+    if not isinstance(data, dict) or path[0][0] not in data:
+        return
+    if prefix:
+        context = context + _strings(data)
+    (name, is_list), rest = path[0], path[1:]
+    value = data[name]
+    base = f"{prefix}.{name}" if prefix else name
+    if is_list:
+        if isinstance(value, list):
+            for index, item in enumerate(value):
+                yield from _iter_fragments(item, rest, f"{base}[{index}]", context)
+    else:
+        yield from _iter_fragments(value, rest, base, context)
+
+def make_fragment(document: Document, path: str, item: dict, context: Iterable[str]) -> Document:
+    """
+    Фрагмент документа для вложенного элемента.
+
+    Args:
+        document: Документ, которому принадлежит элемент.
+        path: Путь к элементу.
+        item: Данные элемента.
+        context: Заголовок документа и описания объемлющих элементов.
+
+    Returns:
+        Документ с полем path. Если у элемента нет заголовка, им становится
+        поле name; контекст сохраняется в поле _context.
+    """
+    data = dict(item)
+    if 'title' not in data and isinstance(item.get('name'), str):
+        data['title'] = item['name']
+    data['_context'] = list(context)
+    text = json.dumps(data, ensure_ascii=False)
+    return Document(document.category, document.item_id, data, text, text.lower(), document.signature, path)
+
+def split_document(document: Document, paths: Iterable[str] = KB_CHUNK_PATHS) -> List[Document]:
+    """
+    Разбиение документа на основную часть и фрагменты.
+
+    Args:
+        document: Документ базы знаний.
+        paths: Пути к вложенным элементам, которые становятся фрагментами.
+
+    Returns:
+        Список из основной части документа (без полей, разбитых на
+        фрагменты; отсутствует, если других полей нет) и фрагментов.
+        Документ без таких элементов возвращается целиком.
+    """
+    fragments = []
+    split_fields = set()
+    for path in paths:
+        parsed = parse_path(path)
+        for fragment_path, item, context in _iter_fragments(document.data, parsed, '', _root_context(document)):
+            if isinstance(item, dict) and item:
+                fragments.append(make_fragment(document, fragment_path, item, context))
+                split_fields.add(parsed[0][0])
+    if not fragments:
+        return [document]
+
+    rest = {field: value for field, value in document.data.items() if field not in split_fields}
+    units = []
+    if rest:
+        text = json.dumps(rest, ensure_ascii=False)
+        units.append(Document(document.category, document.item_id, rest, text, text.lower(), document.signature))
+    return units + fragments
+
+def get_fragment(document: Document, path: str) -> Optional[Document]:
+    """
+    Фрагмент документа по пути к элементу.
+
+    Args:
+        document: Документ базы знаний.
+        path: Путь к элементу, например ``price_ranges[0].items[2]``.
+
+    Returns:
+        Фрагмент или None, если по пути нет элемента-словаря.
+    """
+    data: Any = document.data
+    context = _root_context(document)
+    for depth, part in enumerate(path.split('.')):
+        match = PATH_PART_RE.fullmatch(part)
+        if match is None or not isinstance(data, dict) or match.group(1) not in data:
+            return None
+        if depth:
+            context = context + _strings(data)
+        data = data[match.group(1)]
+        if match.group(2) is not None:
+            index = int(match.group(2))
+            if not isinstance(data, list) or index >= len(data):
+                return None
+            data = data[index]
+    if not isinstance(data, dict):
+        return None
+    return make_fragment(document, path, data, context)
@@ -0,0 +1,142 @@
+"""
+Асинхронная векторизация запросов пакетами.
+
+Запросы от одновременно работающих обработчиков собираются в течение
+нескольких миллисекунд (или пока не наберется пакет максимального размера)
+и векторизуются моделью за один вызов в отдельном потоке. Каждый ожидающий
+обработчик получает свой вектор.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from config.settings import KB_EMBED_BATCH_SIZE, KB_EMBED_BATCH_WAIT
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+class EmbeddingService:
+    """Сервис пакетной векторизации запросов."""
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], Any],
+        max_batch_size: int = KB_EMBED_BATCH_SIZE,
+        max_wait: float = KB_EMBED_BATCH_WAIT
+    ):
+        """
+        Инициализация сервиса.
+
+        Args:
+            encode: Функция, векторизующая список текстов; возвращает массив
+                    векторов в том же порядке.
+            max_batch_size: Максимальное количество запросов в пакете.
+            max_wait: Сколько секунд ждать следующих запросов после первого в пакете.
+        """
+        self.encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        # (текст, future, время постановки в очередь)
+        self._queue: List[Tuple[str, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Ссылки на задачи векторизации, чтобы их не удалил сборщик мусора
+        self._tasks: Set[asyncio.Task] = set()
+        # Один поток: пока модель занята пакетом, копится следующий
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kb-embed")
+
+        self.batches = 0
+        self.requests = 0
+        self.encoded = 0
+        self.largest_batch = 0
+        self.wait_seconds = 0.0
+        self.encode_seconds = 0.0
+
+    async def embed(self, text: str):
+        """
+        Векторизация одного текста в составе ближайшего пакета.
+
+        Args:
+            text: Текст запроса.
+
+        Returns:
+            Вектор текста.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((text, future, time.monotonic()))
+        if len(self._queue) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        """Отправка накопленных запросов на векторизацию."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            batch = self._queue[:self.max_batch_size]
+            del self._queue[:self.max_batch_size]
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Sequence[Tuple[str, asyncio.Future, float]]) -> None:
+        """Векторизация пакета и передача векторов ожидающим."""
+        # Одинаковые запросы в пакете векторизуются один раз
+        positions: Dict[str, int] = {}
+        for text, _, _ in batch:
+            positions.setdefault(text, len(positions))
+
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        try:
+            vectors = await loop.run_in_executor(self._executor, self.encode, list(positions))
+        except Exception as e:
+            logger.error(f"Ошибка векторизации пакета из {len(batch)} запросов: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finished = time.monotonic()
+
+        self.batches += 1
+        self.requests += len(batch)
+        self.encoded += len(positions)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.wait_seconds += sum(started - queued for _, _, queued in batch)
+        self.encode_seconds += finished - started
+
+        for text, future, _ in batch:
+            if not future.done():
+                # Вектор в форме (1, размерность), как у model.encode([text])
+                position = positions[text]
+                future.set_result(vectors[position:position + 1])
+
+    def close(self) -> None:
+        """Остановка потока векторизации."""
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Счетчики пакетной векторизации.
+
+        Returns:
+            Словарь с настройками, числом пакетов и запросов, средним и
+            наибольшим размером пакета и средним временем ожидания и
+            векторизации пакета в секундах.
+        """
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait': self.max_wait,
+            'batches': self.batches,
+            'requests': self.requests,
+            'encoded': self.encoded,
+            'largest_batch': self.largest_batch,
+            'average_batch': self.requests / self.batches if self.batches else 0.0,
+            'average_wait': self.wait_seconds / self.requests if self.requests else 0.0,
+            'average_encode': self.encode_seconds / self.batches if self.batches else 0.0
+        }
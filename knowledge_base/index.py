@@ -0,0 +1,363 @@
+"""
+Поисковые индексы базы знаний: инвертированный индекс с ранжированием BM25,
+хеш-индексы по значениям полей и индекс триграмм для регулярных выражений.
+"""
+import heapq
+import math
+import sys
+import threading
+from collections import Counter
+from typing import Any, Collection, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .store import DocKey, Document
+from .text import iter_strings, tokenize
+
+# Во сколько раз слова заголовка важнее остального текста
+TITLE_WEIGHT = 2
+
+def document_terms(document: Document) -> List[str]:
+    """
+    Термины документа для индексации.
+
+    Args:
+        document: Документ базы знаний.
+
+    Returns:
+        Список терминов; термины заголовка повторены TITLE_WEIGHT раз.
+    """
+    data = document.data
+    terms = []
+    title = data.get('title')
+    if isinstance(title, str):
+        terms.extend(tokenize(title) * (TITLE_WEIGHT - 1))
+    for text in iter_strings(data):
+        terms.extend(tokenize(text))
+    return terms
+
+class InvertedIndex:
+    """
+    Инвертированный индекс: термин -> документы с частотой термина.
+
+    Поддерживает добавление, замену и удаление отдельных документов и
+    поиск top-k документов по BM25.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Инициализация индекса.
+
+        Args:
+            k1: Параметр насыщения частоты термина BM25.
+            b: Параметр нормализации по длине документа BM25.
+        """
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[DocKey, int]] = {}
+        self._lengths: Dict[DocKey, int] = {}
+        # Термины каждого документа, чтобы удалять его без обхода словаря
+        self._doc_terms: Dict[DocKey, Tuple[str, ...]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def _remove(self, key: DocKey) -> None:
+        length = self._lengths.pop(key, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for term in self._doc_terms.pop(key):
+            postings = self._postings[term]
+            del postings[key]
+            if not postings:
+                del self._postings[term]
+
+    def update(self, key: DocKey, document: Optional[Document]) -> None:
+        """
+        Добавление, замена или удаление документа.
+
+        Args:
+            key: Ключ документа.
+            document: Документ или None для удаления.
+        """
+        terms = Counter(document_terms(document)) if document is not None else None
+        with self._lock:
+            self._remove(key)
+            if not terms:
+                return
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, {})[key] = frequency
+            length = sum(terms.values())
+            self._lengths[key] = length
+            self._doc_terms[key] = tuple(terms)
+            self._total_length += length
+
+    def search(self, query: str, top_k: int = 10, categories: Collection[str] = None) -> List[Tuple[DocKey, float]]:
+        """
+        Поиск документов по запросу с ранжированием BM25.
+
+        Args:
+            query: Поисковый запрос.
+            top_k: Количество результатов.
+            categories: Категории, в которых искать. Если None, во всех.
+
+        Returns:
+            Список пар (ключ документа, оценка) по убыванию оценки.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            count = len(self._lengths)
+            if not count:
+                return []
+            average_length = self._total_length / count
+            scores: Dict[DocKey, float] = {}
+
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, frequency in postings.items():
+                    if categories and key[0] not in categories:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[key] / average_length)
+                    scores[key] = scores.get(key, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+def parse_path(path: str) -> List[Tuple[str, bool]]:
+    """
+    Разбор пути к вложенному полю.
+
+    Args:
+        path: Путь вида ``price_ranges[].items[].unit``; ``[]`` означает
+              перебор элементов списка.
+
+    Returns:
+        Список пар (имя поля, является ли поле списком).
+    """
+    return [(part[:-2], True) if part.endswith('[]') else (part, False) for part in path.split('.')]
+
+def extract_values(data: Any, path: List[Tuple[str, bool]]) -> Iterator[Any]:
+    """
+    Перебор значений по разобранному пути.
+
+    Args:
+        data: Данные документа.
+        path: Результат parse_path.
+
+    Returns:
+        Итератор по найденным значениям.
+    """
+    if not path:
+        yield data
+        return
+    if not isinstance(data, dict) or path[0][0] not in data:
+        return
+    (name, is_list), rest = path[0], path[1:]
+    value = data[name]
+    if is_list:
+        if isinstance(value, list):
+            for item in value:
+                yield from extract_values(item, rest)
+    else:
+        yield from extract_values(value, rest)
+
+def normalize_value(value: Any) -> str:
+    """Нормализованное значение поля для сравнения на равенство."""
+    return str(value).lower()
+
+class FieldIndex:
+    """
+    Хеш-индексы по значениям полей: поле -> значение -> ключи документов.
+
+    Индексируются все поля верхнего уровня и заданные вложенные пути.
+    Поиск по равенству занимает O(1) плюс размер результата.
+    """
+
+    def __init__(self, paths: Iterable[str] = ()):
+        """
+        Инициализация индекса.
+
+        Args:
+            paths: Вложенные пути для индексации, например ``price_ranges[].items[].unit``.
+        """
+        self.paths = {path: parse_path(path) for path in paths}
+        self._values: Dict[str, Dict[str, Set[DocKey]]] = {}
+        # Пары (поле, значение) каждого документа для удаления
+        self._doc_entries: Dict[DocKey, List[Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+
+    def is_indexed(self, field: str) -> bool:
+        """Проверка, индексируется ли поле (поля верхнего уровня индексируются всегда)."""
+        return field in self.paths or '.' not in field and '[]' not in field
+
+    def _entries(self, data: dict) -> Set[Tuple[str, str]]:
+        entries = {(field, normalize_value(value)) for field, value in data.items()}
+        for path, parsed in self.paths.items():
+            for value in extract_values(data, parsed):
+                entries.add((path, normalize_value(value)))
+        return entries
+
+    def _remove(self, key: DocKey) -> None:
+        for field, value in self._doc_entries.pop(key, ()):
+            keys = self._values[field][value]
+            keys.discard(key)
+            if not keys:
+                del self._values[field][value]
+                if not self._values[field]:
+                    del self._values[field]
+
+    def update(self, key: DocKey, document: Optional[Document]) -> None:
+        """
+        Добавление, замена или удаление документа.
+
+        Args:
+            key: Ключ документа.
+            document: Документ или None для удаления.
+        """
+        entries = self._entries(document.data) if document is not None else ()
+        with self._lock:
+            self._remove(key)
+            if not entries:
+                return
+            for field, value in entries:
+                self._values.setdefault(field, {}).setdefault(value, set()).add(key)
+            self._doc_entries[key] = list(entries)
+
+    def lookup(self, field: str, value: Any) -> Set[DocKey]:
+        """
+        Ключи документов, у которых поле равно значению (без учета регистра).
+
+        Args:
+            field: Имя поля верхнего уровня или индексируемый путь.
+            value: Искомое значение.
+
+        Returns:
+            Множество ключей документов.
+        """
+        with self._lock:
+            return set(self._values.get(field, {}).get(normalize_value(value), ()))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Размеры индексов.
+
+        Returns:
+            Словарь с числом документов и, для каждого поля, числом различных
+            значений, ссылок на документы и примерным объемом памяти в байтах.
+        """
+        with self._lock:
+            fields = {}
+            for field, values in self._values.items():
+                memory = sys.getsizeof(values)
+                for value, keys in values.items():
+                    memory += sys.getsizeof(value) + sys.getsizeof(keys)
+                fields[field] = {
+                    'values': len(values),
+                    'postings': sum(len(keys) for keys in values.values()),
+                    'memory_bytes': memory
+                }
+            return {
+                'documents': len(self._doc_entries),
+                'memory_bytes': sum(field['memory_bytes'] for field in fields.values()),
+                'fields': fields
+            }
+
+def trigrams(text: str) -> Set[str]:
+    """Все различные трехсимвольные подстроки текста."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class TrigramIndex:
+    """
+    Индекс триграмм текста документов для предварительного отбора.
+
+    Для каждой триграммы хранится битовая маска документов, в тексте
+    которых она встречается; пересечение масок дает документы, содержащие
+    все заданные подстроки.
+    """
+
+    def __init__(self):
+        """Инициализация индекса."""
+        self._masks: Dict[str, int] = {}
+        self._doc_ids: Dict[DocKey, int] = {}
+        self._doc_trigrams: Dict[DocKey, Set[str]] = {}
+        self._keys: List[Optional[DocKey]] = []
+        self._free_ids: List[int] = []
+        self._lock = threading.Lock()
+
+    def _remove(self, key: DocKey) -> None:
+        doc_id = self._doc_ids.pop(key, None)
+        if doc_id is None:
+            return
+        bit = ~(1 << doc_id)
+        for trigram in self._doc_trigrams.pop(key):
+            mask = self._masks[trigram] & bit
+            if mask:
+                self._masks[trigram] = mask
+            else:
+                del self._masks[trigram]
+        self._keys[doc_id] = None
+        self._free_ids.append(doc_id)
+
+    def update(self, key: DocKey, document: Optional[Document]) -> None:
+        """
+        Добавление, замена или удаление документа.
+
+        Args:
+            key: Ключ документа.
+            document: Документ или None для удаления.
+        """
+        document_trigrams = trigrams(document.search_text) if document is not None else None
+        with self._lock:
+            self._remove(key)
+            if document_trigrams is None:
+                return
+            if self._free_ids:
+                doc_id = self._free_ids.pop()
+                self._keys[doc_id] = key
+            else:
+                doc_id = len(self._keys)
+                self._keys.append(key)
+            bit = 1 << doc_id
+            for trigram in document_trigrams:
+                self._masks[trigram] = self._masks.get(trigram, 0) | bit
+            self._doc_ids[key] = doc_id
+            self._doc_trigrams[key] = document_trigrams
+
+    def candidates(self, fragments: Iterable[str]) -> Optional[Set[DocKey]]:
+        """
+        Документы, текст которых (в нижнем регистре) может содержать все фрагменты.
+
+        Args:
+            fragments: Подстроки в нижнем регистре.
+
+        Returns:
+            Множество ключей документов или None, если фрагментов длиной от
+            трех символов нет и отбор невозможен.
+        """
+        required = set()
+        for fragment in fragments:
+            required |= trigrams(fragment)
+        if not required:
+            return None
+
+        with self._lock:
+            mask = -1
+            for trigram in required:
+                mask &= self._masks.get(trigram, 0)
+                if not mask:
+                    return set()
+            keys = set()
+            while mask:
+                low = mask & -mask
+                keys.add(self._keys[low.bit_length() - 1])
+                mask ^= low
+            return keys
+
+    def __len__(self) -> int:
+        return len(self._masks)
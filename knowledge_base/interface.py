@@ -3,8 +3,15 @@
 """
 import logging
 from typing import Dict, List, Any, Optional, Tuple
+
+from config.settings import KB_SEMANTIC_SEARCH, KB_VECTOR_BACKEND
+from .cascade import SearchCascade
+from .chunks import get_fragment
 from .loader import KnowledgeLoader
 from .search import KnowledgeSearch
+from .store import get_store
+from .vector_worker import RemoteVectorizer
+from .vectorizer import KnowledgeVectorizer
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -20,10 +27,69 @@ class KnowledgeBase:
             base_path: Путь к директории с данными. По умолчанию используется
                       директория data внутри пакета knowledge_base.
         """
-        self.loader = KnowledgeLoader(base_path)
-        self.search = KnowledgeSearch(base_path)
+        self.store = get_store(base_path)
+        self.loader = KnowledgeLoader(base_path, store=self.store)
+        self.search = KnowledgeSearch(base_path, store=self.store)
+        # Семантический поиск доступен после прогрева (start_warm_up)
+        if not KB_SEMANTIC_SEARCH:
+            self.vectorizer = None
+        elif KB_VECTOR_BACKEND == 'process':
+            # Модель и индекс в отдельных процессах
+            self.vectorizer = RemoteVectorizer(base_path, store=self.store)
+        else:
+            self.vectorizer = KnowledgeVectorizer(base_path, store=self.store)
+        self.cascade = SearchCascade(self.search, self.vectorizer)
+        # Корпус загружается в память один раз при запуске
+        self.store.refresh(force=True)
         logger.info("Инициализирована база знаний")
     
+    def reload(self) -> None:
+        """
+        Принудительная перезагрузка всех документов с диска.
+        """
+        self.store.reload()
+        if self.vectorizer is not None and self.vectorizer.ready.is_set():
+            self.vectorizer.apply_updates()
+    
+    def start_warm_up(self) -> None:
+        """
+        Запуск фоновой загрузки модели и векторного индекса.
+        """
+        if self.vectorizer is not None:
+            self.vectorizer.warm_up()
+    
+    def close(self) -> None:
+        """
+        Остановка фоновых потоков и процессов семантического поиска.
+        """
+        if self.vectorizer is not None:
+            self.vectorizer.close()
+    
+    def warm_up_status(self) -> Dict[str, Any]:
+        """
+        Состояние прогрева семантического поиска.
+        
+        Returns:
+            Словарь с состоянием прогрева; состояние disabled, если
+            семантический поиск выключен.
+        """
+        if self.vectorizer is None:
+            return {'state': 'disabled'}
+        return self.vectorizer.warm_up_status()
+    
+    def semantic_stats(self) -> Dict[str, Any]:
+        """
+        Счетчики этапов поиска, кешей и пакетной векторизации семантического поиска.
+        
+        Returns:
+            Словарь со статистикой этапов поиска (cascade) и векторизатора,
+            если семантический поиск включен.
+        """
+        stats = {'cascade': self.cascade.stats()}
+        if self.vectorizer is not None:
+            stats.update(self.vectorizer.stats())
+        return stats
+    
     def get_categories(self) -> List[str]:
         """
         Получение списка категорий.
@@ -46,6 +112,23 @@ class KnowledgeBase:
         """
         return self.loader.load_item(category, item_id)
     
+    def get_fragment(self, category: str, item_id: str, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Получение вложенного элемента, найденного поиском как отдельный фрагмент.
+        
+        Args:
+            category: Название категории.
+            item_id: Идентификатор элемента.
+            path: Путь к вложенному элементу (поле _path результата поиска).
+            
+        Returns:
+            Данные фрагмента или None, если он не найден.
+        """
+        self.store.refresh()
+        document = self.store.get(category, item_id)
+        fragment = get_fragment(document, path) if document is not None else None
+        return fragment.to_result() if fragment is not None else None
+    
     def add_item(self, category: str, item_id: str, data: Dict[str, Any]) -> bool:
         """
         Добавление элемента в базу знаний.
@@ -58,20 +141,48 @@ class KnowledgeBase:
         Returns:
             True в случае успешного сохранения, иначе False.
         """
-        return self.loader.save_item(category, item_id, data)
+        if not self.loader.save_item(category, item_id, data):
+            return False
+        if self.vectorizer is not None and self.vectorizer.ready.is_set():
+            # Векторизуется только сохраненный документ
+            try:
+                self.vectorizer.apply_updates()
+            except Exception as e:
+                logger.error(f"Ошибка обновления векторного индекса: {e}")
+        return True
     
     def search_knowledge(self, query: str, categories: List[str] = None) -> List[Dict[str, Any]]:
         """
         Поиск в базе знаний.
         
+        Сначала выполняется поиск по ключевым словам; семантический поиск
+        (когда векторизатор прогрет) - только если результатов нет или они
+        слабо совпадают с запросом. Результаты двух этапов объединяются.
+        
         Args:
             query: Поисковый запрос.
             categories: Список категорий для поиска. Если None, поиск по всем категориям.
             
         Returns:
-            Список найденных элементов.
+            Список найденных элементов по убыванию релевантности.
         """
-        return self.search.simple_search(query, categories)
+        return self.cascade.run(query, categories)
+    
+    async def search_knowledge_async(self, query: str, categories: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        Поиск в базе знаний из асинхронного обработчика.
+        
+        То же, что search_knowledge, но запрос векторизуется сервисом
+        пакетной векторизации, не блокируя цикл событий.
+        
+        Args:
+            query: Поисковый запрос.
+            categories: Список категорий для поиска. Если None, поиск по всем категориям.
+            
+        Returns:
+            Список найденных элементов по убыванию релевантности.
+        """
+        return await self.cascade.run_async(query, categories)
     
     def search_by_field(self, field: str, value: str, categories: List[str] = None) -> List[Dict[str, Any]]:
         """
@@ -104,6 +215,10 @@ class KnowledgeBase:
         if 'title' in result:
             output.append(f"<b>{result['title']}</b>")
         
+        # Для фрагмента - документ и раздел, в котором он находится
+        if result.get('_context'):
+            output.append(f"<i>Раздел: {' / '.join(map(str, result['_context']))}</i>")
+        
         # Добавляем описание, если оно есть
         if 'description' in result:
             output.append(f"{result['description']}")
@@ -111,6 +226,9 @@ class KnowledgeBase:
         # Добавляем другие поля, исключая служебные
         for key, value in result.items():
             if key not in ['title', 'description'] and not key.startswith('_'):
+                # Название фрагмента уже выведено как заголовок
+                if key == 'name' and value == result.get('title'):
+                    continue
                 # Форматируем в зависимости от типа данных
                 if isinstance(value, list):
                     # Для списков
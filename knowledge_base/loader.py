@@ -7,24 +7,28 @@ import logging
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 
+from .store import KnowledgeStore, get_store
+
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
 class KnowledgeLoader:
     """Загрузчик данных для базы знаний."""
     
-    def __init__(self, base_path: str = None):
+    def __init__(self, base_path: str = None, store: KnowledgeStore = None):
         """
         Инициализация загрузчика базы знаний.
         
         Args:
             base_path: Путь к директории с данными. По умолчанию используется
                       директория data внутри пакета knowledge_base.
+            store: Хранилище документов. По умолчанию общее хранилище для base_path.
         """
         if base_path is None:
             self.base_path = Path(__file__).parent / 'data'
         else:
             self.base_path = Path(base_path)
+        self.store = store or get_store(self.base_path)
         
         logger.info(f"Инициализирован загрузчик знаний с базовым путём: {self.base_path}")
         
@@ -36,8 +40,7 @@ class KnowledgeLoader:
             Список названий категорий.
         """
         try:
-            return [d.name for d in self.base_path.iterdir() 
-                   if d.is_dir() and not d.name.startswith('__')]
+            return self.store.categories()
         except Exception as e:
             logger.error(f"Ошибка при получении списка категорий: {e}")
             return []
@@ -55,36 +58,14 @@ class KnowledgeLoader:
         Raises:
             FileNotFoundError: Если категория не найдена.
         """
-        category_path = self.base_path / category
-        
-        if not category_path.exists():
+        if category not in self.store.categories():
             logger.error(f"Категория '{category}' не найдена.")
             raise FileNotFoundError(f"Категория '{category}' не найдена.")
         
-        result = {}
-        
-        # Загрузка всех JSON файлов в категории
-        for file_path in category_path.glob('*.json'):
-            try:
-                if file_path.stat().st_size == 0:
-                    logger.error(f"Файл {file_path} пуст.")
-                    continue
-                    
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    if not content.strip():
-                        logger.error(f"Файл {file_path} содержит только пробельные символы.")
-                        continue
-                        
-                    data = json.loads(content)
-                    result[file_path.stem] = data
-                    logger.debug(f"Загружен файл: {file_path}")
-            except json.JSONDecodeError as e:
-                logger.error(f"Ошибка формата JSON в файле {file_path}: {e}")
-            except Exception as e:
-                logger.error(f"Ошибка при загрузке файла {file_path}: {e}")
-        
-        return result
+        return {
+            document.item_id: document.data.copy()
+            for document in self.store.documents([category])
+        }
     
     def load_item(self, category: str, item_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -97,30 +78,13 @@ class KnowledgeLoader:
         Returns:
             Данные элемента или None, если элемент не найден.
         """
-        file_path = self.base_path / category / f"{item_id}.json"
+        document = self.store.get(category, item_id)
         
-        if not file_path.exists():
+        if document is None:
             logger.warning(f"Элемент '{item_id}' в категории '{category}' не найден.")
             return None
         
-        try:
-            if file_path.stat().st_size == 0:
-                logger.error(f"Файл {file_path} пуст.")
-                return None
-                
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if not content.strip():
-                    logger.error(f"Файл {file_path} содержит только пробельные символы.")
-                    return None
-                    
-                return json.loads(content)
-        except json.JSONDecodeError as e:
-            logger.error(f"Ошибка формата JSON в файле {file_path}: {e}")
-            raise
-        except Exception as e:
-            logger.error(f"Ошибка при загрузке элемента {item_id}: {e}")
-            return None
+        return document.data.copy()
     
     def save_item(self, category: str, item_id: str, data: Dict[str, Any]) -> bool:
         """
@@ -152,6 +116,7 @@ class KnowledgeLoader:
             
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(json_data)
+            self.store.put(category, item_id, json.loads(json_data), file_path)
             logger.info(f"Элемент '{item_id}' успешно сохранен в категории '{category}'")
             return True
         except TypeError as e:
@@ -0,0 +1,22 @@
+"""
+Запуск процессов-обработчиков базы знаний.
+"""
+import multiprocessing
+
+def worker_context():
+    """
+    Контекст multiprocessing для процессов-обработчиков.
+
+    Процесс бота многопоточный (цикл событий, пулы потоков, поток прогрева),
+    а fork копирует в дочерний процесс только вызвавший его поток:
+    блокировка, которую в этот момент держал другой поток (например, внутри
+    logging или аллокатора), в дочернем процессе не освободится никогда.
+    Поэтому обработчики запускаются через forkserver - из отдельного
+    однопоточного процесса, в котором основной модуль бота импортируется
+    один раз, - а где его нет, через spawn.
+
+    Returns:
+        Контекст с методом запуска forkserver или spawn.
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
@@ -0,0 +1,225 @@
+"""
+Поиск по регулярным выражениям в отдельных процессах с ограничением времени.
+
+Выражение от пользователя может выполняться сколь угодно долго
+(катастрофический возврат), а прервать ``re`` внутри потока нельзя.
+Поэтому выражения проверяются в процессах-обработчиках: процесс, не
+уложившийся в отведенное время, завершается и при следующем запросе
+запускается заново.
+"""
+import logging
+import queue
+import re
+import signal
+import time
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from config.settings import KB_REGEX_CACHE_SIZE, KB_REGEX_TIMEOUT, KB_REGEX_WORKERS
+from .processes import worker_context
+from .store import DocKey
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Повторы, содержимое которых обязательно встречается при min >= 1
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+if hasattr(sre_constants, 'POSSESSIVE_REPEAT'):
+    _REPEATS.add(sre_constants.POSSESSIVE_REPEAT)
+
+class RegexTimeout(Exception):
+    """Регулярное выражение не выполнилось за отведенное время."""
+
+@lru_cache(maxsize=KB_REGEX_CACHE_SIZE)
+def compile_pattern(pattern: str) -> re.Pattern:
+    """
+    Компиляция регулярного выражения без учета регистра с кешированием.
+
+    Args:
+        pattern: Регулярное выражение.
+
+    Returns:
+        Скомпилированное выражение.
+
+    Raises:
+        re.error: Если выражение некорректно.
+    """
+    return re.compile(pattern, re.IGNORECASE)
+
+@lru_cache(maxsize=KB_REGEX_CACHE_SIZE)
+def literal_fragments(pattern: str) -> Tuple[str, ...]:
+    """
+    Подстроки, которые обязательно содержит любой текст, подходящий под выражение.
+
+    Учитываются последовательности обычных символов вне альтернатив и
+    необязательных частей. Например, для ``цемент\\s+м(500|400)`` это
+    ``цемент`` и ``м``.
+
+    Args:
+        pattern: Регулярное выражение.
+
+    Returns:
+        Подстроки в нижнем регистре.
+
+    Raises:
+        re.error: Если выражение некорректно.
+    """
+    fragments = []
+    current = []
+
+    def flush():
+        if current:
+            fragments.append(''.join(current).lower())
+            current.clear()
+
+    def walk(items):
+        for op, av in items:
+            if op == sre_constants.LITERAL:
+                current.append(chr(av))
+            elif op == sre_constants.AT:
+                # Якоря (^, $, \b) не занимают символов
+                continue
+            elif op == sre_constants.SUBPATTERN:
+                walk(av[-1])
+            elif op in _REPEATS:
+                flush()
+                if av[0] >= 1:
+                    walk(av[2])
+                    flush()
+            else:
+                flush()
+
+    walk(sre_parse.parse(pattern, re.IGNORECASE))
+    flush()
+    return tuple(fragments)
+
+def _worker_main(conn) -> None:
+    """Цикл процесса-обработчика: загрузка текстов и проверка выражений."""
+    # Ctrl+C обрабатывает основной процесс
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    texts: Dict[DocKey, str] = {}
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message[0] == 'load':
+            texts = message[1]
+            conn.send(('ok', None))
+            continue
+        _, pattern, keys = message
+        try:
+            regex = compile_pattern(pattern)
+        except re.error as e:
+            conn.send(('error', str(e)))
+            continue
+        conn.send(('ok', [key for key in keys if key in texts and regex.search(texts[key])]))
+
+class _Worker:
+    """Процесс-обработчик и канал связи с ним."""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), name='kb-regex', daemon=True)
+        self.process.start()
+        child_conn.close()
+        # Версия корпуса, тексты которой загружены в процесс
+        self.version: Optional[int] = None
+
+    def call(self, message, timeout: Optional[float] = None):
+        """Отправка сообщения и ожидание ответа не дольше timeout секунд."""
+        self.conn.send(message)
+        if not self.conn.poll(timeout):
+            raise RegexTimeout()
+        status, result = self.conn.recv()
+        if status == 'error':
+            raise re.error(result)
+        return result
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+class RegexRunner:
+    """
+    Пул процессов для проверки текстов документов регулярными выражениями.
+
+    Процессы запускаются при первом запросе и хранят копию текстов
+    документов, которая обновляется, когда меняется версия корпуса.
+    """
+
+    def __init__(self, workers: int = KB_REGEX_WORKERS, timeout: float = KB_REGEX_TIMEOUT):
+        """
+        Инициализация пула.
+
+        Args:
+            workers: Количество процессов.
+            timeout: Время на выполнение одного выражения в секундах.
+        """
+        self.timeout = timeout
+        self.timeouts = 0
+        self._context = worker_context()
+        self._idle: 'queue.LifoQueue[Optional[_Worker]]' = queue.LifoQueue()
+        for _ in range(workers):
+            self._idle.put(None)
+
+    def search(
+        self,
+        pattern: str,
+        keys: Sequence[DocKey],
+        version: int,
+        load_texts: Callable[[], Dict[DocKey, str]]
+    ) -> List[DocKey]:
+        """
+        Отбор документов, текст которых содержит совпадение с выражением.
+
+        Args:
+            pattern: Регулярное выражение.
+            keys: Ключи проверяемых документов.
+            version: Текущая версия корпуса.
+            load_texts: Функция, возвращающая тексты всех документов текущей версии.
+
+        Returns:
+            Ключи документов с совпадением в порядке keys.
+
+        Raises:
+            RegexTimeout: Если выражение не выполнилось за отведенное время
+                          или все процессы заняты.
+            re.error: Если выражение некорректно.
+        """
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise RegexTimeout()
+
+        try:
+            if worker is None:
+                worker = _Worker(self._context)
+            if worker.version != version:
+                worker.call(('load', load_texts()))
+                worker.version = version
+            started = time.monotonic()
+            result = worker.call(('search', pattern, list(keys)), self.timeout)
+            logger.debug(f"Регулярное выражение выполнено за {time.monotonic() - started:.3f} с")
+            return result
+        except RegexTimeout:
+            self.timeouts += 1
+            logger.warning(f"Регулярное выражение {pattern!r} не выполнилось за {self.timeout} с, процесс перезапускается")
+            worker.kill()
+            worker = None
+            raise
+        except (OSError, EOFError) as e:
+            logger.error(f"Ошибка процесса поиска по регулярным выражениям: {e}")
+            if worker is not None:
+                worker.kill()
+            worker = None
+            raise RegexTimeout() from e
+        finally:
+            self._idle.put(worker)
@@ -4,30 +4,68 @@
 import logging
 from typing import Dict, List, Any, Tuple, Optional
 from pathlib import Path
-import json
 import re
 
+from config.settings import KB_SEARCH_TOP_K, KB_FIELD_INDEX_PATHS
+from .chunks import split_document
+from .index import FieldIndex, InvertedIndex, TrigramIndex, extract_values, normalize_value, parse_path
+from .regex_worker import RegexRunner, RegexTimeout, compile_pattern, literal_fragments
+from .store import Document, DocKey, KnowledgeStore, get_store
+
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
 class KnowledgeSearch:
     """Класс для поиска в базе знаний."""
     
-    def __init__(self, base_path: str = None):
+    def __init__(self, base_path: str = None, store: KnowledgeStore = None):
         """
         Инициализация поиска по базе знаний.
         
         Args:
             base_path: Путь к директории с данными. По умолчанию используется
                       директория data внутри пакета knowledge_base.
+            store: Хранилище документов. По умолчанию общее хранилище для base_path.
         """
         if base_path is None:
             self.base_path = Path(__file__).parent / 'data'
         else:
             self.base_path = Path(base_path)
+        self.store = store or get_store(self.base_path)
+        # Индекс строится при загрузке корпуса и обновляется вместе с ним
+        # Вложенные элементы (KB_CHUNK_PATHS) индексируются как отдельные фрагменты
+        self.index = InvertedIndex()
+        self._units: Dict[DocKey, List[Tuple[str, ...]]] = {}
+        self._chunks: Dict[Tuple[str, ...], Document] = {}
+        self.store.subscribe(self._index_document)
+        self.field_index = FieldIndex(KB_FIELD_INDEX_PATHS)
+        self.store.subscribe(self.field_index.update)
+        self.trigram_index = TrigramIndex()
+        self.store.subscribe(self.trigram_index.update)
+        self.regex_runner = RegexRunner()
         
         logger.info(f"Инициализирован поиск знаний с базовым путём: {self.base_path}")
     
+    def _index_document(self, key: DocKey, document: Optional[Document]) -> None:
+        """
+        Обновление индекса ключевых слов основной частью документа и его фрагментами.
+
+        Args:
+            key: Ключ документа.
+            document: Документ или None для удаления.
+        """
+        for unit_key in self._units.pop(key, ()):
+            self.index.update(unit_key, None)
+            self._chunks.pop(unit_key, None)
+        if document is None:
+            return
+        units = split_document(document)
+        for unit in units:
+            self.index.update(unit.unit_key, unit)
+            if unit.path:
+                self._chunks[unit.unit_key] = unit
+        self._units[key] = [unit.unit_key for unit in units]
+
     def _preprocess_query(self, query: str) -> str:
         """
         Предобработка запроса.
@@ -46,140 +84,152 @@ class KnowledgeSearch:
         
         return query
     
-    def simple_search(self, query: str, categories: List[str] = None) -> List[Dict[str, Any]]:
+    def _documents(self, categories: List[str] = None):
         """
-        Простой поиск по ключевым словам.
+        Документы для поиска.
         
         Args:
-            query: Поисковый запрос.
             categories: Список категорий для поиска. Если None, поиск по всем категориям.
             
         Returns:
-            Список найденных элементов.
+            Список документов из хранилища.
         """
-        query = self._preprocess_query(query)
-        results = []
+        if categories:
+            known = self.store.categories()
+            for category in categories:
+                if category not in known:
+                    logger.warning(f"Категория '{category}' не найдена.")
+        return list(self.store.documents(categories))
+    
+    def simple_search(self, query: str, categories: List[str] = None, top_k: int = KB_SEARCH_TOP_K) -> List[Dict[str, Any]]:
+        """
+        Поиск по ключевым словам с ранжированием BM25.
         
-        if not categories:
-            # Поиск по всем категориям
-            categories = [d.name for d in self.base_path.iterdir() 
-                         if d.is_dir() and not d.name.startswith('__')]
+        Словоформы приводятся к основе, поэтому "цементы" находит "цемент".
+        Если по словам ничего не найдено (например, запрос - часть слова),
+        выполняется поиск по подстроке. Вложенные элементы (KB_CHUNK_PATHS)
+        возвращаются отдельными фрагментами с полем _path.
         
-        for category in categories:
-            category_path = self.base_path / category
-            
-            if not category_path.exists():
-                logger.warning(f"Категория '{category}' не найдена.")
-                continue
+        Args:
+            query: Поисковый запрос.
+            categories: Список категорий для поиска. Если None, поиск по всем категориям.
+            top_k: Максимальное количество результатов.
             
-            # Поиск во всех JSON файлах категории
-            for file_path in category_path.glob('*.json'):
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        
-                        # Преобразуем JSON в строку для поиска
-                        data_str = json.dumps(data, ensure_ascii=False).lower()
-                        
-                        if query in data_str:
-                            # Добавляем метаданные для результата
-                            data['_category'] = category
-                            data['_id'] = file_path.stem
-                            results.append(data)
-                except Exception as e:
-                    logger.error(f"Ошибка при поиске в файле {file_path}: {e}")
+        Returns:
+            Список найденных элементов по убыванию релевантности.
+        """
+        self.store.refresh()
+        results = []
+        wanted = set(categories) if categories else None
+        for unit_key, score in self.index.search(query, top_k, wanted):
+            # Фрагмент возвращается сам по себе, основная часть - всем документом
+            document = self._chunks.get(unit_key) or self.store.get(*unit_key[:2])
+            if document is not None:
+                result = document.to_result()
+                result['_score'] = score
+                results.append(result)
+        if results:
+            return results
         
-        return results
+        query = self._preprocess_query(query)
+        
+        return [
+            document.to_result()
+            for document in self._documents(categories)
+            if query in document.search_text
+        ][:top_k]
     
     def search_by_field(self, field: str, value: str, categories: List[str] = None) -> List[Dict[str, Any]]:
         """
         Поиск по конкретному полю.
         
         Args:
-            field: Имя поля для поиска.
+            field: Имя поля для поиска или путь к вложенному полю,
+                   например ``price_ranges[].items[].unit``.
             value: Значение для поиска.
             categories: Список категорий для поиска. Если None, поиск по всем категориям.
             
         Returns:
             Список найденных элементов.
         """
-        value = str(value).lower()
-        results = []
-        
-        if not categories:
-            # Поиск по всем категориям
-            categories = [d.name for d in self.base_path.iterdir() 
-                         if d.is_dir() and not d.name.startswith('__')]
+        if not self.field_index.is_indexed(field):
+            # Путь не индексируется, проверяем документы по очереди
+            path = parse_path(field)
+            value = normalize_value(value)
+            return [
+                document.to_result()
+                for document in self._documents(categories)
+                if any(normalize_value(v) == value for v in extract_values(document.data, path))
+            ]
         
-        for category in categories:
-            category_path = self.base_path / category
-            
-            if not category_path.exists():
-                logger.warning(f"Категория '{category}' не найдена.")
+        self.store.refresh()
+        results = []
+        for category, item_id in sorted(self.field_index.lookup(field, value)):
+            if categories and category not in categories:
                 continue
-            
-            # Поиск во всех JSON файлах категории
-            for file_path in category_path.glob('*.json'):
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        
-                        # Проверяем наличие поля и совпадение значения
-                        if field in data and str(data[field]).lower() == value:
-                            # Добавляем метаданные для результата
-                            data['_category'] = category
-                            data['_id'] = file_path.stem
-                            results.append(data)
-                except Exception as e:
-                    logger.error(f"Ошибка при поиске в файле {file_path}: {e}")
-        
+            document = self.store.get(category, item_id)
+            if document is not None:
+                results.append(document.to_result())
         return results
     
+    def index_stats(self) -> Dict[str, Any]:
+        """
+        Статистика поисковых индексов.
+        
+        Returns:
+            Словарь с размерами индексов.
+        """
+        return {
+            'documents': len(self._units),
+            'units': len(self.index),
+            'fields': self.field_index.stats(),
+            'trigrams': len(self.trigram_index),
+            'regex_timeouts': self.regex_runner.timeouts
+        }
+    
     def regex_search(self, pattern: str, categories: List[str] = None) -> List[Dict[str, Any]]:
         """
         Поиск по регулярному выражению.
         
+        Проверяются только документы, содержащие все обязательные подстроки
+        выражения (по индексу триграмм). Выражение выполняется в отдельном
+        процессе не дольше KB_REGEX_TIMEOUT секунд.
+        
         Args:
             pattern: Регулярное выражение для поиска.
             categories: Список категорий для поиска. Если None, поиск по всем категориям.
             
         Returns:
-            Список найденных элементов.
+            Список найденных элементов. Пустой, если выражение некорректно
+            или не выполнилось за отведенное время.
         """
         try:
-            regex = re.compile(pattern, re.IGNORECASE)
-            results = []
-            
-            if not categories:
-                # Поиск по всем категориям
-                categories = [d.name for d in self.base_path.iterdir() 
-                             if d.is_dir() and not d.name.startswith('__')]
-            
-            for category in categories:
-                category_path = self.base_path / category
-                
-                if not category_path.exists():
-                    logger.warning(f"Категория '{category}' не найдена.")
-                    continue
-                
-                # Поиск во всех JSON файлах категории
-                for file_path in category_path.glob('*.json'):
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                            
-                            # Преобразуем JSON в строку для поиска
-                            data_str = json.dumps(data, ensure_ascii=False)
-                            
-                            if regex.search(data_str):
-                                # Добавляем метаданные для результата
-                                data['_category'] = category
-                                data['_id'] = file_path.stem
-                                results.append(data)
-                    except Exception as e:
-                        logger.error(f"Ошибка при поиске в файле {file_path}: {e}")
-            
-            return results
+            compile_pattern(pattern)
+            fragments = literal_fragments(pattern)
         except re.error as e:
             logger.error(f"Ошибка в регулярном выражении: {e}")
-            return [] 
\ No newline at end of file
+            return []
+        
+        documents = self._documents(categories)
+        version = self.store.version
+        candidates = self.trigram_index.candidates(fragments)
+        if candidates is not None:
+            documents = [document for document in documents if document.key in candidates]
+        if not documents:
+            return []
+        
+        try:
+            keys = self.regex_runner.search(
+                pattern,
+                [document.key for document in documents],
+                version,
+                lambda: {document.key: document.text for document in self.store.documents()}
+            )
+        except RegexTimeout:
+            return []
+        except re.error as e:
+            logger.error(f"Ошибка в регулярном выражении: {e}")
+            return []
+        
+        matched = set(keys)
+        return [document.to_result() for document in documents if document.key in matched]
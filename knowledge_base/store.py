@@ -0,0 +1,296 @@
+"""
+Хранилище документов базы знаний в памяти.
+"""
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from config.settings import KB_RELOAD_INTERVAL
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# (категория, идентификатор элемента)
+DocKey = Tuple[str, str]
+
+@dataclass
+class Document:
+    """Документ базы знаний и данные для поиска по нему."""
+    category: str
+    item_id: str
+    data: dict
+    # JSON документа для поиска по регулярным выражениям
+    text: str
+    # Он же в нижнем регистре для поиска по подстроке
+    search_text: str
+    # Размер и время изменения файла, по которым видно, что он изменился
+    signature: Tuple[int, int]
+    # Путь к вложенному элементу, если это фрагмент документа (см. chunks.py)
+    path: Optional[str] = None
+
+    @property
+    def key(self) -> DocKey:
+        return (self.category, self.item_id)
+
+    @property
+    def unit_key(self) -> Tuple[str, ...]:
+        """Ключ документа или, для фрагмента, ключ документа и путь к элементу."""
+        return self.key + (self.path,) if self.path else self.key
+
+    def to_result(self) -> dict:
+        """
+        Копия данных документа с метаданными для результатов поиска.
+
+        Returns:
+            Словарь с данными и полями _category и _id (и _path для фрагмента).
+        """
+        result = dict(self.data)
+        result['_category'] = self.category
+        result['_id'] = self.item_id
+        if self.path:
+            result['_path'] = self.path
+        return result
+
+def _signature(path: Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return (stat.st_size, stat.st_mtime_ns)
+
+class KnowledgeStore:
+    """
+    Все документы базы знаний, загруженные в память один раз.
+
+    Изменения файлов подхватываются при обращении к хранилищу: не чаще раза
+    в ``reload_interval`` секунд проверяются размер и время изменения
+    файлов, и заново читаются только изменившиеся.
+
+    Индексы подписываются на изменения через ``subscribe`` и получают
+    каждый добавленный, измененный или удаленный документ.
+    """
+
+    def __init__(self, base_path: Path, reload_interval: float = KB_RELOAD_INTERVAL):
+        """
+        Инициализация хранилища.
+
+        Args:
+            base_path: Путь к директории с данными.
+            reload_interval: Минимальный интервал между проверками файлов в секундах.
+        """
+        self.base_path = Path(base_path)
+        self.reload_interval = reload_interval
+        # Номер версии корпуса, увеличивается при каждом изменении
+        self.version = 0
+        self._documents: Dict[DocKey, Document] = {}
+        self._categories: List[str] = []
+        self._checked_at: Optional[float] = None
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[DocKey, Optional['Document']], None]] = []
+
+    def _read_document(self, category: str, path: Path, signature: Tuple[int, int]) -> Optional[Document]:
+        """
+        Чтение документа из файла.
+
+        Args:
+            category: Название категории.
+            path: Путь к файлу.
+            signature: Размер и время изменения файла.
+
+        Returns:
+            Документ или None, если файл пуст или поврежден.
+        """
+        try:
+            content = path.read_text(encoding='utf-8')
+            if not content.strip():
+                logger.error(f"Файл {path} пуст.")
+                return None
+            data = json.loads(content)
+            return self._make_document(category, path.stem, data, signature)
+        except json.JSONDecodeError as e:
+            logger.error(f"Ошибка формата JSON в файле {path}: {e}")
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке файла {path}: {e}")
+        return None
+
+    @staticmethod
+    def _make_document(category: str, item_id: str, data: dict, signature: Tuple[int, int]) -> Document:
+        text = json.dumps(data, ensure_ascii=False)
+        return Document(category, item_id, data, text, text.lower(), signature)
+
+    def _scan(self) -> None:
+        """Сверка документов в памяти с файлами на диске."""
+        categories = []
+        seen = set()
+        changed = 0
+
+        try:
+            category_dirs = sorted(
+                d for d in self.base_path.iterdir()
+                if d.is_dir() and not d.name.startswith('__')
+            )
+        except FileNotFoundError:
+            category_dirs = []
+
+        for category_dir in category_dirs:
+            category = category_dir.name
+            categories.append(category)
+            for path in sorted(category_dir.glob('*.json')):
+                key = (category, path.stem)
+                try:
+                    signature = _signature(path)
+                except OSError:
+                    continue
+                seen.add(key)
+
+                current = self._documents.get(key)
+                if current is not None and current.signature == signature:
+                    continue
+                document = self._read_document(category, path, signature)
+                if document is not None:
+                    self._set(key, document)
+                elif current is not None:
+                    self._set(key, None)
+                changed += 1
+
+        for key in [key for key in self._documents if key not in seen]:
+            self._set(key, None)
+            changed += 1
+
+        if changed or categories != self._categories:
+            self._categories = categories
+            self.version += 1
+            logger.info(f"База знаний обновлена: изменено документов {changed}, всего {len(self._documents)}")
+
+    def _set(self, key: DocKey, document: Optional[Document]) -> None:
+        """Замена или удаление документа с уведомлением подписчиков."""
+        if document is None:
+            self._documents.pop(key, None)
+        else:
+            self._documents[key] = document
+        for listener in self._listeners:
+            try:
+                listener(key, document)
+            except Exception as e:
+                logger.error(f"Ошибка при обновлении индекса для {key}: {e}")
+
+    def subscribe(self, listener: Callable[[DocKey, Optional[Document]], None]) -> None:
+        """
+        Подписка на изменения документов.
+
+        Подписчик сразу получает все уже загруженные документы, а затем
+        вызывается с документом при его добавлении или изменении и с None
+        при удалении.
+
+        Args:
+            listener: Функция, принимающая ключ документа и документ.
+        """
+        with self._lock:
+            self.refresh()
+            self._listeners.append(listener)
+            for key, document in self._documents.items():
+                listener(key, document)
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Подхват изменений файлов, если с прошлой проверки прошло достаточно времени.
+
+        Args:
+            force: Проверить файлы независимо от интервала.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._checked_at is not None and now - self._checked_at < self.reload_interval:
+                return
+            self._scan()
+            self._checked_at = now
+
+    def reload(self) -> None:
+        """Полная перезагрузка всех документов с диска."""
+        with self._lock:
+            for key in list(self._documents):
+                self._set(key, None)
+            self._categories = []
+            self.refresh(force=True)
+
+    def put(self, category: str, item_id: str, data: dict, path: Path) -> None:
+        """
+        Добавление или замена документа после сохранения его файла.
+
+        Args:
+            category: Название категории.
+            item_id: Идентификатор элемента.
+            data: Данные элемента.
+            path: Путь к сохраненному файлу.
+        """
+        with self._lock:
+            self._set((category, item_id), self._make_document(category, item_id, data, _signature(path)))
+            if category not in self._categories:
+                self._categories = sorted(self._categories + [category])
+            self.version += 1
+
+    def categories(self) -> List[str]:
+        """
+        Получение списка категорий.
+
+        Returns:
+            Список названий категорий.
+        """
+        self.refresh()
+        return list(self._categories)
+
+    def get(self, category: str, item_id: str) -> Optional[Document]:
+        """
+        Получение документа.
+
+        Args:
+            category: Название категории.
+            item_id: Идентификатор элемента.
+
+        Returns:
+            Документ или None, если он не найден.
+        """
+        self.refresh()
+        return self._documents.get((category, item_id))
+
+    def documents(self, categories: List[str] = None) -> Iterator[Document]:
+        """
+        Перебор документов.
+
+        Args:
+            categories: Список категорий. Если None, перебираются все документы.
+
+        Returns:
+            Итератор по документам.
+        """
+        self.refresh()
+        with self._lock:
+            documents = list(self._documents.values())
+        if categories:
+            wanted = set(categories)
+            documents = [d for d in documents if d.category in wanted]
+        return iter(documents)
+
+_stores: Dict[Path, KnowledgeStore] = {}
+_stores_lock = threading.Lock()
+
+def get_store(base_path: Path = None) -> KnowledgeStore:
+    """
+    Получение общего хранилища для директории с данными.
+
+    Args:
+        base_path: Путь к директории с данными. По умолчанию используется
+                  директория data внутри пакета knowledge_base.
+
+    Returns:
+        Хранилище документов.
+    """
+    if base_path is None:
+        base_path = Path(__file__).parent / 'data'
+    base_path = Path(base_path).resolve()
+    with _stores_lock:
+        store = _stores.get(base_path)
+        if store is None:
+            store = _stores[base_path] = KnowledgeStore(base_path)
+        return store
@@ -0,0 +1,88 @@
+"""
+Токенизация и нормализация текста для поисковых индексов.
+"""
+import logging
+import re
+from functools import lru_cache
+from typing import Any, Iterator, List
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+try:
+    import snowballstemmer
+except ImportError:
+    snowballstemmer = None
+    logger.warning("Пакет snowballstemmer не установлен, поиск не будет учитывать словоформы")
+
+TOKEN_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'[а-я]')
+
+# Частые слова, которые не помогают ранжированию
+STOP_WORDS = frozenset("""
+    и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по
+    только ее мне было вот от меня еще нет о из ему теперь когда даже ну вдруг ли если
+    уже или ни быть был него до вас нибудь опять уж вам ведь там потом себя ничего ей
+    может они тут где есть надо ней для мы тебя их чем была сам чтоб без будто чего раз
+    тоже себе под будет ж тогда кто этот того потому этого какой совсем ним здесь этом
+    один почти мой тем чтобы нее были куда зачем всех никогда можно при наконец два об
+    другой хоть после над больше тот через эти нас про всего них какая много разве три
+    эту моя впрочем хорошо свою этой перед иногда лучше чуть том нельзя такой им более
+    всегда конечно всю между это the of and to in for
+""".split())
+
+if snowballstemmer is not None:
+    _stemmers = {
+        'russian': snowballstemmer.stemmer('russian'),
+        'english': snowballstemmer.stemmer('english')
+    }
+else:
+    _stemmers = {}
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """
+    Приведение слова к основе.
+
+    Args:
+        word: Слово в нижнем регистре.
+
+    Returns:
+        Основа слова или само слово, если стеммер недоступен.
+    """
+    stemmer = _stemmers.get('russian' if CYRILLIC_RE.search(word) else 'english')
+    return stemmer.stemWord(word) if stemmer is not None else word
+
+def tokenize(text: str) -> List[str]:
+    """
+    Разбиение текста на нормализованные термины.
+
+    Args:
+        text: Исходный текст.
+
+    Returns:
+        Список основ слов без стоп-слов.
+    """
+    words = TOKEN_RE.findall(text.lower().replace('ё', 'е'))
+    return [stem(word) for word in words if word not in STOP_WORDS]
+
+def iter_strings(value: Any) -> Iterator[str]:
+    """
+    Перебор всех строковых значений во вложенных данных.
+
+    Args:
+        value: Данные документа.
+
+    Returns:
+        Итератор по строкам.
+    """
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from iter_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from iter_strings(item)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield str(value)
@@ -0,0 +1,561 @@
+"""
+Семантический поиск в отдельных процессах.
+
+Модель sentence-transformers, torch и FAISS загружаются только в
+процессах-обработчиках, поэтому процесс бота остается легким, а
+векторизация не конкурирует с циклом событий aiogram за GIL.
+
+Каждый обработчик держит свой векторизатор с индексом и сам подхватывает
+изменения файлов базы знаний. С процессом бота он связан каналом
+(multiprocessing Pipe), по которому идут только команды и короткие ответы,
+а векторы запросов в обе стороны передаются через блок общей памяти.
+"""
+import asyncio
+import logging
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import (
+    KB_EMBED_BATCH_SIZE, KB_QUERY_CACHE_SIZE, KB_VECTOR_INDEX_PATH, KB_VECTOR_TIMEOUT, KB_VECTOR_WORKERS
+)
+from data.cache import UserCache
+from . import ann
+from .chunks import get_fragment
+from .embedding_service import EmbeddingService
+from .processes import worker_context
+from .store import KnowledgeStore, get_store
+from .vectorizer import KnowledgeVectorizer
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+
+# (категория, идентификатор элемента, путь к фрагменту или None, оценка)
+Hit = Tuple[str, str, Optional[str], float]
+
+def _worker_main(conn, base_path: str, index_path: Optional[str], model_name: str, persist: bool) -> None:
+    """Цикл процесса-обработчика."""
+    # Ctrl+C обрабатывает процесс бота
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    try:
+        vectorizer = KnowledgeVectorizer(
+            base_path,
+            model_name=model_name,
+            store=KnowledgeStore(base_path),
+            index_path=index_path
+        )
+        vectorizer.build_index()
+        if vectorizer.index is None:
+            raise RuntimeError("Нет данных для индексации")
+        if not persist:
+            # Обновленный индекс сохраняет только один процесс пула, иначе
+            # файлы разных процессов перемешаются
+            vectorizer.index_path = None
+        vectorizer.encode_queries(["прогрев"])
+    except Exception as e:
+        conn.send(('error', str(e)))
+        return
+    conn.send(('ok', {
+        'dimension': vectorizer.index.d,
+        'documents': len(vectorizer.index_to_data),
+        'index_type': ann.index_type_of(vectorizer.index)
+    }))
+
+    memory = None
+    buffer = None
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        command = message[0]
+        try:
+            if command == 'attach':
+                _, name, capacity = message
+                memory = shared_memory.SharedMemory(name=name)
+                buffer = np.ndarray((capacity, vectorizer.index.d), dtype=np.float32, buffer=memory.buf)
+                conn.send(('ok', None))
+            elif command == 'embed':
+                texts = message[1]
+                buffer[:len(texts)] = vectorizer.encode_queries(texts)
+                conn.send(('ok', len(texts)))
+            elif command == 'search':
+                _, count, top_k = message
+                vectorizer.apply_updates()
+                hits = [
+                    [(data['_category'], data['_id'], data.get('_path'), data['_score'])
+                     for data in vectorizer.search_vector(buffer[i:i + 1], top_k)]
+                    for i in range(count)
+                ]
+                conn.send(('ok', hits))
+            elif command == 'refresh':
+                vectorizer.store.refresh(force=True)
+                conn.send(('ok', vectorizer.apply_updates()))
+            else:
+                conn.send(('error', f"Неизвестная команда {command}"))
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+    buffer = None
+    if memory is not None:
+        memory.close()
+
+class _VectorWorker:
+    """Процесс-обработчик, канал связи и блок общей памяти для векторов."""
+
+    def __init__(
+        self,
+        context,
+        base_path: Path,
+        index_path: Optional[str],
+        model_name: str,
+        capacity: int,
+        persist: bool,
+        timeout: float
+    ):
+        # Сохраняет ли процесс индекс после обновлений
+        self.persist = persist
+        self.timeout = timeout
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, str(base_path), index_path, model_name, persist),
+            name='kb-vector',
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.memory = None
+        try:
+            # Ждем, пока обработчик загрузит модель и индекс: построение
+            # индекса может занять больше времени, чем выполнение команды
+            info = self._receive(None)
+            self.dimension = info['dimension']
+            self.documents = info['documents']
+            self.index_type = info['index_type']
+            self.capacity = capacity
+            self.memory = shared_memory.SharedMemory(create=True, size=capacity * self.dimension * 4)
+            self.buffer = np.ndarray((capacity, self.dimension), dtype=np.float32, buffer=self.memory.buf)
+            self.call('attach', self.memory.name, capacity)
+        except BaseException:
+            self.close()
+            raise
+
+    def _receive(self, timeout: Optional[float]):
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"Процесс семантического поиска не ответил за {timeout} с")
+        status, result = self.conn.recv()
+        if status == 'error':
+            raise RuntimeError(result)
+        return result
+
+    def call(self, *message):
+        """Отправка команды и ожидание ответа не дольше timeout секунд."""
+        self.conn.send(message)
+        return self._receive(self.timeout)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Векторизация текстов частями по размеру блока общей памяти."""
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(texts), self.capacity):
+            chunk = list(texts[start:start + self.capacity])
+            self.call('embed', chunk)
+            vectors[start:start + len(chunk)] = self.buffer[:len(chunk)]
+        return vectors
+
+    def search(self, vectors: np.ndarray, top_k: int) -> List[List[Hit]]:
+        """Поиск ближайших элементов для каждого вектора."""
+        hits = []
+        for start in range(0, len(vectors), self.capacity):
+            chunk = vectors[start:start + self.capacity]
+            self.buffer[:len(chunk)] = chunk
+            hits.extend(self.call('search', len(chunk), top_k))
+        return hits
+
+    def close(self) -> None:
+        self.conn.close()
+        self.process.terminate()
+        self.process.join(5)
+        if self.process.is_alive():
+            # Зависший процесс может не обработать SIGTERM
+            self.process.kill()
+            self.process.join()
+        if self.memory is not None:
+            self.buffer = None
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+class VectorWorkerPool:
+    """
+    Пул процессов-обработчиков семантического поиска.
+
+    Каждый процесс в каждый момент выполняет одну команду. Процесс,
+    завершившийся с ошибкой, при следующем обращении к нему запускается заново.
+    """
+
+    def __init__(
+        self,
+        base_path: Path,
+        index_path: Optional[str] = KB_VECTOR_INDEX_PATH,
+        model_name: str = DEFAULT_MODEL,
+        workers: int = KB_VECTOR_WORKERS,
+        capacity: int = KB_EMBED_BATCH_SIZE,
+        timeout: float = KB_VECTOR_TIMEOUT
+    ):
+        """
+        Инициализация пула.
+
+        Args:
+            base_path: Путь к директории с данными базы знаний.
+            index_path: Директория сохраненного векторного индекса.
+            model_name: Название модели для sentence-transformers.
+            workers: Количество процессов.
+            capacity: Сколько векторов помещается в блок общей памяти процесса.
+            timeout: Время на выполнение одной команды в секундах; процесс,
+                     не уложившийся в него, завершается.
+        """
+        self.base_path = base_path
+        self.index_path = index_path
+        self.model_name = model_name
+        self.workers = workers
+        self.capacity = capacity
+        self.timeout = timeout
+        self.restarts = 0
+        self.timeouts = 0
+        self.requests = 0
+        self._context = worker_context()
+        self._idle: 'queue.Queue[Optional[_VectorWorker]]' = queue.Queue()
+        self._workers: List[_VectorWorker] = []
+        # Есть ли процесс, сохраняющий индекс после обновлений
+        self._persisting = False
+        self._lock = threading.Lock()
+        # Команды, которые занимают все процессы сразу
+        self._broadcast_lock = threading.Lock()
+
+    def _spawn(self) -> _VectorWorker:
+        with self._lock:
+            persist = not self._persisting
+            self._persisting = True
+        try:
+            worker = _VectorWorker(
+                self._context, self.base_path, self.index_path, self.model_name, self.capacity, persist, self.timeout
+            )
+        except BaseException:
+            if persist:
+                with self._lock:
+                    self._persisting = False
+            raise
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _retire(self, worker: _VectorWorker) -> None:
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+                if worker.persist:
+                    # Индекс будет сохранять следующий запущенный процесс
+                    self._persisting = False
+        worker.close()
+
+    def start(self) -> Dict[str, Any]:
+        """
+        Запуск процессов.
+
+        Первый процесс при необходимости строит и сохраняет индекс, остальные
+        запускаются после него и читают индекс с диска. Обновления индекса
+        сохраняет только один процесс.
+
+        Returns:
+            Словарь с размерностью векторов, числом проиндексированных элементов
+            и типом индекса.
+        """
+        first = self._spawn()
+        self._idle.put(first)
+        for _ in range(self.workers - 1):
+            self._idle.put(self._spawn())
+        logger.info(f"Запущено процессов семантического поиска: {self.workers}")
+        return {'dimension': first.dimension, 'documents': first.documents, 'index_type': first.index_type}
+
+    def _call(self, method: str, *args):
+        """Выполнение команды на свободном процессе."""
+        worker = self._idle.get()
+        try:
+            if worker is None:
+                worker = self._spawn()
+                self.restarts += 1
+            self.requests += 1
+            return getattr(worker, method)(*args)
+        except TimeoutError as e:
+            self.timeouts += 1
+            logger.warning(f"{e}, процесс перезапускается")
+            self._retire(worker)
+            worker = None
+            raise RuntimeError("Процесс семантического поиска не ответил вовремя") from e
+        except (EOFError, OSError) as e:
+            logger.error(f"Процесс семантического поиска завершился: {e}")
+            self._retire(worker)
+            worker = None
+            raise RuntimeError("Процесс семантического поиска завершился") from e
+        finally:
+            self._idle.put(worker)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Векторизация текстов.
+
+        Args:
+            texts: Тексты запросов.
+
+        Returns:
+            Массив векторов формы (количество текстов, размерность).
+        """
+        return self._call('embed', texts)
+
+    def search(self, vectors: np.ndarray, top_k: int) -> List[List[Hit]]:
+        """
+        Поиск ближайших элементов.
+
+        Args:
+            vectors: Векторы запросов.
+            top_k: Количество результатов для каждого запроса.
+
+        Returns:
+            Для каждого вектора список (категория, идентификатор, оценка).
+        """
+        return self._call('search', vectors, top_k)
+
+    def refresh(self) -> int:
+        """
+        Подхват изменений файлов базы знаний всеми процессами.
+
+        Ждет, пока освободится каждый процесс. Процессы, которые еще не
+        запущены, прочитают файлы при запуске.
+
+        Returns:
+            Наибольшее количество обработанных процессом изменений.
+        """
+        with self._broadcast_lock:
+            workers = [self._idle.get() for _ in range(self.workers)]
+            updated = 0
+            try:
+                for i, worker in enumerate(workers):
+                    if worker is None:
+                        continue
+                    self.requests += 1
+                    try:
+                        updated = max(updated, worker.call('refresh'))
+                    except (EOFError, OSError) as e:
+                        logger.error(f"Ошибка обновления процесса семантического поиска: {e}")
+                        self._retire(worker)
+                        workers[i] = None
+            finally:
+                for worker in workers:
+                    self._idle.put(worker)
+            return updated
+
+    def close(self) -> None:
+        """Остановка всех процессов и освобождение общей памяти."""
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Счетчики пула.
+
+        Returns:
+            Словарь с числом процессов, работающих процессов, перезапусков,
+            команд и команд, не выполненных вовремя.
+        """
+        with self._lock:
+            alive = sum(worker.process.is_alive() for worker in self._workers)
+        return {
+            'workers': self.workers,
+            'alive': alive,
+            'restarts': self.restarts,
+            'requests': self.requests,
+            'timeouts': self.timeouts
+        }
+
+class RemoteVectorizer:
+    """
+    Семантический поиск через пул процессов-обработчиков.
+
+    Заменяет KnowledgeVectorizer в процессе бота: тот же интерфейс прогрева
+    и поиска, но модель и индекс находятся в процессах пула. Документы
+    результатов берутся из хранилища бота.
+    """
+
+    def __init__(
+        self,
+        base_path: str = None,
+        model_name: str = DEFAULT_MODEL,
+        store: KnowledgeStore = None,
+        index_path: str = KB_VECTOR_INDEX_PATH,
+        workers: int = KB_VECTOR_WORKERS
+    ):
+        """
+        Инициализация векторизатора.
+
+        Args:
+            base_path: Путь к директории с данными. По умолчанию используется
+                      директория data внутри пакета knowledge_base.
+            model_name: Название модели для sentence-transformers.
+            store: Хранилище документов. По умолчанию общее хранилище для base_path.
+            index_path: Директория для сохранения индекса.
+            workers: Количество процессов.
+        """
+        self.store = store or get_store(base_path)
+        self.pool = VectorWorkerPool(self.store.base_path, index_path or None, model_name, workers)
+        self.embedding_cache = UserCache(KB_QUERY_CACHE_SIZE, ttl=float('inf'))
+        self.embedding_service = EmbeddingService(self.pool.embed)
+        # Поиск в пуле из асинхронных обработчиков, по потоку на процесс
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kb-vector")
+
+        self.warm_up_state = 'idle'
+        self.warm_up_error: Optional[str] = None
+        self.warm_up_seconds: Optional[float] = None
+        self.documents = 0
+        self.index_type: Optional[str] = None
+        self.ready = threading.Event()
+        self._warm_up_lock = threading.Lock()
+
+    def warm_up(self) -> None:
+        """Запуск процессов пула в фоновом потоке."""
+        with self._warm_up_lock:
+            if self.warm_up_state in ('warming', 'ready'):
+                return
+            self.warm_up_state = 'warming'
+            self.warm_up_error = None
+        threading.Thread(target=self._warm_up, name='kb-warm-up', daemon=True).start()
+
+    def _warm_up(self) -> None:
+        started = time.monotonic()
+        logger.info("Запуск процессов семантического поиска...")
+        try:
+            info = self.pool.start()
+            self.documents = info['documents']
+            self.index_type = info['index_type']
+        except Exception as e:
+            logger.error(f"Ошибка запуска процессов семантического поиска: {e}")
+            self.pool.close()
+            with self._warm_up_lock:
+                self.warm_up_state = 'failed'
+                self.warm_up_error = str(e)
+            return
+
+        self.warm_up_seconds = time.monotonic() - started
+        with self._warm_up_lock:
+            self.warm_up_state = 'ready'
+        self.ready.set()
+        logger.info(f"Семантический поиск готов за {self.warm_up_seconds:.1f} с")
+
+    def warm_up_status(self) -> Dict[str, Any]:
+        """
+        Состояние прогрева.
+
+        Returns:
+            Словарь с состоянием (idle, warming, ready или failed), числом
+            проиндексированных элементов при запуске, типом индекса,
+            длительностью прогрева и ошибкой.
+        """
+        return {
+            'state': self.warm_up_state,
+            'documents': self.documents,
+            'index_type': self.index_type,
+            'seconds': self.warm_up_seconds,
+            'error': self.warm_up_error
+        }
+
+    def apply_updates(self) -> int:
+        """
+        Обновление индексов процессов пула по измененным файлам.
+
+        Процессы и сами подхватывают изменения перед поиском, но не чаще
+        раза в KB_RELOAD_INTERVAL секунд; вызов нужен, чтобы сохраненный
+        документ находился сразу.
+
+        Returns:
+            Наибольшее количество обработанных процессом изменений.
+        """
+        return self.pool.refresh()
+
+    def _results(self, hits: List[Hit]) -> List[Dict[str, Any]]:
+        """Данные найденных элементов из хранилища бота."""
+        results = []
+        for category, item_id, path, score in hits:
+            document = self.store.get(category, item_id)
+            if document is not None and path:
+                document = get_fragment(document, path)
+            if document is not None:
+                result = document.to_result()
+                result['_score'] = score
+                results.append(result)
+        return results
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Семантический поиск по запросу.
+
+        Args:
+            query: Поисковый запрос.
+            top_k: Количество результатов для возврата.
+
+        Returns:
+            Список найденных элементов, отсортированных по релевантности.
+        """
+        query = ' '.join(query.lower().split())
+        query_vector = self.embedding_cache.get_or_load(query, lambda: self.pool.embed([query]))
+        return self._results(self.pool.search(query_vector, top_k)[0])
+
+    async def search_async(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Семантический поиск по запросу без блокировки цикла событий.
+
+        Args:
+            query: Поисковый запрос.
+            top_k: Количество результатов для возврата.
+
+        Returns:
+            Список найденных элементов, отсортированных по релевантности.
+        """
+        query = ' '.join(query.lower().split())
+        query_vector = self.embedding_cache.get(query)
+        if query_vector is None:
+            query_vector = await self.embedding_service.embed(query)
+            self.embedding_cache.put(query, query_vector)
+        loop = asyncio.get_running_loop()
+        hits = await loop.run_in_executor(self._executor, self.pool.search, query_vector, top_k)
+        return self._results(hits[0])
+
+    def close(self) -> None:
+        """Остановка процессов пула."""
+        self.embedding_service.close()
+        self._executor.shutdown(wait=False)
+        self.pool.close()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Счетчики кеша векторов запросов, пакетной векторизации и пула процессов.
+
+        Returns:
+            Словарь со статистикой.
+        """
+        return {
+            'embeddings': self.embedding_cache.stats(),
+            'batching': self.embedding_service.stats(),
+            'workers': self.pool.stats()
+        }
@@ -1,15 +1,32 @@
 """
 Модуль для векторизации текста и семантического поиска.
 """
+import asyncio
+import hashlib
 import logging
 import json
 import os
+import threading
+import time
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+from config.settings import KB_ANN_INDEX, KB_CHUNK_PATHS, KB_VECTOR_INDEX_PATH, KB_QUERY_CACHE_SIZE, KB_RESULT_CACHE_SIZE
+from data.cache import UserCache
+from . import ann
+from .chunks import split_document
+from .embedding_service import EmbeddingService
+from .store import DocKey, Document, KnowledgeStore, get_store
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
+# Версия формата сохраненного индекса; индексы других версий строятся заново
+INDEX_FORMAT = 4
+
+# Доля удаленных векторов в индексе HNSW или IVF, при которой он перестраивается
+MAX_STALE_RATIO = 0.2
+
 class KnowledgeVectorizer:
     """
     Класс для векторизации текста и семантического поиска.
@@ -20,7 +37,13 @@ class KnowledgeVectorizer:
     - numpy
     """
     
-    def __init__(self, base_path: str = None, model_name: str = "paraphrase-multilingual-MiniLM-L12-v2"):
+    def __init__(
+        self,
+        base_path: str = None,
+        model_name: str = "paraphrase-multilingual-MiniLM-L12-v2",
+        store: KnowledgeStore = None,
+        index_path: str = KB_VECTOR_INDEX_PATH
+    ):
         """
         Инициализация векторизатора знаний.
         
@@ -28,16 +51,50 @@ class KnowledgeVectorizer:
             base_path: Путь к директории с данными. По умолчанию используется
                       директория data внутри пакета knowledge_base.
             model_name: Название модели для sentence-transformers.
+            store: Хранилище документов. По умолчанию общее хранилище для base_path.
+            index_path: Директория для сохранения индекса. Если пусто, индекс
+                        не сохраняется и строится заново при каждом запуске.
         """
         if base_path is None:
             self.base_path = Path(__file__).parent / 'data'
         else:
             self.base_path = Path(base_path)
+        self.store = store or get_store(self.base_path)
         
         self.model_name = model_name
         self.model = None
         self.index = None
+        # Идентификатор вектора в индексе -> данные элемента (фрагмента
+        # для вложенных элементов, см. chunks.py)
         self.index_to_data = {}
+        self.index_path = Path(index_path) if index_path else None
+        # Категории, для которых построен индекс (None - все)
+        self.categories: Optional[List[str]] = None
+        # Ключ документа или фрагмента (Document.unit_key) -> идентификатор вектора
+        self._ids: Dict[Tuple[str, ...], int] = {}
+        # Удаленные векторы, оставшиеся в индексе HNSW или IVF и пропускаемые при поиске
+        self._stale: Set[int] = set()
+        self._next_id = 0
+        self._index_lock = threading.RLock()
+        # Документы, изменившиеся после построения индекса (None - удален)
+        self._pending: Dict[DocKey, Optional[Document]] = {}
+        self._pending_lock = threading.Lock()
+        self.store.subscribe(self._on_change)
+        # Номер версии индекса, увеличивается при каждом его изменении
+        self.index_version = 0
+        # Запрос -> вектор запроса и (запрос, top_k, версия индекса) -> результаты
+        self.embedding_cache = UserCache(KB_QUERY_CACHE_SIZE, ttl=float('inf'))
+        self.result_cache = UserCache(KB_RESULT_CACHE_SIZE, ttl=float('inf'))
+        # Пакетная векторизация запросов для search_async
+        self.embedding_service = EmbeddingService(self.encode_queries)
+        
+        # Прогрев: загрузка модели и индекса в фоновом потоке
+        self.warm_up_state = 'idle'
+        self.warm_up_error: Optional[str] = None
+        self.warm_up_seconds: Optional[float] = None
+        # Устанавливается, когда модель и индекс готовы к поиску
+        self.ready = threading.Event()
+        self._warm_up_lock = threading.Lock()
         
         logger.info(f"Инициализирован векторизатор знаний с базовым путём: {self.base_path}")
     
@@ -81,6 +138,10 @@ class KnowledgeVectorizer:
         """
         texts = []
         
+        # Для фрагмента - заголовок документа и раздел, в котором он находится
+        if isinstance(data.get('_context'), list):
+            texts.append(" ".join(str(item) for item in data['_context']))
+        
         # Добавляем заголовок с большим весом (дублируем)
         if 'title' in data:
             texts.append(str(data['title']) * 3)
@@ -99,72 +160,361 @@ class KnowledgeVectorizer:
         
         return " ".join(texts)
     
-    def build_index(self, categories: List[str] = None):
+    def _corpus_hash(self, categories: List[str] = None) -> str:
+        """
+        Хеш содержимого индексируемых документов.
+        
+        Args:
+            categories: Список категорий для индексации.
+            
+        Returns:
+            Шестнадцатеричный SHA-256 от категорий и текстов документов.
+        """
+        digest = hashlib.sha256()
+        digest.update(json.dumps(sorted(categories) if categories else None).encode('utf-8'))
+        for document in sorted(self.store.documents(categories), key=lambda d: d.key):
+            digest.update(json.dumps([document.category, document.item_id, document.text], ensure_ascii=False).encode('utf-8'))
+        return digest.hexdigest()
+    
+    def _manifest(self, corpus_hash: str) -> Dict[str, Any]:
+        """Описание индекса, по которому проверяется его актуальность."""
+        return {
+            'format': INDEX_FORMAT,
+            'model_name': self.model_name,
+            'chunk_paths': KB_CHUNK_PATHS,
+            'ann_index': KB_ANN_INDEX,
+            'corpus_hash': corpus_hash
+        }
+    
+    def _load_index(self, corpus_hash: str) -> bool:
+        """
+        Загрузка сохраненного индекса, если он построен для того же корпуса и модели.
+        
+        Args:
+            corpus_hash: Хеш текущего корпуса.
+            
+        Returns:
+            True, если индекс загружен.
+        """
+        if self.index_path is None:
+            return False
+        manifest_file = self.index_path / 'manifest.json'
+        try:
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Не удалось прочитать {manifest_file}: {e}")
+            return False
+        
+        expected = self._manifest(corpus_hash)
+        if {key: manifest.get(key) for key in expected} != expected:
+            logger.info("Корпус или модель изменились, индекс будет построен заново")
+            return False
+        
+        try:
+            import faiss
+            
+            # Индекс отображается в память, а не читается целиком; списки IVF
+            # в отображенном файле нельзя изменять, поэтому IVF читается
+            flags = 0 if manifest.get('index_type') == 'ivf' else faiss.IO_FLAG_MMAP
+            index = faiss.read_index(str(self.index_path / 'index.faiss'), flags)
+            with open(self.index_path / 'index_to_data.json', 'r', encoding='utf-8') as f:
+                index_to_data = {int(idx): data for idx, data in json.load(f).items()}
+        except Exception as e:
+            logger.warning(f"Не удалось загрузить сохраненный индекс: {e}")
+            return False
+        
+        ids = set(ann.stored_ids(index).tolist())
+        if index.ntotal != manifest.get('count') or not ids.issuperset(index_to_data):
+            logger.warning("Сохраненный индекс поврежден, индекс будет построен заново")
+            return False
+        
+        ann.configure_search(index)
+        self.faiss = faiss
+        self.index = index
+        self.index_to_data = index_to_data
+        self._stale = ids.difference(index_to_data)
+        self._ids = {
+            (data['_category'], data['_id']) + ((data['_path'],) if '_path' in data else ()): idx
+            for idx, data in index_to_data.items()
+        }
+        self._next_id = max(index_to_data, default=-1) + 1
+        logger.info(f"Загружен сохраненный индекс {ann.index_type_of(index)} с {len(index_to_data)} элементами")
+        return True
+    
+    def _save_index(self, corpus_hash: str) -> None:
+        """
+        Сохранение индекса, соответствия номеров элементам и манифеста.
+        
+        Файлы пишутся во временные и затем переименовываются; манифест
+        записывается последним, поэтому прерванное сохранение приводит
+        лишь к перестроению индекса при следующем запуске.
+        
+        Args:
+            corpus_hash: Хеш проиндексированного корпуса.
+        """
+        if self.index_path is None:
+            return
+        try:
+            self.index_path.mkdir(parents=True, exist_ok=True)
+            manifest_file = self.index_path / 'manifest.json'
+            if manifest_file.exists():
+                manifest_file.unlink()
+            
+            index_file = self.index_path / 'index.faiss'
+            # Временные файлы свои у каждого процесса, сохраняющего индекс
+            suffix = f'.{os.getpid()}.tmp'
+            self.faiss.write_index(self.index, str(index_file) + suffix)
+            os.replace(str(index_file) + suffix, index_file)
+            
+            for name, content in (
+                ('index_to_data.json', {str(idx): data for idx, data in self.index_to_data.items()}),
+                ('manifest.json', {
+                    **self._manifest(corpus_hash),
+                    'index_type': ann.index_type_of(self.index),
+                    'count': self.index.ntotal
+                })
+            ):
+                tmp_file = self.index_path / (name + suffix)
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(content, f, ensure_ascii=False)
+                os.replace(tmp_file, self.index_path / name)
+            logger.info(f"Индекс сохранен в {self.index_path}")
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении индекса в {self.index_path}: {e}")
+    
+    def build_index(self, categories: List[str] = None, rebuild: bool = False):
         """
         Построение индекса для векторного поиска.
         
+        Если на диске есть индекс, построенный той же моделью для того же
+        содержимого документов, он загружается вместо векторизации.
+        
         Args:
             categories: Список категорий для индексации. Если None, индексируются все категории.
+            rebuild: Построить индекс заново, даже если сохраненный индекс актуален.
         """
-        self._load_dependencies()
+        with self._index_lock:
+            # Индекс строится по текущим документам, накопленные изменения не нужны
+            with self._pending_lock:
+                self._pending = {}
+            self.categories = categories
+            
+            corpus_hash = self._corpus_hash(categories)
+            if not rebuild and self._load_index(corpus_hash):
+                self.index_version += 1
+                return
+            
+            self._load_dependencies()
+            
+            logger.info("Начало построения индекса...")
+            
+            all_texts = []
+            self.index_to_data = {}
+            self._ids = {}
+            self._stale = set()
+            
+            for document in self.store.documents(categories):
+                for unit, data in self._units(document):
+                    # Извлекаем текст для векторизации
+                    text = self._extract_text_from_data(unit.data)
+                    
+                    if text:
+                        self._ids[unit.unit_key] = len(all_texts)
+                        self.index_to_data[len(all_texts)] = data
+                        all_texts.append(text)
+            self._next_id = len(all_texts)
+            
+            if not all_texts:
+                logger.warning("Нет данных для индексации.")
+                return
+            
+            # Векторизация текстов
+            logger.info(f"Векторизация {len(all_texts)} элементов...")
+            embeddings = ann.normalize(self.model.encode(all_texts, show_progress_bar=True))
+            
+            # Создание FAISS индекса с собственными идентификаторами векторов,
+            # чтобы заменять и удалять отдельные документы; тип индекса
+            # зависит от размера корпуса
+            index_type = ann.choose_index_type(len(all_texts))
+            self.index = ann.create_index(embeddings, self.np.arange(len(all_texts), dtype='int64'), index_type)
+            
+            self.index_version += 1
+            logger.info(f"Индекс {index_type} успешно построен с {self.index.ntotal} элементами")
+            self._save_index(corpus_hash)
+    
+    @staticmethod
+    def _units(document: Document) -> List[Tuple[Document, Dict[str, Any]]]:
+        """
+        Векторизуемые части документа и данные, возвращаемые для них в результатах.
         
-        logger.info("Начало построения индекса...")
+        Args:
+            document: Документ базы знаний.
+            
+        Returns:
+            Пары (часть, результат): фрагмент возвращается сам по себе,
+            основная часть документа - всем документом.
+        """
+        return [
+            (unit, unit.to_result() if unit.path else document.to_result())
+            for unit in split_document(document)
+        ]
+    
+    def _on_change(self, key: DocKey, document: Optional[Document]) -> None:
+        """Запоминание изменившегося документа до следующего обновления индекса."""
+        with self._pending_lock:
+            self._pending[key] = document
+    
+    def apply_updates(self) -> int:
+        """
+        Векторизация только изменившихся документов и обновление индекса.
         
-        if not categories:
-            # Индексация всех категорий
-            categories = [d.name for d in self.base_path.iterdir() 
-                         if d.is_dir() and not d.name.startswith('__')]
+        Измененные документы заменяются в индексе, удаленные удаляются,
+        новые добавляются; остальные документы и неизменившиеся фрагменты
+        измененных документов заново не векторизуются.
         
-        all_texts = []
-        self.index_to_data = {}
-        index = 0
-        
-        for category in categories:
-            category_path = self.base_path / category
-            
-            if not category_path.exists():
-                logger.warning(f"Категория '{category}' не найдена.")
-                continue
-            
-            # Обработка всех JSON файлов в категории
-            for file_path in category_path.glob('*.json'):
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        
-                        # Извлекаем текст для векторизации
-                        text = self._extract_text_from_data(data)
-                        
-                        if text:
-                            all_texts.append(text)
-                            
-                            # Добавляем метаданные для результата
-                            data['_category'] = category
-                            data['_id'] = file_path.stem
-                            self.index_to_data[index] = data
-                            index += 1
-                except Exception as e:
-                    logger.error(f"Ошибка при индексации файла {file_path}: {e}")
-        
-        if not all_texts:
-            logger.warning("Нет данных для индексации.")
-            return
+        Returns:
+            Количество обработанных изменений.
+        """
+        self.store.refresh()
+        with self._index_lock:
+            if self.index is None or not self._pending:
+                return 0
+            # Хеш считается до того, как забраны изменения: сохраненный индекс
+            # может оказаться новее манифеста, но не старее
+            corpus_hash = self._corpus_hash(self.categories)
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+            self._load_dependencies()
+            
+            units = {}
+            for key, document in pending.items():
+                if document is None or self.categories and document.category not in self.categories:
+                    continue
+                for unit, data in self._units(document):
+                    units[unit.unit_key] = (unit, data)
+            
+            # Удаляются векторы документа и всех его фрагментов, кроме
+            # фрагментов, которые не изменились
+            removed = []
+            for key in list(self._ids):
+                if key[:2] not in pending:
+                    continue
+                if len(key) > 2 and key in units and self.index_to_data[self._ids[key]] == units[key][1]:
+                    del units[key]
+                    continue
+                removed.append(self._ids.pop(key))
+            if removed:
+                self._remove_vectors(removed)
+            
+            added = []
+            for key, (unit, data) in units.items():
+                text = self._extract_text_from_data(unit.data)
+                if text:
+                    added.append((key, data, text))
+            if added:
+                embeddings = ann.normalize(self.model.encode([text for _, _, text in added]))
+                ids = self.np.arange(self._next_id, self._next_id + len(added), dtype='int64')
+                self._next_id += len(added)
+                self.index.add_with_ids(embeddings, ids)
+                for idx, (key, data, _) in zip(ids.tolist(), added):
+                    self._ids[key] = idx
+                    self.index_to_data[idx] = data
+            
+            self.index_version += 1
+            if len(self._stale) > MAX_STALE_RATIO * self.index.ntotal:
+                logger.info(f"Перестроение индекса без {len(self._stale)} удаленных векторов")
+                self.index = ann.rebuild(self.index, self.np.array(list(self.index_to_data), dtype='int64'))
+                self._stale = set()
+            
+            logger.info(f"Индекс обновлен: удалено {len(removed)}, добавлено {len(added)} векторов")
+            self._save_index(corpus_hash)
+            return len(pending)
+    
+    def _remove_vectors(self, ids: List[int]) -> None:
+        """
+        Удаление векторов из индекса.
+        
+        Из индексов HNSW и IVF векторы не удаляются (см. ann.supports_removal):
+        они остаются в индексе и пропускаются при поиске, пока индекс не
+        будет перестроен.
+        
+        Args:
+            ids: Идентификаторы векторов.
+        """
+        if ann.supports_removal(self.index):
+            self.index.remove_ids(self.np.array(ids, dtype='int64'))
+        else:
+            self._stale.update(ids)
+        for idx in ids:
+            del self.index_to_data[idx]
+    
+    def warm_up(self) -> None:
+        """
+        Запуск загрузки модели и индекса в фоновом потоке.
         
-        # Векторизация текстов
-        logger.info(f"Векторизация {len(all_texts)} элементов...")
-        embeddings = self.model.encode(all_texts, show_progress_bar=True)
+        Пока прогрев не завершен, ``ready`` не установлен и поиск следует
+        выполнять другими способами. Повторный вызов во время прогрева или
+        после успешного прогрева ничего не делает.
+        """
+        with self._warm_up_lock:
+            if self.warm_up_state in ('warming', 'ready'):
+                return
+            self.warm_up_state = 'warming'
+            self.warm_up_error = None
+        threading.Thread(target=self._warm_up, name='kb-warm-up', daemon=True).start()
+    
+    def _warm_up(self) -> None:
+        """Загрузка модели и индекса и пробная векторизация запроса."""
+        started = time.monotonic()
+        logger.info("Прогрев векторизатора...")
+        try:
+            self.build_index()
+            if self.index is None or not self.index_to_data:
+                raise RuntimeError("Нет данных для индексации")
+            self._load_dependencies()
+            # Первая векторизация заметно медленнее последующих
+            self.model.encode(["прогрев"])
+        except Exception as e:
+            logger.error(f"Ошибка прогрева векторизатора: {e}")
+            with self._warm_up_lock:
+                self.warm_up_state = 'failed'
+                self.warm_up_error = str(e)
+            return
         
-        # Создание FAISS индекса
-        dimension = embeddings.shape[1]
-        self.index = self.faiss.IndexFlatL2(dimension)
-        self.index.add(embeddings)
+        self.warm_up_seconds = time.monotonic() - started
+        with self._warm_up_lock:
+            self.warm_up_state = 'ready'
+        self.ready.set()
+        logger.info(f"Векторизатор готов за {self.warm_up_seconds:.1f} с")
+    
+    def warm_up_status(self) -> Dict[str, Any]:
+        """
+        Состояние прогрева.
         
-        logger.info(f"Индекс успешно построен с {self.index.ntotal} элементами")
+        Returns:
+            Словарь с состоянием (idle, warming, ready или failed), числом
+            проиндексированных элементов, типом индекса, длительностью
+            прогрева и ошибкой.
+        """
+        return {
+            'state': self.warm_up_state,
+            'documents': len(self.index_to_data),
+            'index_type': ann.index_type_of(self.index) if self.index is not None else None,
+            'seconds': self.warm_up_seconds,
+            'error': self.warm_up_error
+        }
     
     def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """
         Семантический поиск по запросу.
         
+        Запросы сравниваются без учета регистра и лишних пробелов; повторный
+        запрос при неизменном индексе обслуживается из кеша результатов, а
+        вектор уже встречавшегося запроса берется из кеша векторов.
+        
         Args:
             query: Поисковый запрос.
             top_k: Количество результатов для возврата.
@@ -172,6 +522,10 @@ class KnowledgeVectorizer:
         Returns:
             Список найденных элементов, отсортированных по релевантности.
         """
+        if self.warm_up_state == 'warming':
+            logger.warning("Векторизатор еще прогревается")
+            return []
+        
         if self.index is None or not self.index_to_data:
             logger.warning("Индекс не построен. Запуск построения индекса...")
             self.build_index()
@@ -180,21 +534,119 @@ class KnowledgeVectorizer:
                 logger.error("Не удалось построить индекс")
                 return []
         
-        # Векторизация запроса
-        query_vector = self.model.encode([query])
+        # Векторизуем документы, изменившиеся после построения индекса
+        self.apply_updates()
         
-        # Поиск ближайших соседей
-        distances, indices = self.index.search(query_vector, top_k)
+        query = ' '.join(query.lower().split())
+        results = self.result_cache.get_or_load(
+            (query, top_k, self.index_version),
+            lambda: self._search(query, top_k)
+        )
+        return [data.copy() for data in results]
+    
+    async def search_async(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Семантический поиск по запросу без блокировки цикла событий.
+        
+        Векторы запросов, которых нет в кеше, вычисляются сервисом пакетной
+        векторизации вместе с запросами других пользователей.
         
-        # Формирование результатов
-        results = []
-        for i, idx in enumerate(indices[0]):
-            if idx < 0 or idx >= len(self.index_to_data):
-                continue
+        Args:
+            query: Поисковый запрос.
+            top_k: Количество результатов для возврата.
             
-            data = self.index_to_data[idx].copy()
-            # Добавляем оценку релевантности
-            data['_score'] = float(1.0 / (1.0 + distances[0][i]))
-            results.append(data)
+        Returns:
+            Список найденных элементов, отсортированных по релевантности.
+        """
+        loop = asyncio.get_running_loop()
+        if not self.ready.is_set():
+            # Индекс еще не готов, строим его вне цикла событий
+            return await loop.run_in_executor(None, self.search, query, top_k)
+        
+        # Обновление индекса читает файлы, векторизует и сохраняет индекс, а
+        # поиск ждет блокировки индекса, пока его обновляет другой поток;
+        # и то и другое выполняется вне цикла событий
+        await loop.run_in_executor(None, self.apply_updates)
+        
+        query = ' '.join(query.lower().split())
+        key = (query, top_k, self.index_version)
+        results = self.result_cache.get(key)
+        if results is None:
+            query_vector = self.embedding_cache.get(query)
+            if query_vector is None:
+                query_vector = await self.embedding_service.embed(query)
+                self.embedding_cache.put(query, query_vector)
+            results = await loop.run_in_executor(None, self.search_vector, query_vector, top_k)
+            self.result_cache.put(key, results)
+        return [data.copy() for data in results]
+    
+    def encode_queries(self, texts: List[str]):
+        """
+        Векторизация пакета запросов.
+        
+        Args:
+            texts: Тексты запросов.
+            
+        Returns:
+            Массив векторов формы (количество текстов, размерность).
+        """
+        # Модель не загружается, если индекс прочитан с диска
+        self._load_dependencies()
+        return self.model.encode(texts)
+    
+    def _embed_query(self, query: str):
+        """Вектор запроса из кеша или от модели."""
+        return self.embedding_cache.get_or_load(query, lambda: self.encode_queries([query]))
+    
+    def _search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """Поиск ближайших к запросу элементов в индексе."""
+        return self.search_vector(self._embed_query(query), top_k)
+    
+    def search_vector(self, query_vector, top_k: int) -> List[Dict[str, Any]]:
+        """
+        Поиск ближайших к вектору запроса элементов в индексе.
         
-        return results 
\ No newline at end of file
+        Args:
+            query_vector: Вектор запроса формы (1, размерность).
+            top_k: Количество результатов для возврата.
+            
+        Returns:
+            Список найденных элементов с оценкой _score (косинусная близость).
+        """
+        query_vector = ann.normalize(query_vector)
+        # Поиск ближайших соседей
+        with self._index_lock:
+            params = ann.excluding_params(self.index, self._stale) if self._stale else None
+            similarities, indices = self.index.search(query_vector, top_k, params=params)
+            
+            # Формирование результатов
+            results = []
+            for i, idx in enumerate(indices[0]):
+                data = self.index_to_data.get(int(idx))
+                if data is None:
+                    continue
+                
+                data = data.copy()
+                # Добавляем оценку релевантности
+                data['_score'] = float(similarities[0][i])
+                results.append(data)
+        
+        return results
+    
+    def close(self) -> None:
+        """Остановка потока пакетной векторизации."""
+        self.embedding_service.close()
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Счетчики кешей векторов запросов и результатов поиска и пакетной векторизации.
+        
+        Returns:
+            Словарь со статистикой каждого кеша, включая долю попаданий, и
+            статистикой пакетов.
+        """
+        return {
+            'embeddings': self.embedding_cache.stats(),
+            'results': self.result_cache.stats(),
+            'batching': self.embedding_service.stats()
+        }
@@ -0,0 +1,74 @@
+"""Keeping FSM dialog state in SQLite and forgetting abandoned dialogs."""
+import asyncio
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from data import fsm_storage
+from data.fsm_storage import ExpiringStorage, SQLiteStorage, decode_data, encode_data
+from data.rooms import Room
+
+def make_key(chat_id):
+    return StorageKey(bot_id=1, chat_id=chat_id, user_id=chat_id)
+
+def test_state_survives_restart(tmp_path):
+    path = str(tmp_path / "fsm.db")
+    room = Room(name="Кухня", length=3, width=4, height=2.5, area=47, floor_area=12, created_at=datetime(2024, 1, 2))
+    data = {"room": room, "started": datetime(2024, 1, 2, 3, 4), "rooms": [room], "step": 2}
+
+    async def save():
+        storage = SQLiteStorage(path, flush_interval=60)
+        await storage.set_state(make_key(1), "RoomStates:waiting_for_name")
+        await storage.set_data(make_key(1), data)
+        # Unflushed changes are visible to reads
+        assert await storage.get_data(make_key(1)) == data
+        await storage.close()
+
+    async def load():
+        storage = SQLiteStorage(path)
+        try:
+            return await storage.get_state(make_key(1)), await storage.get_data(make_key(1)), await storage.get_state(make_key(2))
+        finally:
+            await storage.close()
+
+    asyncio.run(save())
+    assert asyncio.run(load()) == ("RoomStates:waiting_for_name", data, None)
+
+def test_user_dicts_are_not_decoded_as_values():
+    data = {
+        "a": {"__datetime__": "2024-01-02T00:00:00", "note": "x"},
+        "b": {"__dataclass__": "data.rooms.Room", "fields": {}, "extra": 1},
+        "c": {"__fsm__": "unknown", "v": 1}
+    }
+    assert decode_data(encode_data(data)) == data
+
+def test_idle_and_extra_dialogs_are_dropped(monkeypatch):
+    now = [1000.0]
+    # Only the storage's clock; the event loop keeps the real one
+    monkeypatch.setattr(fsm_storage, "time", SimpleNamespace(monotonic=lambda: now[0], time=time.time))
+
+    async def main():
+        storage = ExpiringStorage(MemoryStorage(), ttl=60, max_states=2)
+        for chat_id in (1, 2, 3):
+            await storage.set_state(make_key(chat_id), "RoomStates:waiting_for_name")
+            now[0] += 1
+        # The least recently used dialog is dropped over the limit
+        assert await storage.get_state(make_key(1)) is None
+        assert await storage.get_state(make_key(2)) is not None
+
+        now[0] += 61
+        await storage.set_data(make_key(4), {"step": 1})
+        states = [await storage.get_state(make_key(chat_id)) for chat_id in (2, 3)]
+        return states, await storage.get_data(make_key(4)), storage.stats()
+
+    states, data, stats = asyncio.run(main())
+    assert states == [None, None]
+    assert data == {"step": 1}
+    assert stats == {"size": 1, "expired": 2, "evicted": 1}
@@ -0,0 +1,34 @@
+"""Removing, re-adding and searching vectors in each vector index type."""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+faiss = pytest.importorskip("faiss")
+
+from knowledge_base import ann
+from knowledge_base.vectorizer import KnowledgeVectorizer
+
+@pytest.mark.parametrize("index_type", ann.INDEX_TYPES)
+def test_remove_add_search(index_type):
+    vectors = ann.normalize(np.random.default_rng(0).standard_normal((400, 16)))
+    vectorizer = KnowledgeVectorizer(index_path="")
+    vectorizer.np, vectorizer.faiss = np, faiss
+    vectorizer.index = ann.create_index(vectors, np.arange(400, dtype="int64"), index_type)
+    vectorizer.index_to_data = {idx: {"_id": str(idx)} for idx in range(400)}
+
+    # Vector 5 is replaced under a new id several times, as apply_updates
+    # does for a changed document (ids are never reused)
+    current = 5
+    for new in (1000, 1001, 1002):
+        vectorizer._remove_vectors([current])
+        vectorizer.index.add_with_ids(vectors[5:6], np.array([new], dtype="int64"))
+        vectorizer.index_to_data[new] = {"_id": str(new)}
+        current = new
+
+    assert vectorizer.search_vector(vectors[5:6], 1)[0]["_id"] == "1002"
+    for idx in (7, 8, 399):
+        assert vectorizer.search_vector(vectors[idx:idx + 1], 1)[0]["_id"] == str(idx)
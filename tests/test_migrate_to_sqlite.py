@@ -0,0 +1,44 @@
+"""Copying per-user files into the SQLite storage."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data.codecs import get_codec
+from data.journal import write_atomic
+from data.migrate_to_sqlite import migrate
+from data.paths import get_rooms_file
+from data.storage import FileBackend, SQLiteBackend, legacy_room_id, room_dimensions
+
+MATERIAL = {"name": "Ламинат", "category": "Пол", "unit": "м²", "price": 900.0, "created_at": "2024-01-01T00:00:00"}
+
+def test_round_trip(tmp_path, monkeypatch):
+    # User files live in data/users relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    files = FileBackend(rooms_mode="journal")
+    room = {"id": "a1", "name": "Кухня", "created_at": "2024-01-01T00:00:00", **room_dimensions(3, 4, 2.7)}
+    files.apply_room_ops(1, [{"op": "add", "room": room}])
+    files.add_materials(1, [MATERIAL])
+    # A room saved before rooms had ids, a height and a floor area
+    old_room = {"name": "Зал", "length": 5, "width": 4, "area": 20, "created_at": "2023-05-01T10:00:00"}
+    write_atomic(get_rooms_file(2), [old_room], get_codec("json"))
+    files.close()
+
+    db_path = str(tmp_path / "storage.db")
+    assert migrate(db_path) == 2
+    # Running it again replaces the rows instead of adding them twice
+    assert migrate(db_path) == 2
+
+    database = SQLiteBackend(db_path)
+    try:
+        assert database.load_rooms(1) == [room]
+        assert database.load_materials(1) == [MATERIAL]
+        assert database.load_rooms(2) == [{
+            **old_room,
+            "id": legacy_room_id(old_room),
+            "height": 2.5,
+            "floor_area": 20
+        }]
+        assert database.load_materials(2) == []
+    finally:
+        database.close()
@@ -0,0 +1,63 @@
+"""Coalescing and serializing writes of each user."""
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data.materials import Material
+from data.repository import Repository
+from data.rooms import Room
+
+def make_room(name):
+    return Room(name=name, length=3, width=4, height=2.5, area=47, floor_area=12, created_at=datetime(2024, 1, 2))
+
+def test_changes_are_coalesced(monkeypatch):
+    writes = []
+
+    def write(user_id, batch):
+        writes.append((user_id, [op["op"] for op in batch.room_ops], len(batch.materials)))
+
+    monkeypatch.setattr(Repository, "_write", staticmethod(write))
+
+    async def main():
+        repo = Repository(coalesce_window=0.05)
+        kitchen = make_room("Кухня")
+        await asyncio.gather(
+            repo.save_room(1, kitchen),
+            repo.save_room(1, make_room("Зал")),
+            repo.update_room(1, kitchen.id, name="Столовая"),
+            repo.save_material(1, Material("Ламинат", "Пол", "м²", 900.0)),
+            repo.save_room(2, make_room("Ванная"))
+        )
+        # A change made after the batch was written goes into the next one
+        await repo.delete_room(1, kitchen.id)
+        await repo.shutdown()
+
+    asyncio.run(main())
+    assert sorted(writes) == [
+        (1, ["add", "add", "update"], 1),
+        (1, ["delete"], 0),
+        (2, ["add"], 0)
+    ]
+
+def test_write_error_reaches_every_caller(monkeypatch):
+    def write(user_id, batch):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(Repository, "_write", staticmethod(write))
+
+    async def main():
+        repo = Repository(coalesce_window=0.05)
+        try:
+            return await asyncio.gather(
+                repo.save_room(1, make_room("Кухня")),
+                repo.save_room(1, make_room("Зал")),
+                return_exceptions=True
+            )
+        finally:
+            await repo.shutdown()
+
+    results = asyncio.run(main())
+    assert [str(result) for result in results] == ["disk full", "disk full"]
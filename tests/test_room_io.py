@@ -0,0 +1,21 @@
+"""Reading rooms files with English and Russian column headers."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data.room_io import read_rooms_file
+
+def test_russian_headers(tmp_path):
+    path = tmp_path / "rooms.csv"
+    path.write_text("Название;Длина;Ширина;Высота\nКухня;3,5;4;2.7\n", encoding="utf-8")
+    result = read_rooms_file(str(path), "csv")
+    assert result.errors == []
+    assert [(room.name, room.length, room.width, room.height) for room in result.rooms] == [("Кухня", 3.5, 4.0, 2.7)]
+
+def test_repeated_column(tmp_path):
+    path = tmp_path / "rooms.csv"
+    path.write_text("name,название,length,width,height\nKitchen,Кухня,3,4,2.5\n", encoding="utf-8")
+    result = read_rooms_file(str(path), "csv")
+    assert result.rooms == []
+    assert result.errors == ["Столбцы указаны несколько раз: name"]
@@ -0,0 +1,54 @@
+"""Ids of rooms saved before rooms had ids."""
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data.codecs import get_codec
+from data.journal import write_atomic
+from data.paths import get_rooms_file
+from data.rooms import Room
+from data.storage import FileBackend, SQLiteBackend, legacy_room_id
+
+OLD_ROOM = {"name": "Зал", "length": 5, "width": 4, "height": 2.7, "area": 68.6, "floor_area": 20, "created_at": "2023-05-01T10:00:00"}
+
+def test_legacy_id_survives_restarts(tmp_path, monkeypatch):
+    # User files live in data/users relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    write_atomic(get_rooms_file(1), [OLD_ROOM], get_codec("json"))
+    room_id = legacy_room_id(OLD_ROOM)
+
+    files = FileBackend()
+    assert [r["id"] for r in files.load_rooms(1)] == [room_id]
+    assert Room.from_dict(OLD_ROOM).id == room_id
+    files.apply_room_ops(1, [{"op": "update", "id": room_id, "fields": {"name": "Гостиная"}}])
+    files.close()
+
+    # The rewritten snapshot keeps the id, and a renamed room keeps it too
+    restarted = FileBackend()
+    assert [(r["id"], r["name"]) for r in restarted.load_rooms(1)] == [(room_id, "Гостиная")]
+    restarted.close()
+
+def test_old_database_gets_same_ids(tmp_path):
+    path = str(tmp_path / "storage.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE rooms (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, name TEXT NOT NULL, "
+        "length REAL NOT NULL, width REAL NOT NULL, height REAL NOT NULL, area REAL NOT NULL, "
+        "floor_area REAL NOT NULL, created_at TEXT NOT NULL)"
+    )
+    conn.execute(
+        "INSERT INTO rooms (user_id, name, length, width, height, area, floor_area, created_at) "
+        "VALUES (1, :name, :length, :width, :height, :area, :floor_area, :created_at)",
+        OLD_ROOM
+    )
+    conn.commit()
+    conn.close()
+
+    # Files and the database give an old room the same id
+    database = SQLiteBackend(path)
+    try:
+        assert [r["id"] for r in database.load_rooms(1)] == [legacy_room_id(OLD_ROOM)]
+    finally:
+        database.close()